@@ -0,0 +1,95 @@
+"""
+Benchmark: networkx DiGraph vs. frozen CompactGraph for the inference phases.
+
+Builds a synthetic developer HIN (repos -> commits -> files, commits -> skills)
+and reports retained memory, meta-path walking (neighbor iteration + type
+filtering) and bulk skill confidence on both representations. 'held MB' is what
+run_pipeline keeps during exploration and scoring (the compact view alone once
+the DiGraph is dropped after the build); 'peak MB' is the tracemalloc peak of the
+whole lifecycle, which includes the build's DiGraph next to its conversion.
+
+Usage: python -m benchmarks.bench_compact_graph [--commits 2000 20000]
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+import networkx as nx
+import numpy as np
+from src.compact_graph import CompactGraph
+from src.confidence import ConfidenceCalculator
+from src.meta_paths import EXPERTISE_PATH, MetaPathWalker
+
+N_REPOS = 30
+FILES_PER_COMMIT = 5
+N_SKILLS = 40
+
+def synthetic_hin(n_commits, rng):
+    g = nx.DiGraph()
+    g.add_node("dev:bench", type="developer", name="Bench")
+    for r in range(N_REPOS):
+        g.add_node(f"repo:r{r}", type="repository", stars=int(rng.integers(0, 500)), topics=["ml"])
+        g.add_edge("dev:bench", f"repo:r{r}", type="contributes", weight=1.0)
+    for c in range(n_commits):
+        commit = f"commit:{c:07x}"
+        g.add_node(commit, type="commit", message=f"change {c}", date="2024-01-01T00:00:00")
+        g.add_edge(f"repo:r{rng.integers(N_REPOS)}", commit, type="contains", weight=1.0)
+        for f in rng.integers(0, n_commits, size=FILES_PER_COMMIT):
+            g.add_node(f"file:src/mod_{f}.py", type="file")
+            g.add_edge(commit, f"file:src/mod_{f}.py", type="modifies", weight=float(rng.uniform(0.01, 1.0)),
+                       additions=int(rng.integers(1, 50)), patch_id=c)
+        if rng.uniform() < 0.2:
+            skill = f"skill:s{rng.integers(N_SKILLS)}"
+            g.add_node(skill, type="skill", name=skill)
+            g.add_edge(commit, skill, type="implies", weight=float(rng.uniform(0.1, 0.9)))
+    return g
+
+def retained(build):
+    tracemalloc.start()
+    obj = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return obj, size
+
+def pipeline_memory(n_commits, compact):
+    """
+    (peak, held while exploring/scoring) traced memory of build -> explore -> confidence,
+    mirroring main.run_pipeline.
+    """
+    tracemalloc.start()
+    graph = synthetic_hin(n_commits, np.random.default_rng(0))
+    if compact:
+        topology = CompactGraph.from_networkx(graph) # Exploration reads
+        del graph # Skills go to an overlay, merged into the view once explored
+        gc.collect()
+        graph = topology.with_overlay(nx.DiGraph())
+        del topology
+    held = tracemalloc.get_traced_memory()[0]
+    ConfidenceCalculator(graph).compute_all_skill_confidences("dev:bench")
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak, held
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--commits", type=int, nargs="+", default=[2_000, 20_000])
+    args = parser.parse_args()
+
+    print(f"{'commits':>8} {'repr':>8} {'memory MB':>10} {'walk s':>8} {'confidence s':>13} {'held MB':>8} {'peak MB':>8}")
+    for n in args.commits:
+        g, g_bytes = retained(lambda: synthetic_hin(n, np.random.default_rng(0)))
+        cg, cg_bytes = retained(lambda: CompactGraph.from_networkx(g))
+        for name, graph, size in [("networkx", g, g_bytes), ("compact", cg, cg_bytes)]:
+            paths, walk_t = timed(lambda: MetaPathWalker(graph).find_paths("dev:bench", EXPERTISE_PATH))
+            _, conf_t = timed(lambda: ConfidenceCalculator(graph).compute_all_skill_confidences("dev:bench"))
+            peak, held = pipeline_memory(n, compact=name == "compact")
+            print(f"{n:>8} {name:>8} {size / 2**20:>10.1f} {walk_t:>8.3f} {conf_t:>13.3f} "
+                  f"{held / 2**20:>8.1f} {peak / 2**20:>8.1f}")
+
+if __name__ == "__main__":
+    main()
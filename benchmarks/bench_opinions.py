@@ -0,0 +1,54 @@
+"""
+Microbenchmark: scalar MassFunction vs. vectorized OpinionBatch.
+
+Discounts N random 3-edge paths from a developer opinion and Yager-fuses the
+results, reporting opinions/second for each implementation.
+
+Usage: python -m benchmarks.bench_opinions [--sizes 10000 100000 1000000]
+"""
+import argparse
+import time
+import numpy as np
+from src.confidence import MassFunction, OpinionBatch
+
+PATH_LENGTH = 3
+SCALAR_LIMIT = 100_000 # The scalar loop is too slow to be worth timing beyond this
+
+def bench_scalar(weights, dev_belief):
+    fused = None
+    for row in weights:
+        m = MassFunction({'s': dev_belief, 'ns': 0.0, 'theta': 1.0 - dev_belief})
+        for w in row:
+            m = MassFunction.discount(m, MassFunction({'s': w, 'ns': 0.0, 'theta': 1.0 - w}))
+        fused = m if fused is None else MassFunction.combine(fused, m)
+    return fused['s']
+
+def bench_batch(weights, dev_belief):
+    opinions = OpinionBatch.discount_paths(OpinionBatch.from_beliefs([dev_belief]), weights)
+    return opinions.fuse().s[0]
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'opinions':>10} {'scalar op/s':>14} {'batch op/s':>14} {'speedup':>9}")
+    for n in args.sizes:
+        # Small weights keep the fused belief away from 1.0 so results stay comparable
+        weights = rng.uniform(0.0, 0.01, size=(n, PATH_LENGTH))
+        batch_s, batch_t = timed(bench_batch, weights, 0.5)
+        if n <= SCALAR_LIMIT:
+            scalar_s, scalar_t = timed(bench_scalar, weights, 0.5)
+            assert abs(scalar_s - batch_s) < 1e-9, (scalar_s, batch_s)
+            print(f"{n:>10} {n / scalar_t:>14,.0f} {n / batch_t:>14,.0f} {scalar_t / batch_t:>8.0f}x")
+        else:
+            print(f"{n:>10} {'-':>14} {n / batch_t:>14,.0f} {'-':>9}")
+
+if __name__ == "__main__":
+    main()
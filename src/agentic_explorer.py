@@ -1,6 +1,16 @@
+import heapq
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 import networkx as nx
+from .compact_graph import CompactGraph
+from .config import Config
 from .llm_client import LLMClient
+from .node_context import NodeContextIndex
+from .patch_store import PatchStore
 
 class MCTSNode:
     def __init__(self, name, parent=None, prior=1.0, depth=0):
@@ -10,8 +20,10 @@ class MCTSNode:
         self.visits = 0
         self.value = 0.0 # Accumulated reward (InfoGain)
         self.prior = prior # P(s, a) Heuristic Probability
-        self.untried_actions = [] # Neighbors in HIN not yet in Tree
+        self.untried_actions = [] # Heap of (-prior, order, node ID): HIN neighbors not yet in the tree
         self.depth = depth
+        self.virtual_loss = 0 # Pending (in-flight) simulations through this node
+        self.exhausted = False # Evaluated, with nothing left to expand below it
         
         # Track the reasoning path: list of node descriptions
         self.path_context = parent.path_context + [name] if parent else [name]
@@ -19,48 +31,182 @@ class MCTSNode:
     def is_fully_expanded(self):
         return len(self.untried_actions) == 0
 
-    def best_child(self, c_param=1.414):
+    def best_child(self, c_param=1.414, children=None):
         """
-        Selects child using PUCT (Predictor + UCB).
+        Selects child using PUCT (Predictor + UCB), among `children` if given.
+        Virtual loss counts pending simulations as zero-reward visits, steering
+        concurrent selections in the same batch towards different children.
         """
+        children = self.children if children is None else children
         choices_weights = [
-            (child.value / (child.visits + 1e-6)) + 
-            c_param * child.prior * np.sqrt(self.visits) / (1 + child.visits)
-            for child in self.children
+            (child.value / (child.visits + child.virtual_loss + 1e-6)) + 
+            c_param * child.prior * np.sqrt(self.visits + self.virtual_loss) / (1 + child.visits + child.virtual_loss)
+            for child in children
         ]
-        return self.children[np.argmax(choices_weights)]
+        return children[np.argmax(choices_weights)]
+
+class StoppingRule:
+    """
+    Budgets and convergence test for anytime exploration. The search can stop
+    after any iteration with a usable result, so run_exploration checks the rule
+    before each selection and stops at the first budget hit or once converged.
+    A budget of None (or 0) is unlimited.
+    Converged: no new skill in the last `window` iterations and their mean reward
+    within `reward_tol` of the `window` before (window=0 disables early stopping).
+    LLM calls/tokens are the exploring agent's own (MCTSAgent.usage), so agents
+    sharing one client concurrently (batch and team runs) each get the full budget.
+    """
+    def __init__(self, max_seconds: float = None, max_llm_calls: int = None, max_tokens: int = None,
+                 window: int = Config.MCTS_CONVERGENCE_WINDOW, reward_tol: float = Config.MCTS_REWARD_TOL):
+        self.max_seconds = max_seconds
+        self.max_llm_calls = max_llm_calls
+        self.max_tokens = max_tokens
+        self.window = window
+        self.reward_tol = reward_tol
+        self.started = None
+        self.base_calls = 0
+        self.base_tokens = 0
+
+    @classmethod
+    def from_config(cls):
+        return cls(Config.MCTS_MAX_SECONDS, Config.MCTS_MAX_LLM_CALLS, Config.MCTS_MAX_TOKENS)
+
+    def start(self, usage: dict):
+        """usage: The agent's {'calls', 'tokens'} counters; budgets count from their current values."""
+        self.started = time.monotonic()
+        self.base_calls = usage["calls"]
+        self.base_tokens = usage["tokens"]
+
+    def check(self, usage: dict, history: list):
+        """Returns why the search should stop now, or None to continue."""
+        if self.max_seconds and time.monotonic() - self.started >= self.max_seconds:
+            return "time budget"
+        if self.max_llm_calls and usage["calls"] - self.base_calls >= self.max_llm_calls:
+            return "LLM call budget"
+        if self.max_tokens and usage["tokens"] - self.base_tokens >= self.max_tokens:
+            return "token budget"
+        if self.converged(history):
+            return "converged"
+        return None
+
+    def converged(self, history: list) -> bool:
+        w = self.window
+        if not w or len(history) < 2 * w:
+            return False
+        last, previous = history[-w:], history[-2 * w:-w]
+        if any(h['new_skills'] for h in last):
+            return False
+        mean = lambda entries: sum(h['reward'] for h in entries) / w
+        return abs(mean(last) - mean(previous)) <= self.reward_tol
 
 class MCTSAgent:
-    def __init__(self, graph: nx.DiGraph, llm_client: LLMClient):
+    def __init__(self, graph: nx.DiGraph, llm_client: LLMClient, frontier: set = None,
+                 patch_store: PatchStore = None, topology: CompactGraph = None, listener=None,
+                 contexts: NodeContextIndex = None):
+        """
+        frontier: Optional set of node IDs to restrict exploration to
+                  (e.g. nodes merged by an incremental rebuild).
+                  The root's actions are the repositories, plus commits whose repository
+                  is not one of them; commits are reached by expanding their repository.
+        patch_store: Source of diff text for 'modifies' edges; defaults to the
+                     store recorded on the graph by HINBuilder.
+        topology: Frozen view of the constructed HIN used for all reads of repo/commit/file
+                  data; inferred skills are still written to `graph`.
+        listener: Optional callback listener(kind, data), told about every finished
+                  iteration ('iteration': its convergence_history entry plus the
+                  evaluated node) and every newly created skill node ('skill').
+        contexts: Memoized LLM evidence per node; pass one to share it between agents
+                  exploring the same topology (built lazily over `topology` if omitted).
+        """
         self.graph = graph
+        self.listener = listener
+        self.topology = topology if topology is not None else graph
         self.llm = llm_client
+        self.usage = {"calls": 0, "tokens": 0} # This agent's LLM spend, whoever else shares the client
+        if patch_store is None and os.path.exists(graph.graph.get('patch_store', '')):
+            patch_store = PatchStore(graph.graph['patch_store'], read_only=True)
+        self.patch_store = patch_store
+        self.contexts = contexts if contexts is not None else NodeContextIndex(self.topology, patch_store)
+        self.frontier = frontier
+        self.widening_c = Config.MCTS_WIDENING_C
+        self.widening_alpha = Config.MCTS_WIDENING_ALPHA
         self.root = MCTSNode("root")
         
         # Initialize session tracking for Diversity reward
         self.session_skills = set()
         
-        # Initialize root actions with 'commit' and 'repository' nodes
-        nodes = [n for n, d in graph.nodes(data=True) if d.get('type') in ['commit', 'repository']]
-        nodes.sort(key=lambda x: 1 if 'repo' in x else 0) 
-        self.root.untried_actions = nodes
+        # Initialize root actions with 'repository' nodes and commits outside of them
+        repos, commits = set(), []
+        for n, d in self.topology.nodes(data=True):
+            if frontier is not None and n not in frontier:
+                continue
+            if d.get('type') == 'repository':
+                repos.add(n)
+            elif d.get('type') == 'commit':
+                commits.append(n)
+        orphans = [c for c in commits if not any(p in repos for p in self.topology.predecessors(c))]
+        self.root.untried_actions = self._action_heap(sorted(repos) + orphans)
         self.convergence_history = []
+        self.change_log = [] # implies-edge writes: {'iteration', 'source', 'skill', 'old_weight', 'new_weight'}
+        self.trace = [] # Per-iteration record: convergence entry + node, edge changes, LLM spend, elapsed time
+        self._started = time.monotonic()
+        self.stop_reason = None # Why the last run_exploration ended early (None: ran all iterations)
+        
+        # Guards the search tree, session memory and graph writes in parallel mode
+        self.tree_lock = threading.Lock()
+        self._claimed = 0 # Simulations handed out to workers in the current run
 
     def select(self, node):
-        while not node.is_fully_expanded():
-            if len(node.untried_actions) > 0:
+        """
+        Expands while the node's visits allow another child, otherwise descends via
+        PUCT until a leaf. Exhausted subtrees are skipped: evaluation is deterministic,
+        so re-simulating them adds nothing. Returns the root once everything is explored.
+        """
+        while True:
+            available = [c for c in node.children if not self._is_exhausted(c)]
+            if not node.is_fully_expanded() and (len(node.children) < self._widening_limit(node) or not available):
                 return self.expand(node)
-            else:
-                if not node.children:
-                     return node
-                node = node.best_child()
-        return node
+            if not available:
+                return node
+            node = node.best_child(children=available)
+
+    def _is_exhausted(self, node):
+        # Evaluated (or in flight) with no untried actions and every child exhausted
+        if not node.exhausted:
+            node.exhausted = (node.visits + node.virtual_loss > 0 and node.is_fully_expanded()
+                              and all(self._is_exhausted(c) for c in node.children))
+        return node.exhausted
+
+    def _widening_limit(self, node):
+        """Progressive widening: a node holds at most ceil(C * visits^alpha) children."""
+        if self.widening_c <= 0:
+            return math.inf
+        return max(1, math.ceil(self.widening_c * (node.visits + node.virtual_loss) ** self.widening_alpha))
 
     def expand(self, node):
-        action_node_id = node.untried_actions.pop()
-        
-        # Calculate Heuristic Prior
-        prior = 1.0
-        node_data = self.graph.nodes[action_node_id]
+        neg_prior, _, action_node_id = heapq.heappop(node.untried_actions)
+        child_node = MCTSNode(action_node_id, parent=node, prior=-neg_prior, depth=node.depth + 1)
+        child_node.untried_actions = self._action_heap(
+            n for n in self.topology.successors(action_node_id) if n not in child_node.path_context
+        )
+        node.children.append(child_node)
+        return child_node
+
+    def _action_heap(self, node_ids):
+        """Heap of the commit/repository nodes among `node_ids`, best heuristic prior first."""
+        heap = []
+        for n in node_ids:
+            if self.frontier is not None and n not in self.frontier:
+                continue
+            prior = self._prior(n)
+            if prior is not None:
+                heap.append((-prior, len(heap), n))
+        heapq.heapify(heap)
+        return heap
+
+    def _prior(self, node_id):
+        """Heuristic prior P(s, a) of exploring `node_id`; None for nodes without LLM evidence."""
+        node_data = self.topology.nodes[node_id]
         n_type = node_data.get('type')
         
         if n_type == 'repository':
@@ -73,32 +219,74 @@ class MCTSAgent:
                 prior += 2.0
         elif n_type == 'commit':
             prior = 0.5 
-            
-        child_node = MCTSNode(action_node_id, parent=node, prior=prior, depth=node.depth + 1)
-        node.children.append(child_node)
-        return child_node
+        else:
+            return None
+        return prior
+
+    def select_batch(self, batch_size):
+        """
+        Selects up to `batch_size` distinct leaves, applying a virtual loss along
+        each selected path so later selections diverge from earlier ones.
+        Virtual losses must be released with `_release_virtual_loss`.
+        """
+        leaves = []
+        for _ in range(batch_size):
+            leaf = self.select(self.root)
+            if leaf in leaves or leaf is self.root:
+                break # Tree cannot offer another distinct leaf right now
+            leaves.append(leaf)
+            node = leaf
+            while node is not None:
+                node.virtual_loss += 1
+                node = node.parent
+        return leaves
+
+    def _release_virtual_loss(self, leaf):
+        node = leaf
+        while node is not None:
+            node.virtual_loss -= 1
+            node = node.parent
+
+    def _build_context(self, node):
+        return self.contexts.get(node.name)
 
     def simulate(self, node):
         """
         Simulation Phase: Evaluate the node using CoT LLM Reasoner.
         Returns a rich reward based on Accuracy, Efficiency, and Diversity.
         """
-        node_data = self.graph.nodes[node.name]
-        
-        context = {
-            "type": node_data.get('type'),
-            "message": node_data.get('message', ''),
-            "description": node_data.get('description', ''),
-            "topics": node_data.get('topics', []),
-            "languages": node_data.get('languages', {}),
-            "diff_summary": self._get_diff_summary(node.name) if node_data.get('type') == 'commit' else ""
-        }
-        
-        print(f"  [MCTS] Simulating Path: {' -> '.join(node.path_context[-3:])}...")
-        skills = self.llm.infer_skills(context, reasoning_path=node.path_context)
-        
+        return self._evaluate([node], batched=False)[0][0]
+
+    def simulate_batch(self, nodes):
+        """
+        Evaluates several leaves with a single batched LLM call.
+        Rewards are computed in selection order, so diversity credit goes to the
+        first leaf of the batch that surfaces a skill.
+        """
+        return [score[0] for score in self._evaluate(nodes, batched=True)]
+
+    def _evaluate(self, nodes, batched):
+        """LLM evaluation of `nodes` (one call, or one per node); returns their _score tuples."""
+        contexts = {node.name: self._build_context(node) for node in nodes}
+        if batched:
+            paths = {node.name: node.path_context for node in nodes}
+            print(f"  [MCTS] Simulating {len(nodes)} paths in one batch...")
+            skills_by_node = self.llm.infer_skills_batch(contexts, reasoning_paths=paths, usage=self.usage)
+        else:
+            node = nodes[0]
+            print(f"  [MCTS] Simulating Path: {' -> '.join(node.path_context[-3:])}...")
+            skills_by_node = {node.name: self.llm.infer_skills(contexts[node.name], reasoning_path=node.path_context,
+                                                               usage=self.usage)}
+        return [self._score(node, skills_by_node.get(node.name, [])) for node in nodes]
+
+    def _score(self, node, skills):
+        """
+        Turns the inferred skills for `node` into a reward and persists them.
+        Returns (reward, implies-edge changes it wrote (see _update_graph_with_skills),
+        number of skills new to this session).
+        """
         if not skills:
-            return 0.0
+            return 0.0, [], 0
             
         # 1. Accuracy Reward (R_acc)
         max_conf = max([s.get('confidence', 0) for s in skills]) if skills else 0.0
@@ -120,9 +308,9 @@ class MCTSAgent:
         total_reward = (0.6 * max_conf) + (0.2 * r_eff) + (0.2 * r_div)
         
         # Persist results to Graph
-        self._update_graph_with_skills(node.name, skills)
+        changes = self._update_graph_with_skills(node.name, skills)
         
-        return total_reward
+        return total_reward, changes, new_skills_count
 
     def backpropagate(self, node, reward):
         while node is not None:
@@ -130,49 +318,143 @@ class MCTSAgent:
             node.value += reward
             node = node.parent
 
-    def run_exploration(self, iterations=10):
+    def run_exploration(self, iterations=10, batch_size=1, workers=1, stopping: StoppingRule = None):
+        """
+        Runs up to `iterations` simulations. With batch_size > 1, leaves are selected in
+        batches under virtual loss and evaluated with one LLM call per batch;
+        the number of simulations (the exploration budget) stays the same.
+        With workers > 1, that many threads search the tree concurrently with
+        their LLM calls in flight simultaneously; workers=1 is the deterministic
+        sequential search.
+        stopping: Optional StoppingRule (time/LLM-call/token budgets, early stop on
+                  convergence), checked before each selection. The reason for
+                  stopping early is left in `stop_reason`.
+        """
         print(f"--- Starting Advanced MCTS Exploration ({iterations} iterations) ---")
         self.session_skills = set() # Reset session memory
         self.convergence_history = []
+        self.change_log = []
+        self.trace = []
+        self._started = time.monotonic()
+        self.stop_reason = None
+        if stopping:
+            stopping.start(self.usage)
         
-        for i in range(iterations):
-            # Snapshot of skill edge weights for convergence tracking
-            old_weights = { (u, v): d.get('weight', 0) for u, v, d in self.graph.edges(data=True) if d.get('type') == 'implies' }
-            
-            print(f"Iter {i+1}:")
-            leaf = self.select(self.root)
-            reward = self.simulate(leaf)
-            self.backpropagate(leaf, reward)
-            print(f"  Result: Reward={reward:.2f}")
-            
-            # Post-iteration check
-            new_weights = { (u, v): d.get('weight', 0) for u, v, d in self.graph.edges(data=True) if d.get('type') == 'implies' }
+        if workers > 1:
+            self._claimed = 0
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(self._exploration_worker, iterations, batch_size, stopping) for _ in range(workers)]
+                for future in futures:
+                    future.result()
+        else:
+            i = 0
+            while i < iterations and not self._should_stop(stopping):
+                if batch_size > 1:
+                    print(f"Iter {i+1}-{min(i + batch_size, iterations)}:")
+                    leaves = self.select_batch(min(batch_size, iterations - i))
+                    if not leaves:
+                        break # Nothing left to explore
+                    scores = self._evaluate(leaves, batched=True)
+                    for leaf, score in zip(leaves, scores):
+                        self._release_virtual_loss(leaf)
+                        self.backpropagate(leaf, score[0])
+                else:
+                    print(f"Iter {i+1}:")
+                    leaves = [self.select(self.root)]
+                    if leaves[0] is self.root:
+                        break # Nothing left to explore
+                    scores = self._evaluate(leaves, batched=False)
+                    self.backpropagate(leaves[0], scores[0][0])
+                print(f"  Result: Reward={', '.join(f'{score[0]:.2f}' for score in scores)}")
+                
+                # Convergence comes from the change log of this iteration's writes, not a graph scan
+                for leaf, score in zip(leaves, scores):
+                    i += 1
+                    self._record_iteration(leaf, *score)
+        
+        if self.stop_reason:
+            print(f"--- Exploration stopped early ({self.stop_reason}) after {len(self.convergence_history)} iterations ---")
+
+    def _should_stop(self, stopping):
+        if stopping and self.stop_reason is None:
+            self.stop_reason = stopping.check(self.usage, self.convergence_history)
+        return self.stop_reason is not None
+
+    def _record_iteration(self, leaf, reward, changes, new_skills):
+        """Appends the iteration to convergence_history, change_log and trace (O(edges it wrote))."""
+        iteration = len(self.convergence_history) + 1
+        for change in changes:
+            change["iteration"] = iteration
+        self.change_log.extend(changes)
+        entry = {
+            "iteration": iteration,
+            "reward": reward,
+            "max_confidence_change": max((abs(c["new_weight"] - c["old_weight"]) for c in changes), default=0.0),
+            "new_skills": new_skills
+        }
+        self.convergence_history.append(entry)
+        record = dict(entry, node=leaf.name, changes=changes, llm_calls=self.usage["calls"],
+                      elapsed=time.monotonic() - self._started)
+        self.trace.append(record)
+        if self.listener:
+            self.listener("iteration", record)
+
+    def _exploration_worker(self, iterations, batch_size, stopping=None):
+        """
+        One parallel search thread: select under the tree lock (leaving a virtual
+        loss on the path), call the LLM without holding it, then score and
+        backpropagate under the lock again. An exception in any worker (e.g. a
+        listener cancelling the job) stops the others before their next claim.
+        """
+        try:
+            self._explore_until_done(iterations, batch_size, stopping)
+        except BaseException as e:
+            with self.tree_lock:
+                self.stop_reason = self.stop_reason or f"aborted ({type(e).__name__})"
+            raise
+
+    def _explore_until_done(self, iterations, batch_size, stopping):
+        while True:
+            with self.tree_lock:
+                remaining = iterations - self._claimed
+                if remaining <= 0 or self._should_stop(stopping):
+                    return
+                leaves = self.select_batch(min(batch_size, remaining))
+                if not leaves:
+                    return # Nothing left to explore
+                self._claimed += len(leaves)
+                contexts = {leaf.name: self._build_context(leaf) for leaf in leaves}
             
-            # Calculate max change
-            max_change = 0.0
-            for key in new_weights:
-                old_w = old_weights.get(key, 0)
-                max_change = max(max_change, abs(new_weights[key] - old_w))
+            print(f"  [MCTS] Simulating Path(s): {', '.join(' -> '.join(l.path_context[-3:]) for l in leaves)}...")
+            if batch_size > 1:
+                paths = {leaf.name: leaf.path_context for leaf in leaves}
+                skills_by_node = self.llm.infer_skills_batch(contexts, reasoning_paths=paths, usage=self.usage)
+            else:
+                leaf = leaves[0]
+                skills_by_node = {leaf.name: self.llm.infer_skills(contexts[leaf.name], reasoning_path=leaf.path_context,
+                                                                   usage=self.usage)}
             
-            self.convergence_history.append({
-                "iteration": i + 1,
-                "reward": reward,
-                "max_confidence_change": max_change
-            })
+            with self.tree_lock:
+                for leaf in leaves:
+                    score = self._score(leaf, skills_by_node.get(leaf.name, []))
+                    self._release_virtual_loss(leaf)
+                    self.backpropagate(leaf, score[0])
+                    self._record_iteration(leaf, *score)
+                    print(f"  Result: Reward={score[0]:.2f}")
 
     def _get_diff_summary(self, commit_node_id):
         """Helper to aggregate diffs from outgoing edges."""
-        summary = ""
-        for _, v, data in self.graph.out_edges(commit_node_id, data=True):
-            if data.get('type') == 'modifies':
-                summary += f"\nFile: {v}\nPatch: {data.get('patch_content', '')[:200]}..." 
-        return summary
+        return self.contexts.get(commit_node_id)["diff_summary"]
 
     def _update_graph_with_skills(self, source_node, skills):
-        """Adds Skill nodes and Implies edges to the graph."""
+        """
+        Adds Skill nodes and Implies edges to the graph.
+        Returns the change log of the edges written:
+        [{'source', 'skill', 'old_weight', 'new_weight'}] (old_weight 0 for a new edge).
+        """
         # Calculate Semantic Richness of the Commit (Sum of TF-IDF weights of modified files)
         commit_richness = 0.0
-        for _, _, data in self.graph.out_edges(source_node, data=True):
+        for _, _, data in self.topology.out_edges(source_node, data=True):
             if data.get('type') == 'modifies':
                 commit_richness += data.get('weight', 0.0)
         
@@ -182,6 +464,7 @@ class MCTSAgent:
         if commit_richness < 0.1: commit_richness = 0.5 
         if commit_richness > 2.0: commit_richness = 2.0
 
+        changes = []
         for s in skills:
             skill_name = s['skill']
             base_conf = s['confidence']
@@ -193,6 +476,11 @@ class MCTSAgent:
             
             if not self.graph.has_node(skill_id):
                 self.graph.add_node(skill_id, type="skill", name=skill_name)
+                if self.listener:
+                    self.listener("skill", {"skill": skill_name, "source": source_node, "weight": final_weight})
+            
+            old_weight = self.graph.edges[source_node, skill_id].get('weight', 0) if self.graph.has_edge(source_node, skill_id) else 0
+            changes.append({"source": source_node, "skill": skill_id, "old_weight": old_weight, "new_weight": final_weight})
             
             # Edge: Commit -> Skill
             self.graph.add_edge(
@@ -202,3 +490,4 @@ class MCTSAgent:
                 weight=final_weight,
                 reasoning=s.get('reasoning', '')
             )
+        return changes
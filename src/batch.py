@@ -0,0 +1,253 @@
+import argparse
+import csv
+import gc
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+import networkx as nx
+from . import graph_format
+from .agentic_explorer import MCTSAgent, StoppingRule
+from .compact_graph import CompactGraph
+from .confidence import ConfidenceCalculator
+from .config import Config
+from .github_cache import GitHubCache
+from .graph_builder import GitHubFetcher, HINBuilder
+from .main import build_profile
+from .patch_store import PatchStore
+
+PHASES = ['build', 'explore', 'confidence']
+
+def read_usernames(source: str) -> list:
+    """
+    Usernames from a CSV with a 'username' column (e.g. data/developers.csv),
+    a file with one username per line, or a comma-separated string.
+    """
+    if not os.path.exists(source):
+        return [u.strip() for u in source.split(",") if u.strip()]
+    with open(source, newline="") as f:
+        if "username" in next(csv.reader([f.readline()]), []):
+            f.seek(0)
+            return [row["username"].strip() for row in csv.DictReader(f) if row["username"].strip()]
+        f.seek(0)
+        return [line.strip() for line in f if line.strip()]
+
+def _write_json(path: str, data):
+    # Write-then-rename, so a crash never leaves a truncated checkpoint
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+def _save_graph(graph, path: str, patch_store: PatchStore = None):
+    # patch_store: committed between writing and publishing the graph (see PatchStore.commit)
+    tmp = path + ".tmp"
+    graph_format.save_graph(graph, tmp)
+    if patch_store is not None:
+        patch_store.commit()
+    os.replace(tmp, path)
+
+def score_profile(username: str, graph_file: str, convergence_history: list, profile_file: str) -> float:
+    """
+    CPU phase, run in a worker process: confidence for every inferred skill.
+    Writes the profile to `profile_file` and returns the seconds spent.
+    """
+    start = time.perf_counter()
+    graph = graph_format.load_graph(graph_file)
+    if Config.USE_COMPACT_GRAPH:
+        graph = CompactGraph.from_networkx(graph) # Only the frozen view is kept while scoring
+        gc.collect() # The DiGraph is a reference cycle
+    calc = ConfidenceCalculator(graph)
+    _write_json(profile_file, build_profile(graph, username, calc, convergence_history))
+    return time.perf_counter() - start
+
+class BatchRunner:
+    """
+    Profiles a list of developers with resumable per-phase checkpoints.
+    build (GitHub) and explore (LLM) are I/O bound and run on a bounded thread
+    pool sharing one fetcher and one LLM client, so the rate limiters see the whole
+    batch. confidence is CPU bound and runs on a process pool as soon as a user's
+    exploration is done. After each phase the user's state is checkpointed under
+    `checkpoint_dir`; a restarted batch resumes each user at its first unfinished phase.
+    """
+    def __init__(self, iterations: int = 20, io_workers: int = Config.BATCH_IO_WORKERS,
+                 cpu_workers: int = Config.BATCH_CPU_WORKERS, checkpoint_dir: str = Config.BATCH_DIR,
+                 output_dir: str = "output", patch_dir: str = Config.PATCH_STORE_DIR,
+                 fetcher: GitHubFetcher = None, llm_client=None):
+        """
+        output_dir: Where final profiles/graphs go (the layout /profile and /graph read).
+        fetcher, llm_client: Shared by all I/O workers; created on first use if omitted.
+        """
+        self.iterations = iterations
+        self.io_workers = io_workers
+        self.cpu_workers = cpu_workers
+        self.checkpoint_dir = checkpoint_dir
+        self.output_dir = output_dir
+        self.patch_dir = patch_dir
+        self.fetcher = fetcher
+        self.llm = llm_client
+        for d in (checkpoint_dir, output_dir, patch_dir):
+            os.makedirs(d, exist_ok=True)
+
+    def _state_path(self, username: str) -> str:
+        return os.path.join(self.checkpoint_dir, f"{username}.json")
+
+    def _built_path(self, username: str) -> str:
+        return os.path.join(self.checkpoint_dir, f"{username}_built.npz")
+
+    def _patch_path(self, username: str) -> str:
+        return os.path.join(self.patch_dir, f"{username}.bin")
+
+    def graph_path(self, username: str) -> str:
+        return os.path.join(self.output_dir, f"{username}_graph.npz")
+
+    def profile_path(self, username: str) -> str:
+        return os.path.join(self.output_dir, f"{username}_profile.json")
+
+    def load_state(self, username: str) -> dict:
+        """{'done': [phases], 'timings': {phase: seconds}, 'convergence_history': [...]}"""
+        path = self._state_path(username)
+        if not os.path.exists(path):
+            return {"done": [], "timings": {}, "convergence_history": []}
+        with open(path) as f:
+            return json.load(f)
+
+    def _checkpoint(self, username: str, state: dict, phase: str, seconds: float):
+        state["done"].append(phase)
+        state["timings"][phase] = seconds
+        _write_json(self._state_path(username), state)
+
+    def _run_io_phases(self, username: str, state: dict):
+        """build and explore for one user, skipping whichever is already checkpointed."""
+        graph = None
+        if 'build' not in state["done"]:
+            start = time.perf_counter()
+            # Staged until the explored graph is saved; the previous output keeps its patches
+            patch_store = PatchStore(self._patch_path(username), reset=True)
+            graph = HINBuilder(username, fetcher=self.fetcher, patch_store=patch_store).build_raw_topology()
+            patch_store.close()
+            _save_graph(graph, self._built_path(username))
+            self._checkpoint(username, state, 'build', time.perf_counter() - start)
+
+        if 'explore' not in state["done"]:
+            start = time.perf_counter()
+            if graph is None:
+                graph = graph_format.load_graph(self._built_path(username))
+            topology = None
+            if Config.USE_COMPACT_GRAPH:
+                # As in run_pipeline: skills go to an overlay so the DiGraph is not held while exploring
+                topology = CompactGraph.from_networkx(graph)
+                graph = nx.DiGraph()
+                graph.add_nodes_from((n, topology.nodes[n]) for n in topology.nodes_of_type('skill'))
+                gc.collect()
+            patch_store = PatchStore(self._patch_path(username), staged=True, read_only=True)
+            agent = MCTSAgent(graph, self.llm, topology=topology, patch_store=patch_store)
+            if self.iterations > 0:
+                agent.run_exploration(iterations=self.iterations, batch_size=Config.MCTS_BATCH_SIZE,
+                                      workers=Config.MCTS_WORKERS, stopping=StoppingRule.from_config())
+            _save_graph(graph if topology is None else topology.with_overlay(graph),
+                        self.graph_path(username), patch_store)
+            patch_store.close()
+            state["convergence_history"] = agent.convergence_history
+            self._checkpoint(username, state, 'explore', time.perf_counter() - start)
+
+    def run(self, usernames: list) -> dict:
+        """
+        Profiles every user and returns a throughput report (also written to
+        checkpoint_dir/report.json). Users whose profile is already checkpointed
+        are skipped; a failing user is reported and does not stop the batch.
+        """
+        if self.fetcher is None:
+            self.fetcher = GitHubFetcher(cache=GitHubCache() if Config.USE_GITHUB_CACHE else None)
+        if self.llm is None:
+            from .llm_client import LLMClient
+            self.llm = LLMClient()
+
+        start = time.perf_counter()
+        states = {u: self.load_state(u) for u in dict.fromkeys(usernames)}
+        completed, failed, skipped = [], {}, []
+        ran = {phase: [] for phase in PHASES} # Seconds per phase, for phases run by this batch
+
+        # Worker processes are spawned, not forked: forking next to the live I/O threads is unsafe
+        cpu_context = multiprocessing.get_context("spawn")
+        with ThreadPoolExecutor(max_workers=self.io_workers) as io_pool, \
+             ProcessPoolExecutor(max_workers=self.cpu_workers, mp_context=cpu_context) as cpu_pool:
+
+            def submit_confidence(username):
+                return cpu_pool.submit(score_profile, username, self.graph_path(username),
+                                       states[username]["convergence_history"], self.profile_path(username))
+
+            pending = {}
+            for username, state in states.items():
+                if 'confidence' in state["done"]:
+                    skipped.append(username)
+                elif 'explore' in state["done"]:
+                    pending[submit_confidence(username)] = (username, 'cpu')
+                else:
+                    pending[io_pool.submit(self._run_io_phases, username, state)] = (username, 'io')
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    username, kind = pending.pop(future)
+                    state = states[username]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        print(f"[Batch] {username} failed after {state['done'] or 'no phases'}: {e}")
+                        failed[username] = str(e)
+                        continue
+                    if kind == 'io':
+                        pending[submit_confidence(username)] = (username, 'cpu')
+                        continue
+                    self._checkpoint(username, state, 'confidence', result)
+                    completed.append(username)
+                    print(f"[Batch] {username} done ({len(completed)}/{len(states) - len(skipped)})")
+
+        for username in completed:
+            for phase in PHASES:
+                ran[phase].append(states[username]["timings"][phase])
+        elapsed = time.perf_counter() - start
+        report = {
+            "completed": completed,
+            "failed": failed,
+            "skipped": skipped,
+            "elapsed_seconds": elapsed,
+            "profiles_per_hour": len(completed) / elapsed * 3600 if elapsed > 0 else 0.0,
+            # Phases resumed from a checkpoint keep the timing of the run that did them
+            "phase_seconds": {
+                phase: {"mean": sum(t) / len(t), "total": sum(t)} if t else None
+                for phase, t in ran.items()
+            }
+        }
+        _write_json(os.path.join(self.checkpoint_dir, "report.json"), report)
+
+        print(f"\n[Batch] {len(completed)} profiles in {elapsed:.1f}s "
+              f"({report['profiles_per_hour']:.1f} profiles/hour), "
+              f"{len(failed)} failed, {len(skipped)} already done.")
+        for phase, stats in report["phase_seconds"].items():
+            if stats:
+                print(f"  {phase:<10} mean {stats['mean']:.2f}s  total {stats['total']:.1f}s")
+        return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch skill profiling with resumable checkpoints")
+    parser.add_argument("users", help="CSV with a 'username' column, a file of usernames, or a comma-separated list")
+    parser.add_argument("--iterations", type=int, default=20, help="MCTS iterations per developer")
+    parser.add_argument("--io-workers", type=int, default=Config.BATCH_IO_WORKERS, help="Developers fetched/explored concurrently")
+    parser.add_argument("--cpu-workers", type=int, default=Config.BATCH_CPU_WORKERS, help="Processes for the confidence phase")
+    parser.add_argument("--checkpoint-dir", default=Config.BATCH_DIR, help="Where per-phase checkpoints are kept")
+    args = parser.parse_args()
+
+    try:
+        Config.validate()
+    except ValueError as e:
+        print(f"Configuration Error: {e}")
+        return
+    runner = BatchRunner(args.iterations, io_workers=args.io_workers, cpu_workers=args.cpu_workers,
+                         checkpoint_dir=args.checkpoint_dir)
+    runner.run(read_usernames(args.users))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,469 @@
+from collections import deque
+import networkx as nx
+import numpy as np
+
+# Node attributes kept as one list per attribute (most nodes are commits); others go to a per-node dict
+NODE_COLUMNS = ('message', 'date', 'authors', 'description', 'topics', 'languages')
+_ABSENT = object() # Column value of a node without the attribute
+
+class CompactGraph:
+    """
+    Frozen, array-backed HIN for the read-only inference phases.
+    - Node ids are interned to ints: ids[i] <-> index[node_id].
+    - Node and edge types are int8 codes into node_types / edge_types.
+    - Out-edges are CSR arrays (out_ptr, out_dst) with typed columns
+      (out_type, out_weight, out_patch, out_additions), kept in networkx adjacency
+      order so traversals visit neighbors in the same order as on the source DiGraph.
+    - In-edges are a second CSR over edge ids.
+    - Node attributes in NODE_COLUMNS are columns (node_columns); the rest, and edge
+      attributes without a column, are kept only for the nodes/edges that have them
+      (node_extra / edge_extra). Nothing references the source DiGraph's dicts, so it
+      can be dropped once converted; with_overlay() merges later writes (e.g. skills).
+    Implements the subset of the DiGraph read API used by MetaPathWalker,
+    ConfidenceCalculator, MCTSAgent and graph_format.save_graph, plus integer-level accessors.
+    """
+    def __init__(self, ids, node_types, node_type, node_columns, node_extra, edge_types,
+                 out_ptr, out_dst, out_type, out_weight, out_patch, out_additions, edge_extra,
+                 graph_attrs=None):
+        self.ids = ids
+        self.index = {n: i for i, n in enumerate(ids)}
+        self.node_types = node_types # Code -> type name
+        self._node_codes = {name: code for code, name in enumerate(node_types)}
+        self.node_type = node_type
+        self.node_columns = node_columns # Attribute -> per-node values (_ABSENT = not set)
+        self.node_extra = node_extra # Node index -> dict of other attributes
+        self.edge_types = edge_types
+        self._edge_codes = {name: code for code, name in enumerate(edge_types)}
+        self.out_ptr = out_ptr
+        self.out_dst = out_dst
+        self.out_type = out_type
+        self.out_weight = out_weight # NaN = no weight attribute
+        self.out_patch = out_patch # -1 = no patch_id
+        self.out_additions = out_additions # -1 = no additions
+        self.edge_extra = edge_extra # Edge id -> dict of other attributes
+        self.graph = dict(graph_attrs or {})
+        self._filled_weights = {} # default -> weight column with NaN replaced
+
+        n = len(ids)
+        self.out_src = np.repeat(np.arange(n, dtype=np.int32), np.diff(out_ptr))
+        # In-edges: edge ids grouped by destination (stable, so by source order within a group)
+        self.in_edge = np.argsort(out_dst, kind='stable').astype(np.int32)
+        self.in_ptr = np.concatenate([[0], np.cumsum(np.bincount(out_dst, minlength=n))]).astype(np.int64)
+        # Edge lookup: per source row, edge ids sorted by destination for binary search
+        self.lookup_edge = np.lexsort((out_dst, self.out_src)).astype(np.int32)
+        self.lookup_dst = out_dst[self.lookup_edge]
+
+    @staticmethod
+    def _intern(name, names: list, codes: dict) -> int:
+        if name not in codes:
+            codes[name] = len(names)
+            names.append(name)
+        return codes[name]
+
+    @staticmethod
+    def _store_node_attrs(i: int, data: dict, n: int, node_columns: dict, node_extra: dict):
+        for key, value in data.items():
+            if key == 'type':
+                continue
+            if key in NODE_COLUMNS:
+                if key not in node_columns:
+                    node_columns[key] = [_ABSENT] * n
+                node_columns[key][i] = value
+            else:
+                node_extra.setdefault(i, {})[key] = value
+
+    @staticmethod
+    def _edge_extra(data: dict) -> dict:
+        extra = {k: v for k, v in data.items() if k not in ('type', 'weight', 'patch_id', 'additions')}
+        if not isinstance(data.get('additions', 0), int):
+            extra['additions'] = data['additions']
+        return extra
+
+    @classmethod
+    def from_networkx(cls, graph: nx.DiGraph) -> "CompactGraph":
+        ids = list(graph.nodes)
+        index = {n: i for i, n in enumerate(ids)}
+        node_types, node_codes = [], {}
+        edge_types, edge_codes = [], {}
+
+        node_type = np.empty(len(ids), dtype=np.int8)
+        node_columns, node_extra = {}, {}
+        for i, (_, data) in enumerate(graph.nodes(data=True)):
+            node_type[i] = cls._intern(data.get('type'), node_types, node_codes)
+            cls._store_node_attrs(i, data, len(ids), node_columns, node_extra)
+
+        m = graph.number_of_edges()
+        out_ptr = np.zeros(len(ids) + 1, dtype=np.int64)
+        out_dst = np.empty(m, dtype=np.int32)
+        out_type = np.empty(m, dtype=np.int8)
+        out_weight = np.full(m, np.nan)
+        out_patch = np.full(m, -1, dtype=np.int32)
+        out_additions = np.full(m, -1, dtype=np.int32)
+        edge_extra = {}
+        e = 0
+        for i, u in enumerate(ids):
+            for v, data in graph.adj[u].items():
+                out_dst[e] = index[v]
+                out_type[e] = cls._intern(data.get('type'), edge_types, edge_codes)
+                if 'weight' in data:
+                    out_weight[e] = data['weight']
+                if 'patch_id' in data:
+                    out_patch[e] = data['patch_id']
+                if isinstance(data.get('additions'), int):
+                    out_additions[e] = data['additions']
+                extra = cls._edge_extra(data)
+                if extra:
+                    edge_extra[e] = extra
+                e += 1
+            out_ptr[i + 1] = e
+        return cls(ids, node_types, node_type, node_columns, node_extra, edge_types,
+                   out_ptr, out_dst, out_type, out_weight, out_patch, out_additions, edge_extra, graph.graph)
+
+    def with_overlay(self, overlay: nx.DiGraph) -> "CompactGraph":
+        """
+        A new CompactGraph with the nodes and edges of `overlay` (a small DiGraph, e.g.
+        the skills inferred over this view) merged in as if they had been added to the
+        source DiGraph: new nodes are appended, new edges follow their source's existing
+        out-edges, and edges already present are updated with the overlay's attributes.
+        Attributes of nodes already present are kept.
+        """
+        ids = list(self.ids)
+        index = dict(self.index)
+        node_types, node_codes = list(self.node_types), dict(self._node_codes)
+        edge_types, edge_codes = list(self.edge_types), dict(self._edge_codes)
+        new_nodes = [n for n in overlay if n not in index]
+        for n in new_nodes:
+            index[n] = len(ids)
+            ids.append(n)
+
+        node_type = np.concatenate([self.node_type, np.array(
+            [self._intern(overlay.nodes[n].get('type'), node_types, node_codes) for n in new_nodes], dtype=np.int8)])
+        node_columns = {key: column + [_ABSENT] * len(new_nodes) for key, column in self.node_columns.items()}
+        node_extra = dict(self.node_extra)
+        for n in new_nodes:
+            self._store_node_attrs(index[n], overlay.nodes[n], len(ids), node_columns, node_extra)
+
+        m = len(self.out_dst)
+        out_type, out_weight = self.out_type.copy(), self.out_weight.copy()
+        out_patch, out_additions = self.out_patch.copy(), self.out_additions.copy()
+        edge_extra = dict(self.edge_extra)
+        new_edges = [] # (src, dst, type code, weight, patch_id, additions)
+        for u, v, data in overlay.edges(data=True):
+            additions = data['additions'] if isinstance(data.get('additions'), int) else -1
+            e = self.edge_id(index[u], index[v]) if index[u] < len(self.ids) and index[v] < len(self.ids) else -1
+            if e < 0:
+                e = m + len(new_edges)
+                new_edges.append((index[u], index[v], self._intern(data.get('type'), edge_types, edge_codes),
+                                  data.get('weight', np.nan), data.get('patch_id', -1), additions))
+            else:
+                if 'type' in data:
+                    out_type[e] = self._intern(data['type'], edge_types, edge_codes)
+                if 'weight' in data:
+                    out_weight[e] = data['weight']
+                if 'patch_id' in data:
+                    out_patch[e] = data['patch_id']
+                if additions >= 0:
+                    out_additions[e] = additions
+            extra = self._edge_extra(data)
+            if extra:
+                edge_extra[e] = {**edge_extra.get(e, {}), **extra}
+
+
+        columns = list(zip(*new_edges)) or [()] * 6
+        src = np.concatenate([self.out_src, np.array(columns[0], dtype=np.int32)])
+        dst = np.concatenate([self.out_dst, np.array(columns[1], dtype=np.int32)])
+        out_type = np.concatenate([out_type, np.array(columns[2], dtype=np.int8)])
+        out_weight = np.concatenate([out_weight, np.array(columns[3], dtype=float)])
+        out_patch = np.concatenate([out_patch, np.array(columns[4], dtype=np.int32)])
+        out_additions = np.concatenate([out_additions, np.array(columns[5], dtype=np.int32)])
+        # Stable sort by source keeps existing edges first within each row
+        order = np.argsort(src, kind='stable')
+        position = np.empty_like(order)
+        position[order] = np.arange(len(order))
+        out_ptr = np.concatenate([[0], np.cumsum(np.bincount(src, minlength=len(ids)))]).astype(np.int64)
+        return CompactGraph(ids, node_types, node_type, node_columns, node_extra, edge_types,
+                            out_ptr, dst[order], out_type[order], out_weight[order], out_patch[order],
+                            out_additions[order], {int(position[e]): d for e, d in edge_extra.items()}, self.graph)
+
+    # --- Integer-level accessors ---
+
+    def type_code(self, name, edge: bool = False) -> int:
+        """Code of a node (or edge) type name, or -1 if the type does not occur."""
+        codes = self._edge_codes if edge else self._node_codes
+        return codes.get(name, -1)
+
+    def edge_id(self, u: int, v: int) -> int:
+        """Edge id of u -> v (interned ids), or -1."""
+        start, end = self.out_ptr[u], self.out_ptr[u + 1]
+        pos = start + np.searchsorted(self.lookup_dst[start:end], v)
+        if pos < end and self.lookup_dst[pos] == v:
+            return int(self.lookup_edge[pos])
+        return -1
+
+    def weights_or(self, default: float) -> np.ndarray:
+        """Edge weight column with `default` for edges without a weight (cached)."""
+        if default not in self._filled_weights:
+            self._filled_weights[default] = np.where(np.isnan(self.out_weight), default, self.out_weight)
+        return self._filled_weights[default]
+
+    def meta_path_instances(self, start, node_types: list, edge_types: list) -> list:
+        """
+        All walks from `start` following the typed schema, expanded one hop layer at a
+        time over the whole frontier. Returned in the same (depth-first) order as
+        MetaPathWalker's recursive search.
+        """
+        if start not in self.index:
+            return []
+        paths = np.array([[self.index[start]]], dtype=np.int64)
+        for edge_type, node_type in zip(edge_types, node_types[1:]):
+            last = paths[:, -1]
+            starts, counts = self.out_ptr[last], self.out_ptr[last + 1] - self.out_ptr[last]
+            # Edge ids of every frontier row's CSR slice, concatenated in row order
+            offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+            edges = np.repeat(starts, counts) + offsets
+            dst = self.out_dst[edges]
+            keep = (self.out_type[edges] == self.type_code(edge_type, edge=True)) & \
+                   (self.node_type[dst] == self.type_code(node_type))
+            rows = np.repeat(np.arange(len(paths)), counts)[keep]
+            paths = np.hstack([paths[rows], dst[keep][:, None]])
+        ids = self.ids
+        return [[ids[i] for i in row] for row in paths.tolist()]
+
+    def typed_successors(self, node, edge_type: str, node_type: str) -> list:
+        """Successors reached over `edge_type` edges whose type is `node_type` (vectorized filter)."""
+        i = self.index[node]
+        start, end = self.out_ptr[i], self.out_ptr[i + 1]
+        dst = self.out_dst[start:end]
+        mask = (self.out_type[start:end] == self.type_code(edge_type, edge=True)) & \
+               (self.node_type[dst] == self.type_code(node_type))
+        return [self.ids[j] for j in dst[mask].tolist()]
+
+    def nodes_of_type(self, name) -> list:
+        return [self.ids[i] for i in np.flatnonzero(self.node_type == self.type_code(name))]
+
+    def out_weights(self, node, default: float) -> list:
+        """[(successor, weight)] with `default` for edges without a weight."""
+        i = self.index[node]
+        start, end = self.out_ptr[i], self.out_ptr[i + 1]
+        ids = self.ids
+        return [(ids[j], w) for j, w in zip(self.out_dst[start:end].tolist(), self.weights_or(default)[start:end].tolist())]
+
+    def in_weights(self, node, default: float) -> list:
+        """[(predecessor, weight)] with `default` for edges without a weight."""
+        i = self.index[node]
+        edges = self.in_edge[self.in_ptr[i]:self.in_ptr[i + 1]]
+        weights = self.weights_or(default)[edges]
+        return [(self.ids[j], w) for j, w in zip(self.out_src[edges].tolist(), weights.tolist())]
+
+    def shortest_path_lengths(self, source, cutoff: int, reverse: bool = False) -> dict:
+        """BFS hop distances from `source` (along reversed edges if `reverse`), up to `cutoff`."""
+        if source not in self.index:
+            raise nx.NodeNotFound(f"Source {source} is not in G")
+        ptr, nbr = (self.in_ptr, self.out_src[self.in_edge]) if reverse else (self.out_ptr, self.out_dst)
+        dist = {self.index[source]: 0}
+        frontier = [self.index[source]]
+        for depth in range(1, cutoff + 1):
+            next_frontier = []
+            for u in frontier:
+                for v in nbr[ptr[u]:ptr[u + 1]].tolist():
+                    if v not in dist:
+                        dist[v] = depth
+                        next_frontier.append(v)
+            frontier = next_frontier
+        return {self.ids[i]: d for i, d in dist.items()}
+
+    def is_acyclic(self, nodes) -> bool:
+        """Whether the subgraph induced by `nodes` is a DAG (Kahn's algorithm)."""
+        members = {self.index[n] for n in nodes if n in self.index}
+        indegree = dict.fromkeys(members, 0)
+        for u in members:
+            for v in self.out_dst[self.out_ptr[u]:self.out_ptr[u + 1]].tolist():
+                if v in indegree:
+                    indegree[v] += 1
+        queue = deque(u for u, d in indegree.items() if d == 0)
+        visited = 0
+        while queue:
+            u = queue.popleft()
+            visited += 1
+            for v in self.out_dst[self.out_ptr[u]:self.out_ptr[u + 1]].tolist():
+                if v in indegree:
+                    indegree[v] -= 1
+                    if indegree[v] == 0:
+                        queue.append(v)
+        return visited == len(members)
+
+    def simple_paths(self, source, target, cutoff: int):
+        """Simple paths source -> target of at most `cutoff` edges, in nx.all_simple_paths order."""
+        for node in (source, target):
+            if node not in self.index:
+                raise nx.NodeNotFound(f"Node {node} not in graph")
+        t = self.index[target]
+        path = [self.index[source]]
+        on_path = {path[0]}
+
+        def dfs(u):
+            for v in self.out_dst[self.out_ptr[u]:self.out_ptr[u + 1]].tolist():
+                if v in on_path:
+                    continue
+                if v == t:
+                    yield [self.ids[i] for i in path] + [target]
+                elif len(path) < cutoff:
+                    path.append(v)
+                    on_path.add(v)
+                    yield from dfs(v)
+                    path.pop()
+                    on_path.discard(v)
+
+        if path[0] != t:
+            yield from dfs(path[0])
+
+    # --- networkx-compatible read API ---
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __contains__(self, node):
+        return node in self.index
+
+    def number_of_nodes(self) -> int:
+        return len(self.ids)
+
+    def number_of_edges(self) -> int:
+        return len(self.out_dst)
+
+    def has_node(self, node) -> bool:
+        return node in self.index
+
+    def has_edge(self, u, v) -> bool:
+        return u in self.index and v in self.index and self.edge_id(self.index[u], self.index[v]) >= 0
+
+    def _node_data(self, i: int) -> dict:
+        data = {}
+        if self.node_types[self.node_type[i]] is not None:
+            data['type'] = self.node_types[self.node_type[i]]
+        for key, column in self.node_columns.items():
+            if column[i] is not _ABSENT:
+                data[key] = column[i]
+        data.update(self.node_extra.get(i, ()))
+        return data
+
+    def _edge_data(self, e: int) -> dict:
+        data = {}
+        if self.edge_types[self.out_type[e]] is not None:
+            data['type'] = self.edge_types[self.out_type[e]]
+        if not np.isnan(self.out_weight[e]):
+            data['weight'] = float(self.out_weight[e])
+        if self.out_patch[e] >= 0:
+            data['patch_id'] = int(self.out_patch[e])
+        if self.out_additions[e] >= 0:
+            data['additions'] = int(self.out_additions[e])
+        data.update(self.edge_extra.get(e, ()))
+        return data
+
+    @property
+    def nodes(self):
+        return _NodeView(self)
+
+    def successors(self, node):
+        i = self.index[node]
+        return iter([self.ids[j] for j in self.out_dst[self.out_ptr[i]:self.out_ptr[i + 1]].tolist()])
+
+    def predecessors(self, node):
+        i = self.index[node]
+        edges = self.in_edge[self.in_ptr[i]:self.in_ptr[i + 1]]
+        return iter([self.ids[j] for j in self.out_src[edges].tolist()])
+
+    def __getitem__(self, node):
+        return _AdjacencyView(self, self.index[node])
+
+    def get_edge_data(self, u, v, default=None):
+        if u not in self.index or v not in self.index:
+            return default
+        e = self.edge_id(self.index[u], self.index[v])
+        return self._edge_data(e) if e >= 0 else default
+
+    def out_edges(self, nbunch=None, data=False):
+        if nbunch is None:
+            rows = range(len(self.ids))
+        elif nbunch in self.index:
+            rows = [self.index[nbunch]]
+        else:
+            rows = [self.index[n] for n in nbunch]
+        for i in rows:
+            for e in range(self.out_ptr[i], self.out_ptr[i + 1]):
+                v = self.ids[self.out_dst[e]]
+                yield (self.ids[i], v, self._edge_data(e)) if data else (self.ids[i], v)
+
+    edges = out_edges
+
+class _NodeView:
+    def __init__(self, graph: CompactGraph):
+        self._graph = graph
+
+    def __iter__(self):
+        return iter(self._graph.ids)
+
+    def __len__(self):
+        return len(self._graph.ids)
+
+    def __contains__(self, node):
+        return node in self._graph.index
+
+    def __getitem__(self, node):
+        return self._graph._node_data(self._graph.index[node])
+
+    def __call__(self, data=False):
+        if not data:
+            return iter(self._graph.ids)
+        return ((n, self._graph._node_data(i)) for i, n in enumerate(self._graph.ids))
+
+class _AdjacencyView:
+    def __init__(self, graph: CompactGraph, i: int):
+        self._graph = graph
+        self._i = i
+
+    def __iter__(self):
+        return self._graph.successors(self._graph.ids[self._i])
+
+    def __contains__(self, node):
+        return node in self._graph.index and self._graph.edge_id(self._i, self._graph.index[node]) >= 0
+
+    def __getitem__(self, node):
+        e = self._graph.edge_id(self._i, self._graph.index[node]) if node in self._graph.index else -1
+        if e < 0:
+            raise KeyError(node)
+        return self._graph._edge_data(e)
+
+    def items(self):
+        g = self._graph
+        return [(g.ids[g.out_dst[e]], g._edge_data(e)) for e in range(g.out_ptr[self._i], g.out_ptr[self._i + 1])]
+
+# Helpers that run on either a networkx DiGraph or a CompactGraph
+
+def out_weights(graph, node, default: float) -> list:
+    if isinstance(graph, CompactGraph):
+        return graph.out_weights(node, default)
+    return [(v, d.get('weight', default)) for v, d in graph.adj[node].items()]
+
+def in_weights(graph, node, default: float) -> list:
+    if isinstance(graph, CompactGraph):
+        return graph.in_weights(node, default)
+    return [(u, d.get('weight', default)) for u, d in graph.pred[node].items()]
+
+def shortest_path_lengths(graph, source, cutoff: int, reverse: bool = False) -> dict:
+    if isinstance(graph, CompactGraph):
+        return graph.shortest_path_lengths(source, cutoff, reverse)
+    return nx.single_source_shortest_path_length(graph.reverse(copy=False) if reverse else graph, source, cutoff=cutoff)
+
+def is_acyclic(graph, nodes) -> bool:
+    if isinstance(graph, CompactGraph):
+        return graph.is_acyclic(nodes)
+    return nx.is_directed_acyclic_graph(graph.subgraph(nodes))
+
+def all_simple_paths(graph, source, target, cutoff: int):
+    if isinstance(graph, CompactGraph):
+        return graph.simple_paths(source, target, cutoff)
+    return nx.all_simple_paths(graph, source, target, cutoff=cutoff)
@@ -1,12 +1,137 @@
 import networkx as nx
 import numpy as np
+from .compact_graph import all_simple_paths, in_weights, is_acyclic, out_weights, shortest_path_lengths
+from .config import Config
 from .meta_paths import MetaPathWalker, EXPERTISE_PATH
 
+class OpinionBatch:
+    """
+    Array-backed batch of N subjective opinions: an (N, 3) array whose columns are
+    's' (Belief), 'ns' (Disbelief), 'theta' (Uncertainty).
+    Discounting is elementwise; fusion is a tree reduction (see fuse()).
+    """
+    S, NS, THETA = 0, 1, 2
+
+    def __init__(self, masses):
+        self.m = np.atleast_2d(np.asarray(masses, dtype=float))
+        total = self.m.sum(axis=1, keepdims=True)
+        # Renormalize only the rows that drift (same tolerance as MassFunction)
+        drift = np.abs(total - 1.0) > 0.001
+        if drift.any():
+            self.m = np.where(drift, self.m / np.where(total == 0, 1.0, total), self.m)
+
+    def __len__(self):
+        return len(self.m)
+
+    @classmethod
+    def from_beliefs(cls, s, ns=None):
+        """Opinions with the given belief (and disbelief); the rest is uncertainty."""
+        s = np.asarray(s, dtype=float)
+        ns = np.zeros_like(s) if ns is None else np.asarray(ns, dtype=float)
+        return cls(np.stack([s, ns, 1.0 - s - ns], axis=1))
+
+    @property
+    def s(self):
+        return self.m[:, self.S]
+
+    @property
+    def ns(self):
+        return self.m[:, self.NS]
+
+    @property
+    def theta(self):
+        return self.m[:, self.THETA]
+
+    @staticmethod
+    def discount(source, target):
+        """
+        Subjective Logic Discounting Operator (Trust Propogation), row by row.
+        A single-row batch broadcasts against the other operand.
+        """
+        b_s = source.s
+        
+        # SL Discounting Logic
+        new_b = b_s * target.s
+        new_d = b_s * target.ns
+        new_u = (1.0 - b_s) + (b_s * target.theta)
+        
+        return OpinionBatch(np.stack([new_b, new_d, new_u], axis=1))
+
+    @staticmethod
+    def combine(m1, m2):
+        """
+        Yager's Rule of Combination, row by row.
+        Reallocates conflict mass 'K' to Uncertainty (theta) instead of normalizing it away.
+        """
+        # Calculate un-normalized intersections
+        raw_s = m1.s * m2.s + m1.s * m2.theta + m1.theta * m2.s
+        raw_ns = m1.ns * m2.ns + m1.ns * m2.theta + m1.theta * m2.ns
+        raw_theta = m1.theta * m2.theta
+        
+        # Conflict K (Intersection of S and ~S)
+        k_conflict = m1.s * m2.ns + m1.ns * m2.s
+        
+        # Yager's Improvement: Add conflict to theta
+        return OpinionBatch(np.stack([raw_s, raw_ns, raw_theta + k_conflict], axis=1))
+
+    @classmethod
+    def discount_paths(cls, initial, edge_weights, lengths=None):
+        """
+        Discounts an initial opinion along N paths at once.
+        edge_weights: (N, L) array; row i holds the first lengths[i] edge weights of path i
+                      (padding is ignored). Each edge is the opinion (w, 0, 1-w).
+        """
+        edge_weights = np.atleast_2d(np.asarray(edge_weights, dtype=float))
+        n_paths, max_len = edge_weights.shape
+        lengths = np.full(n_paths, max_len) if lengths is None else np.asarray(lengths)
+        opinions = np.broadcast_to(initial.m, (n_paths, 3)).copy()
+        for j in range(max_len):
+            active = j < lengths
+            if not active.any():
+                break
+            w = edge_weights[:, j]
+            step = cls.discount(cls(opinions), cls(np.stack([w, np.zeros_like(w), 1.0 - w], axis=1))).m
+            opinions = np.where(active[:, None], step, opinions)
+        return cls(opinions)
+
+    def fuse(self):
+        """
+        Yager-combines all N opinions in order (m1 ⊕ m2 ⊕ ... ⊕ mN), returned as a 1-row batch.
+        
+        Combining the running state x = (s, ns, theta) with an opinion (a, b, c) is linear:
+            x' = [[a+c, 0, a], [0, b+c, b], [b, a, c]] @ x
+        so the left fold equals a product of 3x3 matrices. Matrix products are
+        associative, hence the fold is computed as a pairwise tree reduction of
+        batched matmuls (log2 N vectorized steps) with the same result as the
+        sequential rule, even though Yager's rule itself is not associative.
+        """
+        if len(self) == 0:
+            raise ValueError("Cannot fuse an empty opinion batch")
+        rest = self.m[1:]
+        a, b, c = rest[:, 0], rest[:, 1], rest[:, 2]
+        zeros = np.zeros_like(a)
+        mats = np.stack([
+            np.stack([a + c, zeros, a], axis=1),
+            np.stack([zeros, b + c, b], axis=1),
+            np.stack([b, a, c], axis=1),
+        ], axis=1) # (N-1, 3, 3), row-major
+        
+        while len(mats) > 1:
+            if len(mats) % 2:
+                mats = np.concatenate([mats, np.eye(3)[None]], axis=0)
+            # Later opinions apply on the left
+            mats = np.matmul(mats[1::2], mats[0::2])
+        state = self.m[0] if len(mats) == 0 else mats[0] @ self.m[0]
+        return OpinionBatch(state)
+
 class MassFunction:
     """
     Represents a Basic Probability Assignment (BPA) / Subjective Opinion.
     Dict keys: 's' (Skill/Belief), 'ns' (Not Skill/Disbelief), 'theta' (Uncertainty)
+    Scalar wrapper around a single-row OpinionBatch.
     """
+    KEYS = ('s', 'ns', 'theta')
+
     def __init__(self, masses: dict):
         self.m = masses
         total = sum(self.m.values())
@@ -17,23 +142,20 @@ class MassFunction:
     def __getitem__(self, key):
         return self.m.get(key, 0.0)
 
+    def to_batch(self) -> OpinionBatch:
+        return OpinionBatch([[self[k] for k in self.KEYS]])
+
+    @classmethod
+    def from_batch(cls, batch: OpinionBatch, row: int = 0):
+        return cls(dict(zip(cls.KEYS, batch.m[row].tolist())))
+
     @staticmethod
     def discount(m_source, m_target):
         """
         Subjective Logic Discounting Operator (Trust Propogation).
         Represents the opinion: Source trusts Target who says Prop is true.
         """
-        b_s = m_source['s']
-        b_t = m_target['s']
-        d_t = m_target['ns']
-        u_t = m_target['theta']
-        
-        # SL Discounting Logic
-        new_b = b_s * b_t
-        new_d = b_s * d_t
-        new_u = (1.0 - b_s) + (b_s * u_t)
-        
-        return MassFunction({'s': new_b, 'ns': new_d, 'theta': new_u})
+        return MassFunction.from_batch(OpinionBatch.discount(m_source.to_batch(), m_target.to_batch()))
 
     @staticmethod
     def combine(m1, m2):
@@ -42,20 +164,7 @@ class MassFunction:
         Reallocates conflict mass 'K' to Uncertainty (theta) instead of normalizing it away.
         Better for KG reasoning where sources are varied but not authoritative.
         """
-        # Calculate un-normalized intersections
-        raw_s = (m1['s'] * m2['s'] + m1['s'] * m2['theta'] + m1['theta'] * m2['s'])
-        raw_ns = (m1['ns'] * m2['ns'] + m1['ns'] * m2['theta'] + m1['theta'] * m2['ns'])
-        raw_theta = (m1['theta'] * m2['theta'])
-        
-        # Conflict K (Intersection of S and ~S)
-        k_conflict = (m1['s'] * m2['ns'] + m1['ns'] * m2['s'])
-        
-        # Yager's Improvement: Add conflict to theta
-        new_s = raw_s
-        new_ns = raw_ns
-        new_theta = raw_theta + k_conflict
-        
-        return MassFunction({'s': new_s, 'ns': new_ns, 'theta': new_theta})
+        return MassFunction.from_batch(OpinionBatch.combine(m1.to_batch(), m2.to_batch()))
 
     def belief(self, hypothesis):
         return self.m.get(hypothesis, 0.0)
@@ -64,83 +173,157 @@ class MassFunction:
         return self.m.get(hypothesis, 0.0) + self.m.get('theta', 0.0)
 
 class ConfidenceCalculator:
-    def __init__(self, graph: nx.DiGraph):
+    PATH_CUTOFF = 5 # Max edges in an evidence path
+    TOP_K = 10 # Evidence paths reported per skill
+
+    def __init__(self, graph: nx.DiGraph, engine: str = Config.CONFIDENCE_ENGINE):
+        """
+        graph: networkx DiGraph or a frozen CompactGraph.
+        engine: 'dp' aggregates path opinions by dynamic programming over the evidence DAG;
+                'enumerate' materializes every simple path (reference implementation).
+        """
         self.graph = graph
         self.walker = MetaPathWalker(graph)
+        self.engine = engine
+
+    def developer_visibility(self, developer_node) -> float:
+        """Total weight of the developer's outgoing edges (PathSim visibility denominator)."""
+        if developer_node not in self.graph:
+            return 0.0
+        return sum(w for _, w in out_weights(self.graph, developer_node, 1.0))
+
+    def affected_skills(self, changed_nodes) -> set:
+        """
+        Returns the skill nodes whose evidence subgraph contains a changed node.
+        Evidence paths run developer -> ... -> skill, so a skill is affected iff it is
+        reachable from a changed node (this also covers its popularity denominator).
+        Does not account for developer visibility, which affects every skill.
+        """
+        affected = set()
+        seen = set()
+        stack = [n for n in changed_nodes if n in self.graph]
+        while stack:
+            node = stack.pop()
+            if node in seen:
+                continue
+            seen.add(node)
+            if self.graph.nodes[node].get('type') == 'skill':
+                affected.add(node)
+            stack.extend(self.graph.successors(node))
+        return affected
 
     def compute_skill_confidence(self, developer_node, skill_node) -> dict:
         """
         Aggregates evidence from all paths using DST.
         """
-        # 1. Find all evidence paths
         # Note: Meta-path walker defines shape, but MCTS added specific 'implies' edges.
-        # We need a meta-path that includes the 'implies' edge.
-        # Let's dynamically construct it or just use simple paths for the prototype.
+        # Evidence paths are all simple paths developer -> skill (up to PATH_CUTOFF edges).
+        dev_belief = self._developer_belief(self.developer_visibility(developer_node))
+        skill_generic_penalty = self._skill_penalty(skill_node)
+
+        if self.engine == 'dp':
+            result = self._aggregate_dp(developer_node, skill_node, dev_belief, skill_generic_penalty)
+            if result is not None:
+                return result
+            # Evidence subgraph is cyclic; only explicit enumeration is exact there
+        return self._aggregate_enumerated(developer_node, skill_node, dev_belief, skill_generic_penalty)
+
+    def compute_all_skill_confidences(self, developer_node, skill_nodes=None) -> dict:
+        """
+        Bulk variant of compute_skill_confidence: {skill_node: metrics} for every skill
+        (or the given subset). With the DP engine this is a single traversal from the
+        developer whose path prefixes are shared by all skills.
+        """
+        if skill_nodes is None:
+            skill_nodes = [n for n, d in self.graph.nodes(data=True) if d.get('type') == 'skill']
+        skill_nodes = list(skill_nodes)
+        dev_belief = self._developer_belief(self.developer_visibility(developer_node))
+        penalties = {sk: self._skill_penalty(sk) for sk in skill_nodes}
+        
+        if self.engine != 'dp':
+            return {
+                sk: self._aggregate_enumerated(developer_node, sk, dev_belief, penalties[sk])
+                for sk in skill_nodes
+            }
         
+        forward = set(shortest_path_lengths(self.graph, developer_node, self.PATH_CUTOFF))
+        if not is_acyclic(self.graph, forward):
+            return {sk: self.compute_skill_confidence(developer_node, sk) for sk in skill_nodes}
+        
+        results, pending = {}, {}
+        stats = self._count_and_top_paths(developer_node, set(skill_nodes), forward, self.TOP_K)
+        for sk in skill_nodes:
+            path_count, top_paths = stats.get(sk, (0, []))
+            if path_count == 0:
+                results[sk] = {'belief': 0.0, 'plausibility': 0.0, 'uncertainty': 1.0}
+                continue
+            n_terms = self._series_terms(dev_belief * penalties[sk], path_count, top_paths[0][0])
+            if n_terms is None:
+                results[sk] = self._aggregate_enumerated(developer_node, sk, dev_belief, penalties[sk])
+            else:
+                pending[sk] = n_terms
+        
+        if pending:
+            # One power-sum pass with enough terms for every skill
+            n_terms = max(pending.values())
+            sums = self._path_power_sums(developer_node, set(pending), forward, n_terms)
+            for sk in pending:
+                path_count, top_paths = stats[sk]
+                results[sk] = self._dp_metrics(dev_belief * penalties[sk], path_count, top_paths, sums[sk])
+        return {sk: results[sk] for sk in skill_nodes}
+
+    @staticmethod
+    def _developer_belief(dev_visibility) -> float:
+        # Start with an initial "Trust" opinion (The Developer's inherent visibility)
+        # Normalizing visibility to a 0-1 belief score
+        return min(0.95, dev_visibility / 100.0) # Heuristic baseline
+
+    def _skill_penalty(self, skill_node) -> float:
+        # Popularity(S): How many nodes point to this skill
+        skill_popularity = sum(w for _, w in in_weights(self.graph, skill_node, 1.0))
+        # Final Normalization Step: Global Popularity of Skill
+        # If a skill is extremely common (Git), we discount the final belief
+        return 1.0 / (1.0 + np.log1p(skill_popularity))
+
+    def _aggregate_enumerated(self, developer_node, skill_node, dev_belief, skill_generic_penalty) -> dict:
+        """Reference engine: materializes every evidence path and fuses them one by one."""
+        # 2. Find all evidence paths
         try:
-            paths = list(nx.all_simple_paths(self.graph, developer_node, skill_node, cutoff=5))
+            paths = list(all_simple_paths(self.graph, developer_node, skill_node, self.PATH_CUTOFF))
         except nx.NetworkXNoPath:
             return {'belief': 0.0, 'plausibility': 0.0, 'uncertainty': 1.0}
 
-        # 2. Calculate Visibility Denominators (PathSim adaptation)
-        # Visibility(D): Total activity of developer in the graph
-        dev_visibility = sum(
-            self.graph[u][v].get('weight', 1.0) 
-            for u, v in self.graph.edges(developer_node)
-        )
-        # Popularity(S): How many nodes point to this skill
-        skill_popularity = sum(
-            self.graph[u][skill_node].get('weight', 1.0)
-            for u in self.graph.predecessors(skill_node)
-        )
-
-        # 3. Convert each path to a Mass Function using Discounting
-        masses = []
-        for path in paths:
-            # We treat the path as a sequence of opinions
-            # Developer trusts Repository -> Repository trusts Commit -> Commit trusts File -> File implies Skill
-            
-            # Start with an initial "Trust" opinion (The Developer's inherent visibility)
-            # Normalizing visibility to a 0-1 belief score
-            dev_belief = min(0.95, dev_visibility / 100.0) # Heuristic baseline
-            path_opinion = MassFunction({'s': dev_belief, 'ns': 0.0, 'theta': 1.0 - dev_belief})
-            
-            # Discount along the path
-            for i in range(len(path) - 1):
-                u, v = path[i], path[i+1]
-                edge_weight = self.graph[u][v].get('weight', 0.5)
-                
-                # Treat each edge as an opinion provided by node 'u' about node 'v'
-                edge_m = MassFunction({'s': edge_weight, 'ns': 0.0, 'theta': 1.0 - edge_weight})
-                path_opinion = MassFunction.discount(path_opinion, edge_m)
-            
-            # Final Normalization Step: Global Popularity of Skill
-            # If a skill is extremely common (Git), we discount the final belief
-            skill_generic_penalty = 1.0 / (1.0 + np.log1p(skill_popularity))
-            final_m = MassFunction({
-                's': path_opinion['s'] * skill_generic_penalty,
-                'ns': path_opinion['ns'],
-                'theta': 1.0 - (path_opinion['s'] * skill_generic_penalty + path_opinion['ns'])
-            })
-            
-            masses.append(final_m)
-
-        if not masses:
+        if not paths:
             return {'belief': 0.0, 'plausibility': 0.0, 'uncertainty': 1.0}
 
+        # 3. Convert each path to an opinion using Discounting (all paths at once)
+        # We treat the path as a sequence of opinions
+        # Developer trusts Repository -> Repository trusts Commit -> Commit trusts File -> File implies Skill
+        lengths = np.array([len(path) - 1 for path in paths])
+        edge_weights = np.zeros((len(paths), lengths.max()))
+        for i, path in enumerate(paths):
+            # Treat each edge as an opinion provided by node 'u' about node 'v'
+            edge_weights[i, :lengths[i]] = [self.graph[u][v].get('weight', 0.5) for u, v in zip(path, path[1:])]
+        initial = OpinionBatch.from_beliefs([dev_belief])
+        path_opinions = OpinionBatch.discount_paths(initial, edge_weights, lengths)
+        
+        final_s = path_opinions.s * skill_generic_penalty
+        masses = OpinionBatch(np.stack([
+            final_s,
+            path_opinions.ns,
+            1.0 - (final_s + path_opinions.ns)
+        ], axis=1))
+
         # 4. Fuse Evidence using Yager's Rule
-        fused = masses[0]
-        for m in masses[1:]:
-            fused = MassFunction.combine(fused, m)
+        fused = MassFunction.from_batch(masses.fuse())
 
         # 5. Prepare detailed path metadata for research trace
         detailed_paths = []
         for i, path in enumerate(paths):
-            m_path = masses[i]
             detailed_paths.append({
                 'path': path,
-                'belief': m_path['s'],
-                'uncertainty': m_path['theta']
+                'belief': float(masses.s[i]),
+                'uncertainty': float(masses.theta[i])
             })
 
         return {
@@ -151,3 +334,133 @@ class ConfidenceCalculator:
             'evidence_paths': detailed_paths[:10], # Limit to top 10 for space
             'math_model': 'Josang-Yager-Hybrid'
         }
+
+    def _aggregate_dp(self, developer_node, skill_node, dev_belief, skill_generic_penalty):
+        """
+        Dynamic-programming engine over the hop layers of the evidence DAG.
+        
+        Every path opinion is (s=c*W(P), ns=0, theta=1-c*W(P)), where W(P) is the product
+        of edge weights and c = dev_belief * penalty. With ns=0 Yager's rule has no conflict,
+        so the fused uncertainty is prod_P (1 - c*W(P)), and
+            log(theta) = -sum_n c^n/n * S_n,   S_n = sum_P W(P)^n,
+        where every power sum S_n is a path-sum computable layer by layer without
+        enumerating paths. The series is truncated once its tail is below 1e-13.
+        Returns None if the evidence subgraph has a cycle (DP would count non-simple walks).
+        """
+        allowed = self._evidence_nodes(developer_node, skill_node)
+        if skill_node not in allowed:
+            return {'belief': 0.0, 'plausibility': 0.0, 'uncertainty': 1.0}
+        if not is_acyclic(self.graph, allowed):
+            return None
+        c = dev_belief * skill_generic_penalty
+        
+        # Pass 1: path count and the top-k heaviest paths
+        path_count, top_paths = self._count_and_top_paths(developer_node, {skill_node}, allowed, self.TOP_K)[skill_node]
+        if path_count == 0:
+            return {'belief': 0.0, 'plausibility': 0.0, 'uncertainty': 1.0}
+        n_terms = self._series_terms(c, path_count, top_paths[0][0])
+        if n_terms is None:
+            return None
+        
+        # Pass 2: power sums S_1..S_N
+        sums = self._path_power_sums(developer_node, {skill_node}, allowed, n_terms)[skill_node]
+        return self._dp_metrics(c, path_count, top_paths, sums)
+
+    @staticmethod
+    def _series_terms(c, path_count, max_weight):
+        """
+        Number of series terms so that the tail, bounded by count * x^(N+1) / (1-x)
+        with x = c * max path weight, stays below 1e-13. None if the series diverges
+        (only possible with edge weights > 1).
+        """
+        x = c * max_weight # Largest single-path belief
+        if x >= 1.0:
+            return None
+        if x <= 0.0:
+            return 1
+        n_terms = int(np.ceil(np.log(1e-13 * (1.0 - x) / path_count) / np.log(x)))
+        return min(max(n_terms, 1), 10000)
+
+    @staticmethod
+    def _dp_metrics(c, path_count, top_paths, sums) -> dict:
+        """Fused metrics from the power sums S_1..S_N of one skill's evidence paths."""
+        n = np.arange(1, len(sums) + 1)
+        log_theta = -np.sum(np.power(c, n) / n * sums)
+        uncertainty = float(np.exp(log_theta))
+        belief = float(-np.expm1(log_theta))
+        
+        detailed_paths = [
+            {'path': path, 'belief': c * weight, 'uncertainty': 1.0 - c * weight}
+            for weight, path in top_paths
+        ]
+        return {
+            'belief': belief,
+            'plausibility': belief + uncertainty,
+            'uncertainty': uncertainty,
+            'path_count': path_count,
+            'evidence_paths': detailed_paths, # Top-k by belief
+            'math_model': 'Josang-Yager-Hybrid'
+        }
+
+    def _evidence_nodes(self, developer_node, skill_node) -> set:
+        """Nodes lying on some developer -> skill walk of at most PATH_CUTOFF edges."""
+        forward = shortest_path_lengths(self.graph, developer_node, self.PATH_CUTOFF)
+        backward = shortest_path_lengths(self.graph, skill_node, self.PATH_CUTOFF, reverse=True)
+        return {n for n, d in forward.items() if n in backward and d + backward[n] <= self.PATH_CUTOFF}
+
+    def _count_and_top_paths(self, source, targets, allowed, top_k) -> dict:
+        """
+        Hop-layered DP from `source`: {target: (path count, top_k paths by weight product)}.
+        Partial paths are shared by every target reached through them.
+        """
+        layer = {source: (1, [(1.0, [source])])}
+        found = {}
+        for _ in range(self.PATH_CUTOFF):
+            next_layer = {}
+            for u, (count, paths) in layer.items():
+                for v, w in out_weights(self.graph, u, 0.5):
+                    if v not in allowed:
+                        continue
+                    entry = next_layer.setdefault(v, [0, []])
+                    entry[0] += count
+                    entry[1].extend((weight * w, path + [v]) for weight, path in paths)
+            layer = {}
+            for v, (count, paths) in next_layer.items():
+                paths.sort(key=lambda p: p[0], reverse=True)
+                layer[v] = (count, paths[:top_k])
+                if v in targets:
+                    entry = found.setdefault(v, [0, []])
+                    entry[0] += count
+                    entry[1].extend(layer[v][1])
+        
+        results = {}
+        for v, (count, best) in found.items():
+            best.sort(key=lambda p: p[0], reverse=True)
+            results[v] = (count, best[:top_k])
+        return results
+
+    def _path_power_sums(self, source, targets, allowed, n_terms) -> dict:
+        """
+        Hop-layered DP of S_n = sum over source -> target paths of W(P)^n, for n = 1..n_terms.
+        Each node carries the vector of power sums of its partial paths.
+        Returns {target: np.ndarray of length n_terms}.
+        """
+        n = np.arange(1, n_terms + 1)
+        layer = {source: np.ones(n_terms)}
+        totals = {t: np.zeros(n_terms) for t in targets}
+        for _ in range(self.PATH_CUTOFF):
+            next_layer = {}
+            for u, sums in layer.items():
+                for v, w in out_weights(self.graph, u, 0.5):
+                    if v not in allowed:
+                        continue
+                    contribution = sums * np.power(w, n)
+                    if v in next_layer:
+                        next_layer[v] += contribution
+                    else:
+                        next_layer[v] = contribution
+            layer = next_layer
+            for t in targets:
+                if t in layer:
+                    totals[t] += layer[t]
+        return totals
@@ -13,6 +13,58 @@ class Config:
     MAX_COMMITS = 100
     MAX_ISSUES = 50
     
+    # GitHub Fetch Parameters
+    GITHUB_BASE_URL = os.getenv("GITHUB_BASE_URL", "https://api.github.com")
+    FETCH_WORKERS = int(os.getenv("FETCH_WORKERS", "8")) # Concurrent API requests in flight
+    GITHUB_MAX_RPS = float(os.getenv("GITHUB_MAX_RPS", "10")) # Ceiling for the shared token bucket
+    USE_GITHUB_CACHE = os.getenv("GITHUB_CACHE", "1") == "1"
+    GITHUB_CACHE_PATH = os.getenv("GITHUB_CACHE_PATH", "output/cache/github.sqlite3")
+    HIN_STREAMING = os.getenv("HIN_STREAMING", "0") == "1" # Overlap fetching, insertion and weighting
+    STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "64")) # Bound between streaming stages
+    PATCH_STORE_DIR = os.getenv("PATCH_STORE_DIR", "output/patches") # Raw patches, kept out of the graph
+    
+    # Exploration Parameters
+    MCTS_BATCH_SIZE = int(os.getenv("MCTS_BATCH_SIZE", "1")) # Leaves evaluated per LLM call
+    MCTS_WORKERS = int(os.getenv("MCTS_WORKERS", "1")) # Concurrent tree-search threads (1 = deterministic)
+    LLM_MAX_RPS = float(os.getenv("LLM_MAX_RPS", "0")) # Shared LLM request ceiling (0 = unlimited)
+    MCTS_MAX_SECONDS = float(os.getenv("MCTS_MAX_SECONDS", "0")) # Wall-clock budget per exploration (0 = none)
+    MCTS_MAX_LLM_CALLS = int(os.getenv("MCTS_MAX_LLM_CALLS", "0")) # LLM round-trip budget (0 = none)
+    MCTS_MAX_TOKENS = int(os.getenv("MCTS_MAX_TOKENS", "0")) # LLM token budget (0 = none)
+    MCTS_CONVERGENCE_WINDOW = int(os.getenv("MCTS_CONVERGENCE_WINDOW", "5")) # Iterations compared for early stop (0 = off)
+    MCTS_REWARD_TOL = float(os.getenv("MCTS_REWARD_TOL", "0.02")) # Max mean-reward shift between windows to stop
+    MCTS_WIDENING_C = float(os.getenv("MCTS_WIDENING_C", "2.0")) # Children a tree node may hold: ceil(C * visits^alpha) (0 = unbounded)
+    MCTS_WIDENING_ALPHA = float(os.getenv("MCTS_WIDENING_ALPHA", "0.5")) # Growth rate of progressive widening
+    
+    # LLM Response Cache Parameters
+    USE_LLM_CACHE = os.getenv("LLM_CACHE", "1") == "1"
+    LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "output/cache/llm.sqlite3")
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000"))
+    LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL_DAYS", "30")) * 86400 # Seconds
+    LLM_CACHE_INCLUDE_PATH = os.getenv("LLM_CACHE_INCLUDE_PATH", "1") == "1" # Reasoning path part of the key
+    
+    # Batch Parameters
+    BATCH_IO_WORKERS = int(os.getenv("BATCH_IO_WORKERS", "4")) # Developers fetched/explored at once
+    BATCH_CPU_WORKERS = int(os.getenv("BATCH_CPU_WORKERS", str(os.cpu_count() or 1))) # Confidence processes
+    BATCH_DIR = os.getenv("BATCH_DIR", "output/batch") # Per-phase checkpoints
+    
+    # Inference Parameters
+    USE_COMPACT_GRAPH = os.getenv("COMPACT_GRAPH", "1") == "1" # Frozen CSR graph for the read-only phases
+    
+    # API Parameters
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "256")) # Cached /graph and /profile bodies
+    RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_MB", "128")) * 2**20 # Bodies plus compressed copies, per process
+    
+    # Job Queue Parameters
+    JOB_DB_PATH = os.getenv("JOB_DB_PATH", "output/jobs.sqlite3") # Shared by API and worker processes
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "1")) # Profiling jobs run concurrently per worker process
+    JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0")) # Seconds between queue polls when idle
+    JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "300")) # Heartbeat age after which a job is requeued
+    JOB_EVENTS_TTL = float(os.getenv("JOB_EVENTS_TTL_HOURS", "24")) * 3600 # Event logs of finished jobs kept this long
+    JOB_EVENT_POLL = float(os.getenv("JOB_EVENT_POLL", "0.5")) # Seconds between event log reads per stream
+    
+    # Confidence Parameters
+    CONFIDENCE_ENGINE = os.getenv("CONFIDENCE_ENGINE", "dp") # 'dp' or 'enumerate'
+    
     @classmethod
     def validate(cls):
         if not cls.GITHUB_TOKEN:
@@ -0,0 +1,69 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from .config import Config
+
+class GitHubCache:
+    """
+    Persistent local cache of raw GitHub payloads (single SQLite file).
+    - commits: immutable commit details, content-addressed by SHA.
+    - responses: mutable resources (user, repo lists, languages, topics, commit
+      listings) keyed by request URL, stored with their ETag for revalidation.
+    Payloads are zlib-compressed JSON.
+    """
+    def __init__(self, path: str = Config.GITHUB_CACHE_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Shared by the fetcher's worker pool; writes are serialized by the lock
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS commits (sha TEXT PRIMARY KEY, payload BLOB, fetched_at REAL)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, etag TEXT, payload BLOB, fetched_at REAL)"
+            )
+
+    @staticmethod
+    def _pack(data) -> bytes:
+        return zlib.compress(json.dumps(data).encode("utf-8"))
+
+    @staticmethod
+    def _unpack(blob: bytes):
+        return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+    def get_commit(self, sha: str):
+        """Returns the cached commit dict for `sha`, or None."""
+        with self.lock:
+            row = self.conn.execute("SELECT payload FROM commits WHERE sha = ?", (sha,)).fetchone()
+        return self._unpack(row[0]) if row else None
+
+    def put_commit(self, sha: str, commit: dict):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO commits VALUES (?, ?, ?)",
+                (sha, self._pack(commit), time.time())
+            )
+
+    def get_response(self, key: str) -> tuple:
+        """Returns (etag, payload) for a cached response, or (None, None)."""
+        with self.lock:
+            row = self.conn.execute("SELECT etag, payload FROM responses WHERE key = ?", (key,)).fetchone()
+        if not row:
+            return None, None
+        return row[0], self._unpack(row[1])
+
+    def put_response(self, key: str, etag: str, payload):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, etag, self._pack(payload), time.time())
+            )
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -1,227 +1,536 @@
 import networkx as nx
+import numpy as np
+import scipy.sparse as sp
 from github import Github, GithubException
 from tqdm import tqdm
+import json
+import os
 import time
+import queue
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from datetime import datetime
+from urllib.parse import urlencode
 from .config import Config
-from .tfidf import TFIDFCalculator
+from .github_cache import GitHubCache
+from .patch_store import PatchStore
+from .rate_limiter import TokenBucket
+from .tfidf import StreamingTFIDF, TFIDFCalculator
 
 class GitHubFetcher:
     """
     Handles interactions with the GitHub API to retrieve raw data for the HIN.
-    Implements rate limiting and partial data fetching.
+    Requests are issued from a bounded worker pool and throttled by a shared
+    token bucket driven by GitHub's rate-limit headers. With a GitHubCache,
+    commits are served by SHA and mutable resources are revalidated by ETag.
     """
-    def __init__(self):
-        Config.validate()
-        self.client = Github(Config.GITHUB_TOKEN, timeout=60)
+    def __init__(self, client: Github = None, max_workers: int = Config.FETCH_WORKERS,
+                 max_rps: float = Config.GITHUB_MAX_RPS, cache: GitHubCache = None):
+        if client is None:
+            Config.validate()
+            # PyGithub's built-in request spacing (0.25s, global) would serialize the pool,
+            # so it is disabled here and throttling is left to the token bucket.
+            client = Github(
+                Config.GITHUB_TOKEN,
+                base_url=Config.GITHUB_BASE_URL,
+                timeout=60,
+                pool_size=max_workers,
+                seconds_between_requests=None
+            )
+        self.client = client
+        self.max_workers = max_workers
+        self.rate_limiter = TokenBucket(rate=max_rps, capacity=max(1, max_workers))
+        self.cache = cache
         self.user_cache = {}
 
+    def _get_json(self, path: str, params: dict = None, cache_response: bool = True):
+        """
+        GETs a REST resource (path relative to the API base URL).
+        Cached copies are revalidated with If-None-Match; a 304 costs no quota
+        and returns the cached payload.
+        cache_response: False for resources the caller caches in its own form.
+        """
+        key = path + ("?" + urlencode(sorted(params.items())) if params else "")
+        etag, cached = self.cache.get_response(key) if self.cache and cache_response else (None, None)
+        headers = {"If-None-Match": etag} if etag else None
+        
+        self.rate_limiter.acquire()
+        status, resp_headers, body = self.client.requester.requestJson("GET", path, params, headers)
+        if "x-ratelimit-remaining" in resp_headers and "x-ratelimit-reset" in resp_headers:
+            self.rate_limiter.update_from_headers(
+                int(float(resp_headers["x-ratelimit-remaining"])),
+                float(resp_headers["x-ratelimit-reset"])
+            )
+        
+        if status == 304 and etag:
+            return cached
+        data = json.loads(body) if body else None
+        if status >= 400:
+            raise GithubException(status, data, resp_headers)
+        if self.cache and cache_response and resp_headers.get("etag"):
+            self.cache.put_response(key, resp_headers["etag"], data)
+        return data
+
     def get_user_data(self, username: str) -> dict:
         """
         Fetches basic user profile data.
         """
         try:
-            user = self.client.get_user(username)
+            user = self._get_json(f"/users/{username}")
             return {
-                "login": user.login,
-                "name": user.name,
-                "created_at": user.created_at.isoformat(),
-                "bio": user.bio,
-                "public_repos": user.public_repos
+                "login": user["login"],
+                "name": user.get("name"),
+                "created_at": datetime.fromisoformat(user["created_at"]).isoformat(),
+                "bio": user.get("bio"),
+                "public_repos": user.get("public_repos")
             }
         except GithubException as e:
             print(f"Error fetching user {username}: {e}")
             return {}
 
-    def get_top_repos(self, username: str, limit: int = Config.MAX_REPOS) -> list:
+    def get_top_repos(self, username: str, limit: int = Config.MAX_REPOS, known=None) -> list:
         """
         Fetches top N repositories sorted by updated_at time (recency).
         Rationale: Recent activity is more relevant for current skill inference.
+        known: Optional predicate on the repo full name. Known repos skip the
+               languages/topics calls and come back with those fields set to None.
         """
-        user = self.client.get_user(username)
-        # Optimization: Fetch 100 per page to minimize pagination calls
-        repos = user.get_repos(sort="updated", direction="desc")
-        
-        results = []
+        selected = []
         # Use total=None because we might skip forks
-        pbar = tqdm(repos, desc="Scanning Repos", total=limit*2) 
+        pbar = tqdm(desc="Scanning Repos", total=limit*2) 
         
-        for repo in pbar:
-            if len(results) >= limit:
-                pbar.close()
+        page = 1
+        while len(selected) < limit:
+            # Optimization: Fetch 100 per page to minimize pagination calls
+            repos = self._get_json(
+                f"/users/{username}/repos",
+                {"sort": "updated", "direction": "desc", "per_page": 100, "page": page}
+            )
+            if not repos:
                 break
+            for repo in repos:
+                if len(selected) >= limit:
+                    break
+                pbar.update(1)
+                pbar.set_description(f"Checking {repo['name'][:20]}")
                 
-            pbar.set_description(f"Checking {repo.name[:20]}")
-            
-            if repo.fork:
-                continue 
-                
+                if repo.get("fork"):
+                    continue 
+                selected.append(repo)
+            page += 1
+        pbar.close()
+
+        # Languages/topics are two extra calls per repo; fetch them across the pool
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            return list(pool.map(
+                lambda repo: self._get_repo_metadata(repo, fetch=not (known and known(repo["full_name"]))),
+                selected
+            ))
+
+    def _get_repo_metadata(self, repo: dict, fetch: bool = True) -> dict:
+        full_name = repo["full_name"]
+        languages, topics = self._get_repo_details(repo) if fetch else (None, None)
+        return {
+            "name": full_name,
+            "language": repo.get("language"),
+            "languages": languages,
+            "topics": topics,
+            "stars": repo.get("stargazers_count", 0),
+            "description": repo.get("description")
+        }
+
+    def _get_repo_details(self, repo: dict) -> tuple:
+        full_name = repo["full_name"]
+        try:
+            # Wrap in broad try-except to prevent hanging on secondary calls
+            languages = self._get_json(f"/repos/{full_name}/languages") # API Call
+            topics = self._get_json(f"/repos/{full_name}/topics")["names"] # API Call
+        except Exception as e:
+            print(f"\n[Warning] Skipped metadata for {repo['name']}: {e}")
+            # Fallback implementation
+            languages, topics = {}, []
+        return languages, topics
+
+    def _list_commits(self, repo_name: str, author: str, limit: int) -> list:
+        """
+        Lists commit SHAs authored by the target user, newest first.
+        One API call per page (revalidated by ETag); file details are fetched separately.
+        """
+        per_page = min(100, limit)
+        shas = []
+        page = 1
+        try:
+            while len(shas) < limit:
+                commits = self._get_json(
+                    f"/repos/{repo_name}/commits",
+                    {"author": author, "per_page": per_page, "page": page}
+                )
+                if not commits:
+                    break
+                shas.extend(c["sha"] for c in commits)
+                if len(commits) < per_page:
+                    break
+                page += 1
+        except GithubException as e:
+            print(f"Error fetching commits for {repo_name}: {e}")
+        return shas[:limit]
+
+    def _fetch_commit_details(self, repo_name: str, sha: str) -> dict:
+        """
+        Fetches the files (patch/diff) of a single commit.
+        Commits are immutable, so a cached copy is returned without any request.
+        Note: getting files for every commit is expensive (N+1 API calls), hence the cache and the pool.
+        Returns None if the commit could not be fetched.
+        """
+        if self.cache:
+            cached = self.cache.get_commit(sha)
+            if cached is not None:
+                return cached
+
+        # Retry logic for fetching files (network sensitive)
+        max_retries = 3
+        for attempt in range(1, max_retries + 1):
             try:
-                # Add explicit timeouts for secondary calls if possible, 
-                # or just wrap in broad try-except to prevent hanging
-                results.append({
-                    "name": repo.full_name,
-                    "language": repo.language,
-                    "languages": repo.get_languages(), # API Call
-                    "topics": repo.get_topics(), # API Call
-                    "stars": repo.stargazers_count,
-                    "description": repo.description,
-                    "object": repo 
-                })
+                # Only the trimmed copy is cached (by SHA), not the raw payload with every patch
+                commit = self._get_json(f"/repos/{repo_name}/commits/{sha}", cache_response=False)
+                result = {
+                    "sha": commit["sha"],
+                    "date": datetime.fromisoformat(commit["commit"]["author"]["date"]).isoformat(),
+                    "message": commit["commit"]["message"],
+                    "files": [{
+                        "filename": f["filename"],
+                        "status": f["status"],
+                        "additions": f["additions"],
+                        "deletions": f["deletions"],
+                        "patch": f.get("patch") or "" # The actual code diff
+                    } for f in commit.get("files", [])]
+                }
+                if self.cache:
+                    self.cache.put_commit(sha, result)
+                return result
             except Exception as e:
-                print(f"\n[Warning] Skipped metadata for {repo.name}: {e}")
-                # Fallback implementation
-                results.append({
-                    "name": repo.full_name,
-                    "language": repo.language,
-                    "languages": {},
-                    "topics": [],
-                    "stars": repo.stargazers_count,
-                    "description": repo.description,
-                    "object": repo
-                })
-        return results
+                print(f"    [Warning] Timeout fetching commit {sha[:7]}. Retrying ({attempt}/{max_retries})...")
+                time.sleep(2 ** attempt) # Exponential backoff
+        
+        print(f"    [Error] Skipping commit {sha[:7]} after {max_retries} failures.")
+        return None
 
-    def get_commits(self, repo_obj, author: str, limit: int = Config.MAX_COMMITS) -> list:
+    def get_commits(self, repo_name: str, author: str, limit: int = Config.MAX_COMMITS) -> list:
         """
         Fetches commits for a specific repository authored by the target user.
         Includes stats (additions/deletions) and files modified.
         """
-        commits = repo_obj.get_commits(author=author)
-        results = []
+        return self.get_commits_for_repos([repo_name], author, limit)[repo_name]
+
+    def _fetch_or_stub(self, repo_name: str, sha: str, known) -> dict:
+        # Commits the caller already holds are not fetched again; a stub keeps their place
+        if known and known(sha):
+            return {"sha": sha, "files": None}
+        return self._fetch_commit_details(repo_name, sha)
+
+    def get_commits_for_repos(self, repo_names: list, author: str, limit: int = Config.MAX_COMMITS,
+                              known=None) -> dict:
+        """
+        Fetches commits for many repositories concurrently over a single worker pool.
+        Commit listings and per-commit file fetches from all repos share the pool and
+        the rate limiter. Returns {repo_full_name: [commit_dict, ...]} in API order.
+        known: Optional predicate on the SHA; known commits are returned as
+               {"sha": ..., "files": None} stubs without a details request.
+        """
+        results = {name: [] for name in repo_names}
         
-        try:
-            # We use a manual index because PyGithub PaginatedList can be flaky during iteration
-            for i in range(limit):
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            listings = {pool.submit(self._list_commits, name, author, limit): name for name in repo_names}
+            detail_futures = {}
+            # Schedule detail fetches as soon as each repo's listing lands
+            for listing in as_completed(listings):
+                name = listings[listing]
                 try:
-                    commit = commits[i]
-                except Exception: # Catch EVERYTHING (IndexError, GithubException, etc.)
-                    break
-                # We need detailed data for tf-idf (patch/diff)
-                # Note: getting files for every commit is expensive (N+1 API calls)
-                # Optimization: We sleep briefly to avoid secondary rate limits
-                time.sleep(0.25)
-                
-                # Retry logic for fetching files (network sensitive)
-                files_data = []
-                attempts = 0
-                max_retries = 3
-                success = False
-                
-                while attempts < max_retries and not success:
-                    try:
-                        for f in commit.files:
-                            files_data.append({
-                                "filename": f.filename,
-                                "status": f.status,
-                                "additions": f.additions,
-                                "deletions": f.deletions,
-                                "patch": f.patch if f.patch else "" # The actual code diff
-                            })
-                        success = True
-                    except Exception as e:
-                        attempts += 1
-                        print(f"    [Warning] Timeout fetching commit {commit.sha[:7]}. Retrying ({attempts}/{max_retries})...")
-                        time.sleep(2 ** attempts) # Exponential backoff
-                
-                if not success:
-                    print(f"    [Error] Skipping commit {commit.sha[:7]} after {max_retries} failures.")
+                    shas = listing.result()
+                except Exception as e:
+                    print(f"Warning: Failed to fetch commits for {name}: {e}")
                     continue
-
-                results.append({
-                    "sha": commit.sha,
-                    "date": commit.commit.author.date.isoformat(),
-                    "message": commit.commit.message,
-                    "files": files_data
-                })
-        except GithubException as e:
-            print(f"Error fetching commits for {repo_obj.full_name}: {e}")
+                detail_futures[name] = [pool.submit(self._fetch_or_stub, name, sha, known) for sha in shas]
             
+            for name, futures in detail_futures.items():
+                for future in futures:
+                    commit = future.result()
+                    if commit is not None:
+                        results[name].append(commit)
         return results
 
+    def iter_commits_for_repos(self, repo_names: list, author: str, limit: int = Config.MAX_COMMITS,
+                               max_pending: int = None, known=None):
+        """
+        Streaming counterpart of get_commits_for_repos: yields (repo_full_name, commit_dict)
+        as soon as each commit's details land (completion order, not API order).
+        At most `max_pending` detail fetches are in flight, so a slow consumer
+        applies backpressure instead of letting results pile up.
+        known: As in get_commits_for_repos.
+        """
+        max_pending = max_pending or 2 * self.max_workers
+        pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        try:
+            listings = {pool.submit(self._list_commits, name, author, limit): name for name in repo_names}
+            queued = deque() # (repo, sha) waiting for a free slot
+            in_flight = {}
+            while listings or queued or in_flight:
+                while queued and len(in_flight) < max_pending:
+                    name, sha = queued.popleft()
+                    in_flight[pool.submit(self._fetch_or_stub, name, sha, known)] = name
+                
+                done, _ = wait(list(listings) + list(in_flight), return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in listings:
+                        name = listings.pop(future)
+                        try:
+                            queued.extend((name, sha) for sha in future.result())
+                        except Exception as e:
+                            print(f"Warning: Failed to fetch commits for {name}: {e}")
+                        continue
+                    name = in_flight.pop(future)
+                    commit = future.result()
+                    if commit is not None:
+                        yield name, commit
+        finally:
+            # Also reached when the consumer stops early
+            pool.shutdown(wait=True, cancel_futures=True)
+
 class HINBuilder:
-    def __init__(self, username: str):
+    def __init__(self, username: str, fetcher: GitHubFetcher = None, graph: nx.DiGraph = None,
+                 patch_store: PatchStore = None, shared: bool = False):
+        """
+        graph: A previously built HIN to update in place (incremental re-profiling).
+               Existing repos/commits are kept; only unseen ones are merged in.
+        patch_store: Where raw patches go (edges only keep a patch_id). Defaults to
+                     output/patches/{username}.bin, reset unless updating a graph.
+        shared: `graph` is a multi-developer HIN (see SharedHIN). Repos and commits
+                already in it are not fetched again, nor re-weighted.
+        """
         self.username = username
-        self.fetcher = GitHubFetcher()
-        self.graph = nx.DiGraph()
+        self.shared = shared
+        if fetcher is None:
+            fetcher = GitHubFetcher(cache=GitHubCache() if Config.USE_GITHUB_CACHE else None)
+        self.fetcher = fetcher
+        if patch_store is None:
+            patch_store = PatchStore(os.path.join(Config.PATCH_STORE_DIR, f"{username}.bin"), reset=graph is None)
+        self.patch_store = patch_store
+        self.graph = graph if graph is not None else nx.DiGraph()
+        self.graph.graph['patch_store'] = patch_store.path
         self.tfidf = TFIDFCalculator()
+        self.new_nodes = set() # Nodes added by the last build (the exploration frontier)
         
-    def build_raw_topology(self):
+    def build_raw_topology(self, streaming: bool = Config.HIN_STREAMING):
         """
         Phase 1 of construction: Fetch data and build nodes/edges without advanced weights.
+        When updating an existing graph, commits already present are skipped and
+        only new 'modifies' edges are weighted.
+        streaming: Build through iter_build() (bounded memory, overlapping stages).
         """
+        if streaming:
+            for _ in self.iter_build():
+                pass
+            return self.graph
+        
         print(f"--- Starting HIN Construction for {self.username} ---")
+        self.new_nodes = set()
         
         # 1. Developer Node
-        user_data = self.fetcher.get_user_data(self.username)
-        self.graph.add_node(
-            f"dev:{self.username}", 
-            type="developer", 
-            **user_data
-        )
+        self._add_developer()
         
-        all_commits_data = [] # Store for TF-IDF training
+        corpus = [] # Preprocessed commit documents for TF-IDF training
+        pending_edges = [] # (commit, file) edges awaiting a weight
+        pending_texts = [] # Their preprocessed patches, weighted in one batch
 
         # 2. Repo Nodes
-        repos = self.fetcher.get_top_repos(self.username)
+        known_repos, known_commits = self._known()
+        repos = self.fetcher.get_top_repos(self.username, known=known_repos)
+        # Commit details for all repos are fetched concurrently up front
+        commits_by_repo = self.fetcher.get_commits_for_repos(
+            [repo['name'] for repo in repos], self.username, known=known_commits
+        )
         for repo in repos:
-            repo_node_id = f"repo:{repo['name']}"
-            self.graph.add_node(
-                repo_node_id, 
-                type="repository",
-                language=repo['language'],
-                languages=repo.get('languages', {}),
-                topics=repo.get('topics', []),
-                description=repo.get('description', ''),
-                stars=repo['stars']
-            )
-            self.graph.add_edge(f"dev:{self.username}", repo_node_id, type="contributes", weight=1.0)
+            repo_node_id = self._add_repo(repo)
             
             # 3. Commit Nodes
-            try:
-                commits = self.fetcher.get_commits(repo['object'], self.username)
-                all_commits_data.extend(commits) # Collect raw data
-            except Exception as e:
-                print(f"Warning: Failed to fetch commits for {repo['name']}: {e}")
-                continue
-            
-            for commit in commits:
-                commit_node_id = f"commit:{commit['sha'][:7]}"
-                self.graph.add_node(
-                    commit_node_id,
-                    type="commit",
-                    message=commit['message'],
-                    date=commit['date']
-                )
-                self.graph.add_edge(repo_node_id, commit_node_id, type="contains", weight=1.0)
+            for commit in commits_by_repo.get(repo['name'], []):
+                if commit['files'] is None:
+                    # Already in the shared graph: only authorship is merged
+                    self._add_commit(repo_node_id, commit)
+                    continue
+                # Each patch is cleaned once, for both fitting and weighting
+                cleaned = self.tfidf.preprocess_patches([f['patch'] for f in commit['files']])
+                corpus.append(" ".join(cleaned))
                 
-                # 4. File Nodes
-                for f in commit['files']:
-                    file_node_id = f"file:{f['filename']}"
-                    # Add file node if not exists (files are shared across commits)
-                    if not self.graph.has_node(file_node_id):
-                        self.graph.add_node(file_node_id, type="file")
-                    
-                    # Edge: Commit -> File (modifies)
-                    # We store the patch size here for later TF-IDF/Weight calc
-                    self.graph.add_edge(
-                        commit_node_id, 
-                        file_node_id, 
-                        type="modifies",
-                        additions=f['additions'],
-                        patch_content=f['patch'] # Raw patch stored on edge
-                    )
-        
-        print(f"--- Toplogy Built. Nodes: {self.graph.number_of_nodes()} ---")
+                _, new_edges = self._add_commit(repo_node_id, commit)
+                pending_edges.extend(new_edges)
+                if new_edges:
+                    pending_texts.extend(cleaned)
+        
+        print(f"--- Toplogy Built. Nodes: {self.graph.number_of_nodes()} (new: {len(self.new_nodes)}) ---")
         
         # Phase 2: Compute TF-IDF Weights
         print("--- Computing TF-IDF Semantic Weights ---")
-        self.tfidf.fit_corpus(all_commits_data)
+        self.tfidf.fit_documents(corpus)
         
-        for u, v, data in self.graph.edges(data=True):
-            if data.get('type') == 'modifies':
-                patch = data.get('patch_content', '')
-                weight = self.tfidf.compute_weight(patch)
-                self.graph[u][v]['weight'] = weight
+        # Edges weighted by a previous run keep their weight; only new ones are pending
+        weights = self.tfidf.compute_weights(pending_texts, preprocessed=True)
+        for (u, v), weight in zip(pending_edges, weights):
+            self.graph[u][v]['weight'] = float(weight)
+        self.patch_store.flush()
                 
         print("--- Graph Construction Complete ---")
         return self.graph
+
+    def iter_build(self, queue_size: int = Config.STREAM_QUEUE_SIZE):
+        """
+        Streaming construction. Yields node ids as they are merged into the graph.
+        Stages run concurrently with bounded queues between them:
+          fetch (worker pool) -> graph insertion (this generator)
+          -> patch preprocessing + online TF-IDF statistics (background thread).
+        Only term counts of pending patches are retained; 'modifies' weights are
+        assigned once the stream is drained.
+        """
+        print(f"--- Streaming HIN Construction for {self.username} ---")
+        self.new_nodes = set()
+        stats = StreamingTFIDF()
+        patches = queue.Queue(maxsize=queue_size)
+        pending = {"edges": [], "counts": [], "nonempty": []}
+        errors = []
+        
+        def preprocess_stage():
+            while True:
+                item = patches.get()
+                if item is None:
+                    return
+                raw, new_edges = item
+                try:
+                    cleaned = self.tfidf.preprocess_patches(raw)
+                    stats.partial_fit([" ".join(cleaned)])
+                    if new_edges:
+                        counts, nonempty = stats.count(cleaned)
+                        pending["edges"].extend(new_edges)
+                        pending["counts"].append(counts)
+                        pending["nonempty"].append(nonempty)
+                except Exception as e:
+                    errors.append(e)
+        
+        worker = threading.Thread(target=preprocess_stage, daemon=True)
+        worker.start()
+        try:
+            yield self._add_developer()
+            
+            repos = {}
+            known_repos, known_commits = self._known()
+            for repo in self.fetcher.get_top_repos(self.username, known=known_repos):
+                repos[repo['name']] = self._add_repo(repo)
+                yield repos[repo['name']]
+            
+            for repo_name, commit in self.fetcher.iter_commits_for_repos(list(repos), self.username,
+                                                                         max_pending=queue_size,
+                                                                         known=known_commits):
+                added, new_edges = self._add_commit(repos[repo_name], commit)
+                if commit['files'] is not None:
+                    # Blocks when preprocessing falls behind, which in turn stalls fetching
+                    patches.put(([f['patch'] for f in commit['files']], new_edges))
+                yield from added
+        finally:
+            patches.put(None)
+            worker.join()
+        if errors:
+            raise errors[0]
+        
+        print(f"--- Toplogy Streamed. Nodes: {self.graph.number_of_nodes()} (new: {len(self.new_nodes)}) ---")
+        if pending["edges"]:
+            weights = stats.compute_weights(sp.vstack(pending["counts"]), np.concatenate(pending["nonempty"]))
+            for (u, v), weight in zip(pending["edges"], weights):
+                self.graph[u][v]['weight'] = float(weight)
+        self.patch_store.flush()
+        print("--- Graph Construction Complete ---")
+
+    def _known(self) -> tuple:
+        """
+        (repo predicate, commit predicate) for the fetcher: in a shared graph,
+        repos/commits present before this build are not fetched again.
+        Snapshots, so fetch workers never read the graph while it is being written.
+        """
+        if not self.shared:
+            return None, None
+        repos = {n[len("repo:"):] for n in self.graph if n.startswith("repo:")}
+        commits = {n for n in self.graph if n.startswith("commit:")}
+        return repos.__contains__, lambda sha: f"commit:{sha[:7]}" in commits
+
+    def _add_developer(self) -> str:
+        dev_node_id = f"dev:{self.username}"
+        user_data = self.fetcher.get_user_data(self.username)
+        self.graph.add_node(
+            dev_node_id, 
+            type="developer", 
+            **user_data
+        )
+        return dev_node_id
+
+    def _add_repo(self, repo: dict) -> str:
+        repo_node_id = f"repo:{repo['name']}"
+        if not self.graph.has_node(repo_node_id):
+            self.new_nodes.add(repo_node_id)
+        # Metadata (stars, topics) is refreshed even for known repos,
+        # unless the fetcher skipped languages/topics for a repo the shared graph has
+        details = {"languages": repo.get('languages', {}), "topics": repo.get('topics', [])}
+        self.graph.add_node(
+            repo_node_id, 
+            type="repository",
+            language=repo['language'],
+            description=repo.get('description', ''),
+            stars=repo['stars'],
+            **{k: v for k, v in details.items() if v is not None}
+        )
+        self.graph.add_edge(f"dev:{self.username}", repo_node_id, type="contributes", weight=1.0)
+        return repo_node_id
+
+    def _add_commit(self, repo_node_id: str, commit: dict) -> tuple:
+        """
+        Merges a commit and the files it modifies.
+        Returns (added node ids, new unweighted 'modifies' edges in file order).
+        """
+        commit_node_id = f"commit:{commit['sha'][:7]}"
+        if self.graph.has_node(commit_node_id) and commit_node_id not in self.new_nodes:
+            # Merged by a previous run or another developer; commits are immutable
+            authors = self.graph.nodes[commit_node_id].setdefault('authors', [])
+            if self.username not in authors:
+                authors.append(self.username)
+            self.graph.add_edge(repo_node_id, commit_node_id, type="contains", weight=1.0)
+            return [], []
+        added = [commit_node_id]
+        self.new_nodes.add(commit_node_id)
+        self.graph.add_node(
+            commit_node_id,
+            type="commit",
+            message=commit['message'],
+            date=commit['date'],
+            authors=[self.username]
+        )
+        self.graph.add_edge(repo_node_id, commit_node_id, type="contains", weight=1.0)
+        
+        # 4. File Nodes
+        new_edges = []
+        for f in commit['files']:
+            file_node_id = f"file:{f['filename']}"
+            # Add file node if not exists (files are shared across commits)
+            if not self.graph.has_node(file_node_id):
+                self.graph.add_node(file_node_id, type="file")
+                self.new_nodes.add(file_node_id)
+                added.append(file_node_id)
+            
+            # Edge: Commit -> File (modifies)
+            # The raw patch goes to the patch store; the edge keeps its id
+            self.graph.add_edge(
+                commit_node_id, 
+                file_node_id, 
+                type="modifies",
+                additions=f['additions'],
+                patch_id=self.patch_store.put(commit_node_id, file_node_id, f['patch'])
+            )
+            new_edges.append((commit_node_id, file_node_id))
+        return added, new_edges
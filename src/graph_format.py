@@ -0,0 +1,148 @@
+import json
+import zipfile
+import networkx as nx
+import numpy as np
+
+FORMAT_VERSION = 1
+
+# Columns written by save_graph. Strings are stored as one UTF-8 buffer plus
+# offsets ('<col>.data' / '<col>.offsets'); nothing is pickled.
+STRING_COLUMNS = ['node_id', 'node_label', 'node_attrs', 'node_type_names', 'edge_type_names',
+                  'edge_attrs', 'graph_attrs']
+ARRAY_COLUMNS = ['version', 'node_type', 'edge_src', 'edge_dst', 'edge_type', 'edge_weight', 'edge_patch']
+
+def _pack_strings(values: list) -> tuple:
+    encoded = [v.encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in encoded])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+def _unpack_strings(data, offsets) -> list:
+    buffer = bytes(data)
+    bounds = offsets.tolist()
+    return [buffer[bounds[i]:bounds[i + 1]].decode("utf-8") for i in range(len(bounds) - 1)]
+
+def _intern(values: list) -> tuple:
+    names = list(dict.fromkeys(values))
+    codes = {name: i for i, name in enumerate(names)}
+    return np.array([codes[v] for v in values], dtype=np.int8), names
+
+def save_graph(graph: nx.DiGraph, path: str):
+    """
+    Writes the HIN as an uncompressed .npz of typed columns (version FORMAT_VERSION).
+    Type, weight and patch id are dedicated columns; remaining attributes are
+    JSON per node/edge. `node_label` is precomputed for the visualization.
+    """
+    ids = list(graph.nodes)
+    index = {n: i for i, n in enumerate(ids)}
+    node_type, node_type_names = _intern([d.get('type') or '' for _, d in graph.nodes(data=True)])
+    labels, node_attrs = [], []
+    for _, d in graph.nodes(data=True):
+        labels.append(str(d.get('name') or d.get('login') or ''))
+        extra = {k: v for k, v in d.items() if k != 'type'}
+        node_attrs.append(json.dumps(extra, default=str) if extra else "")
+
+    edges = list(graph.edges(data=True))
+    edge_type, edge_type_names = _intern([d.get('type') or '' for _, _, d in edges])
+    edge_attrs = []
+    for _, _, d in edges:
+        extra = {k: v for k, v in d.items() if k not in ('type', 'weight', 'patch_id')}
+        edge_attrs.append(json.dumps(extra, default=str) if extra else "")
+
+    columns = {
+        'version': np.array([FORMAT_VERSION]),
+        'node_type': node_type,
+        'edge_src': np.array([index[u] for u, _, _ in edges], dtype=np.int32),
+        'edge_dst': np.array([index[v] for _, v, _ in edges], dtype=np.int32),
+        'edge_type': edge_type,
+        'edge_weight': np.array([d.get('weight', np.nan) for _, _, d in edges], dtype=float),
+        'edge_patch': np.array([d.get('patch_id', -1) for _, _, d in edges], dtype=np.int32),
+    }
+    strings = {
+        'node_id': ids,
+        'node_label': labels,
+        'node_attrs': node_attrs,
+        'node_type_names': node_type_names,
+        'edge_type_names': edge_type_names,
+        'edge_attrs': edge_attrs,
+        'graph_attrs': [json.dumps(graph.graph)],
+    }
+    for name, values in strings.items():
+        columns[f'{name}.data'], columns[f'{name}.offsets'] = _pack_strings(values)
+
+    with open(path, "wb") as f: # File handle keeps np.savez from appending '.npz'
+        np.savez(f, **columns)
+
+def _mmap_member(path: str, archive: zipfile.ZipFile, member: str) -> np.ndarray:
+    """Memory-maps one stored (uncompressed) .npy member of the archive."""
+    info = archive.getinfo(member)
+    with open(path, "rb") as f:
+        # Local file header: 30 fixed bytes + file name + extra field
+        f.seek(info.header_offset + 26)
+        name_len, extra_len = np.frombuffer(f.read(4), dtype='<u2')
+        f.seek(info.header_offset + 30 + int(name_len) + int(extra_len))
+        if np.lib.format.read_magic(f) == (1, 0):
+            shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+    if dtype.hasobject:
+        raise ValueError(f"Refusing object column {member}")
+    if 0 in shape:
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape,
+                     order='F' if fortran else 'C')
+
+def read_columns(path: str, names: list) -> dict:
+    """
+    Reads only the requested columns (see STRING_COLUMNS / ARRAY_COLUMNS).
+    Arrays are memory-mapped; string columns are decoded to lists.
+    """
+    result = {}
+    with zipfile.ZipFile(path) as archive:
+        version = int(_mmap_member(path, archive, 'version.npy')[0])
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported graph format version {version} (expected {FORMAT_VERSION})")
+        for name in names:
+            if name in STRING_COLUMNS:
+                result[name] = _unpack_strings(_mmap_member(path, archive, f'{name}.data.npy'),
+                                               _mmap_member(path, archive, f'{name}.offsets.npy'))
+            elif name in ARRAY_COLUMNS:
+                result[name] = _mmap_member(path, archive, f'{name}.npy')
+            else:
+                raise KeyError(f"Unknown graph column '{name}'")
+    return result
+
+def _decode_attrs(raw: list) -> list:
+    # One JSON parse for the whole column instead of one per row
+    return json.loads("[" + ",".join(r or "{}" for r in raw) + "]")
+
+def load_graph(path: str) -> nx.DiGraph:
+    """Rebuilds the full networkx graph (e.g. for incremental re-profiling)."""
+    cols = read_columns(path, STRING_COLUMNS + ARRAY_COLUMNS)
+    graph = nx.DiGraph()
+    graph.graph.update(json.loads(cols['graph_attrs'][0]))
+
+    ids = cols['node_id']
+    node_types = [cols['node_type_names'][c] for c in cols['node_type'].tolist()]
+    node_attrs = _decode_attrs(cols['node_attrs'])
+    for node_type, attrs in zip(node_types, node_attrs):
+        if node_type:
+            attrs['type'] = node_type
+    graph.add_nodes_from(zip(ids, node_attrs))
+
+    edge_types = [cols['edge_type_names'][c] for c in cols['edge_type'].tolist()]
+    edge_attrs = _decode_attrs(cols['edge_attrs'])
+    for edge_type, weight, patch_id, attrs in zip(edge_types, cols['edge_weight'].tolist(),
+                                                  cols['edge_patch'].tolist(), edge_attrs):
+        if edge_type:
+            attrs['type'] = edge_type
+        if not np.isnan(weight):
+            attrs['weight'] = weight
+        if patch_id >= 0:
+            attrs['patch_id'] = patch_id
+    graph.add_edges_from(
+        (ids[u], ids[v], attrs)
+        for u, v, attrs in zip(cols['edge_src'].tolist(), cols['edge_dst'].tolist(), edge_attrs)
+    )
+    return graph
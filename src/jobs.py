@@ -0,0 +1,300 @@
+import argparse
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from .config import Config
+
+TERMINAL = ('done', 'failed', 'cancelled')
+
+class JobCancelled(Exception):
+    """Raised inside a running job once its cancellation has been requested."""
+
+class JobQueue:
+    """
+    Durable profiling job queue in a single SQLite file, shared by every API
+    process (enqueue, status, cancel) and every worker process (claim, progress).
+    At most one queued/running job exists per username (a partial unique index),
+    so duplicate requests from different gunicorn workers collapse into one job.
+    Each job also has an append-only event log (phases, partial results, final
+    status) that the API streams to viewers.
+    """
+    def __init__(self, path: str = Config.JOB_DB_PATH):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Autocommit; multi-statement updates use explicit BEGIN IMMEDIATE
+        self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.lock = threading.Lock()
+        with self.lock:
+            self.conn.execute("PRAGMA journal_mode=WAL") # Readers don't block the writer across processes
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT NOT NULL, iterations INTEGER, "
+                "status TEXT NOT NULL, phase TEXT, message TEXT, error TEXT, cancel_requested INTEGER DEFAULT 0, "
+                "worker TEXT, created_at REAL, started_at REAL, finished_at REAL, heartbeat REAL)"
+            )
+            self.conn.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS idx_active_username ON jobs (username) "
+                "WHERE status IN ('queued', 'running')"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_status ON jobs (status, id)")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS job_events ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, job_id INTEGER NOT NULL, kind TEXT NOT NULL, "
+                "data TEXT, created_at REAL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_events_job ON job_events (job_id, id)")
+
+    def submit(self, username: str, iterations: int = 15) -> tuple:
+        """
+        Enqueues a profiling job unless one is already queued/running for `username`.
+        Returns (job, created).
+        """
+        while True:
+            with self.lock:
+                try:
+                    row = self.conn.execute(
+                        "INSERT INTO jobs (username, iterations, status, phase, created_at) "
+                        "VALUES (?, ?, 'queued', 'queued', ?) RETURNING *",
+                        (username, iterations, time.time())
+                    ).fetchone()
+                    return dict(row), True
+                except sqlite3.IntegrityError:
+                    pass
+            job = self.active(username)
+            if job is not None:
+                return job, False
+            # The active job finished in between; try again
+
+    def get(self, job_id: int) -> dict:
+        with self.lock:
+            row = self.conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row else None
+
+    def active(self, username: str) -> dict:
+        """The queued/running job for `username`, or None."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT * FROM jobs WHERE username = ? AND status IN ('queued', 'running')", (username,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def latest(self, username: str) -> dict:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT * FROM jobs WHERE username = ? ORDER BY id DESC LIMIT 1", (username,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def claim(self, worker: str) -> dict:
+        """Atomically moves the oldest queued job to 'running' for `worker`; None if idle."""
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute(
+                "UPDATE jobs SET status = 'running', phase = 'starting', worker = ?, started_at = ?, heartbeat = ? "
+                "WHERE id = (SELECT id FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1) RETURNING *",
+                (worker, now, now)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def progress(self, job_id: int, phase: str, message: str = None):
+        """
+        Records the job's current phase (also a heartbeat and a 'phase' event).
+        Raises JobCancelled if cancellation was requested meanwhile.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "UPDATE jobs SET phase = ?, message = ?, heartbeat = ? WHERE id = ? RETURNING cancel_requested",
+                (phase, message, time.time(), job_id)
+            ).fetchone()
+        self.emit(job_id, "phase", {"phase": phase, "message": message})
+        if row and row[0]:
+            raise JobCancelled(f"Job {job_id} cancelled")
+
+    def emit(self, job_id: int, kind: str, data: dict):
+        """Appends an event (JSON-serializable `data`) to the job's log."""
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO job_events (job_id, kind, data, created_at) VALUES (?, ?, ?, ?)",
+                (job_id, kind, json.dumps(data, default=str), time.time())
+            )
+
+    def events(self, job_id: int, after: int = 0, limit: int = 500) -> list:
+        """Events of the job with id > `after`, oldest first: [{'id', 'kind', 'data'}]."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, kind, data FROM job_events WHERE job_id = ? AND id > ? ORDER BY id LIMIT ?",
+                (job_id, after, limit)
+            ).fetchall()
+        return [{"id": r["id"], "kind": r["kind"], "data": json.loads(r["data"])} for r in rows]
+
+    def prune_events(self, max_age: float = Config.JOB_EVENTS_TTL) -> int:
+        """Drops the event logs of jobs that finished more than `max_age` seconds ago."""
+        with self.lock:
+            cur = self.conn.execute(
+                "DELETE FROM job_events WHERE job_id IN "
+                "(SELECT id FROM jobs WHERE status IN ('done', 'failed', 'cancelled') AND finished_at < ?)",
+                (time.time() - max_age,)
+            )
+        return cur.rowcount
+
+    def cancel_requested(self, job_id: int) -> bool:
+        with self.lock:
+            row = self.conn.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def heartbeat(self, job_ids: list):
+        with self.lock:
+            self.conn.executemany("UPDATE jobs SET heartbeat = ? WHERE id = ?", [(time.time(), i) for i in job_ids])
+
+    def finish(self, job_id: int, status: str, error: str = None):
+        """status: 'done', 'failed' or 'cancelled'. Emits the final 'status' event."""
+        with self.lock:
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, phase = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, status, error, time.time(), job_id)
+            )
+        self.emit(job_id, "status", {"status": status, "error": error})
+
+    def cancel(self, job_id: int) -> dict:
+        """
+        A queued job is cancelled at once; a running one at its next progress
+        report. Finished jobs are left as they are. Returns the job (None if unknown).
+        """
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                cancelled = self.conn.execute(
+                    "UPDATE jobs SET status = 'cancelled', phase = 'cancelled', finished_at = ? "
+                    "WHERE id = ? AND status = 'queued'", (time.time(), job_id)
+                ).rowcount
+                if cancelled:
+                    self.conn.execute(
+                        "INSERT INTO job_events (job_id, kind, data, created_at) VALUES (?, 'status', ?, ?)",
+                        (job_id, json.dumps({"status": "cancelled", "error": None}), time.time())
+                    )
+                self.conn.execute("UPDATE jobs SET cancel_requested = 1 WHERE id = ? AND status = 'running'", (job_id,))
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return self.get(job_id)
+
+    def requeue_stale(self, timeout: float = Config.JOB_STALE_SECONDS) -> int:
+        """Puts running jobs whose worker stopped heartbeating back in the queue."""
+        with self.lock:
+            cur = self.conn.execute(
+                "UPDATE jobs SET status = 'queued', phase = 'queued', worker = NULL "
+                "WHERE status = 'running' AND heartbeat < ?", (time.time() - timeout,)
+            )
+        return cur.rowcount
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+class JobWorkerPool:
+    """
+    Runs queued jobs on `concurrency` threads, separately from the API processes.
+    Several pools (e.g. one per worker process) can serve the same queue file.
+    run(username, iterations, progress, emit) executes a job; progress(phase, message)
+    must be called along the way and raises JobCancelled when the job was cancelled,
+    emit(kind, data) publishes partial results to the job's event log. emit also
+    raises JobCancelled on 'iteration' events, so a cancelled exploration stops at
+    its next MCTS iteration rather than at the end of the phase.
+    """
+    def __init__(self, queue: JobQueue, run=None, concurrency: int = Config.JOB_WORKERS,
+                 poll_interval: float = Config.JOB_POLL_INTERVAL):
+        if run is None:
+            from .main import run_pipeline
+            run = lambda username, iterations, progress, emit: run_pipeline(
+                username, iterations, progress=progress, on_event=emit
+            )
+        self.queue = queue
+        self.run = run
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self.running = {} # job id -> worker thread name
+        self.stop_event = threading.Event()
+        self.threads = []
+
+    def start(self):
+        self.queue.requeue_stale()
+        self.threads = [threading.Thread(target=self._work, name=f"{self.name}/{i}", daemon=True)
+                        for i in range(self.concurrency)]
+        self.threads.append(threading.Thread(target=self._beat, daemon=True))
+        for t in self.threads:
+            t.start()
+
+    def stop(self, wait: bool = True):
+        """Stops claiming new jobs; running ones are finished first when waiting."""
+        self.stop_event.set()
+        if wait:
+            for t in self.threads:
+                t.join()
+
+    def _beat(self):
+        # Long phases report progress rarely; the heartbeat keeps them from looking stale
+        while not self.stop_event.wait(Config.JOB_STALE_SECONDS / 4):
+            if self.running:
+                self.queue.heartbeat(list(self.running))
+            self.queue.requeue_stale()
+            self.queue.prune_events()
+
+    def _work(self):
+        worker = threading.current_thread().name
+        while not self.stop_event.is_set():
+            job = self.queue.claim(worker)
+            if job is None:
+                self.stop_event.wait(self.poll_interval)
+                continue
+            self.run_job(job, worker)
+
+    def run_job(self, job: dict, worker: str):
+        job_id = job['id']
+        self.running[job_id] = worker
+        print(f"[Jobs] {worker} started job {job_id} ({job['username']})")
+        try:
+            progress = lambda phase, message=None: self.queue.progress(job_id, phase, message)
+            def emit(kind, data):
+                self.queue.emit(job_id, kind, data)
+                if kind == "iteration" and self.queue.cancel_requested(job_id):
+                    raise JobCancelled(f"Job {job_id} cancelled")
+            if self.run(job['username'], job['iterations'], progress, emit) is None:
+                raise RuntimeError("Pipeline produced no profile (see worker log)")
+            self.queue.finish(job_id, 'done')
+        except JobCancelled:
+            print(f"[Jobs] Job {job_id} cancelled")
+            self.queue.finish(job_id, 'cancelled')
+        except Exception as e:
+            print(f"--- ERROR: Profiling failed for {job['username']} ---")
+            print(f"Exception Type: {type(e).__name__}")
+            print(f"Details: {str(e)}")
+            # If it's a 401, it's almost certainly a missing/invalid GITHUB_TOKEN
+            if "401" in str(e) or "BadCredentials" in type(e).__name__:
+                print("CRITICAL: GITHUB_TOKEN is either missing or invalid in your Environment Variables.")
+            self.queue.finish(job_id, 'failed', error=f"{type(e).__name__}: {e}")
+        finally:
+            self.running.pop(job_id, None)
+
+def main():
+    parser = argparse.ArgumentParser(description="Profiling job worker")
+    parser.add_argument("--workers", type=int, default=Config.JOB_WORKERS, help="Jobs run concurrently by this process")
+    args = parser.parse_args()
+
+    pool = JobWorkerPool(JobQueue(), concurrency=args.workers)
+    print(f"[Jobs] Worker {pool.name} serving {Config.JOB_DB_PATH} with {args.workers} thread(s)")
+    pool.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        print("[Jobs] Stopping after running jobs finish...")
+        pool.stop()
+
+if __name__ == "__main__":
+    main()
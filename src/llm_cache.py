@@ -0,0 +1,87 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from .config import Config
+
+class LLMResponseCache:
+    """
+    Persistent cache of LLM skill inferences (single SQLite file).
+    Keyed by a hash of the whitespace-normalized prompt, so identical evidence
+    (shared forks, boilerplate commits) is only paid for once across runs and
+    developers. Entries expire after `ttl` seconds and the least recently used
+    ones are evicted beyond `max_entries`. The file may be shared by several
+    processes (job workers, batch runs), so sizes are always counted in SQLite.
+    """
+    def __init__(self, path: str = Config.LLM_CACHE_PATH, max_entries: int = Config.LLM_CACHE_MAX_ENTRIES,
+                 ttl: float = Config.LLM_CACHE_TTL):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        with self.lock, self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses "
+                "(key TEXT PRIMARY KEY, payload TEXT, created_at REAL, last_access REAL)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses (last_access)")
+
+    @staticmethod
+    def make_key(prompt: str) -> str:
+        normalized = re.sub(r"\s+", " ", prompt).strip()
+        return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        """Returns the cached result for `key`, or None on a miss (or expired entry)."""
+        now = time.time()
+        with self.lock, self.conn:
+            row = self.conn.execute("SELECT payload, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row and now - row[1] > self.ttl:
+                # Unless another process has refreshed it since
+                self.conn.execute("DELETE FROM responses WHERE key = ? AND created_at < ?", (key, now - self.ttl))
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, key: str, result):
+        now = time.time()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, json.dumps(result), now, now)
+            )
+            # Counted inside the write transaction, so concurrent writers see each other's rows
+            excess = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+            if excess > 0:
+                # LRU eviction
+                self.conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY last_access ASC LIMIT ?)",
+                    (excess,)
+                )
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        with self.lock:
+            entries = self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": entries
+        }
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -1,24 +1,106 @@
 import google.generativeai as genai
 import json
+import threading
 from .config import Config
+from .llm_cache import LLMResponseCache
+from .rate_limiter import TokenBucket
 
 class LLMClient:
     """
     Interface for the Gemini Model to act as the Policy Network in MCTS.
     """
-    def __init__(self):
-        Config.validate()
-        genai.configure(api_key=Config.GEMINI_API_KEY)
-        self.model = genai.GenerativeModel('gemini-2.5-flash')
+    def __init__(self, model=None, cache: LLMResponseCache = None,
+                 cache_include_path: bool = Config.LLM_CACHE_INCLUDE_PATH):
+        """
+        model: Optional backend exposing generate_content(prompt) -> obj with `.text`
+               (e.g. a stub for tests). Defaults to Gemini (with the persistent
+               response cache unless LLM_CACHE=0).
+        cache_include_path: Whether the reasoning path is part of the cache key.
+        """
+        if model is None:
+            Config.validate()
+            genai.configure(api_key=Config.GEMINI_API_KEY)
+            model = genai.GenerativeModel('gemini-2.5-flash')
+            if cache is None and Config.USE_LLM_CACHE:
+                cache = LLMResponseCache()
+        self.model = model
+        self.cache = cache
+        self.cache_include_path = cache_include_path
+        self.call_count = 0 # LLM round-trips issued (for budget/efficiency tracking)
+        self.token_count = 0 # Prompt + response tokens of those round-trips
+        self._count_lock = threading.Lock()
+        # Shared across concurrent MCTS workers to stay under the provider's rate limit
+        self.rate_limiter = TokenBucket(rate=Config.LLM_MAX_RPS, capacity=1) if Config.LLM_MAX_RPS > 0 else None
         
-    def infer_skills(self, node_context: dict, reasoning_path: list[str] = None) -> list[dict]:
+    def infer_skills(self, node_context: dict, reasoning_path: list[str] = None, usage: dict = None) -> list[dict]:
         """
         Predicts skills based on the provided node context and the Reasoning Path.
         Returns a list of dicts: [{'skill': 'Name', 'confidence': 0.8, 'causal_link': '...'}]
+        usage: Optional {'calls', 'tokens'} counters of the caller, incremented with
+               this request's spend (the client-wide totals are kept as well).
         """
-        import time
-
+        key = self._cache_key(node_context, reasoning_path)
+        if key:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        
         prompt = self._construct_prompt(node_context, reasoning_path)
+        result = self._generate_json(prompt, usage)
+        if not isinstance(result, list):
+            return [] # Failures are not cached
+        if key:
+            self.cache.put(key, result)
+        return result
+
+    def infer_skills_batch(self, node_contexts: dict, reasoning_paths: dict = None, usage: dict = None) -> dict:
+        """
+        Evaluates several nodes in a single LLM round-trip.
+        node_contexts: {node_id: context_dict}; reasoning_paths: {node_id: [path]};
+        usage: as for infer_skills.
+        Returns {node_id: [skill_dict, ...]} with an empty list for nodes the model skipped.
+        """
+        reasoning_paths = reasoning_paths or {}
+        results, keys = {}, {}
+        # Per-node cache lookups (same keys as infer_skills); only misses go to the model
+        for node_id, context in node_contexts.items():
+            key = self._cache_key(context, reasoning_paths.get(node_id))
+            cached = self.cache.get(key) if key else None
+            if cached is not None:
+                results[node_id] = cached
+            else:
+                keys[node_id] = key
+        
+        if keys:
+            pending = {node_id: node_contexts[node_id] for node_id in keys}
+            prompt = self._construct_batch_prompt(pending, reasoning_paths)
+            result = self._generate_json(prompt, usage)
+            if not isinstance(result, dict):
+                result = {}
+            for node_id, key in keys.items():
+                skills = result.get(node_id)
+                if isinstance(skills, list):
+                    results[node_id] = skills
+                    if key:
+                        self.cache.put(key, skills)
+                else:
+                    results[node_id] = [] # Skipped by the model; not cached
+        return {node_id: results[node_id] for node_id in node_contexts}
+
+    def _cache_key(self, context: dict, path: list[str] = None):
+        """Cache key for a single-node inference (None when caching is disabled)."""
+        if not self.cache:
+            return None
+        return LLMResponseCache.make_key(
+            self._construct_prompt(context, path if self.cache_include_path else None)
+        )
+
+    def _generate_json(self, prompt: str, usage: dict = None):
+        """
+        Sends the prompt and parses the JSON reply.
+        Returns None if the call failed or the reply was not valid JSON.
+        """
+        import time
         
         # Retry Logic for Rate Limits (429)
         max_retries = 3
@@ -26,7 +108,14 @@ class LLMClient:
         
         for attempt in range(max_retries):
             try:
+                if self.rate_limiter:
+                    self.rate_limiter.acquire()
+                with self._count_lock:
+                    self.call_count += 1
+                    if usage is not None:
+                        usage["calls"] += 1
                 response = self.model.generate_content(prompt)
+                self._count_tokens(prompt, response, usage)
                 # Basic cleanup for Markdown code blocks if model adds them
                 clean_text = response.text.strip()
                 if clean_text.startswith("```json"):
@@ -47,10 +136,34 @@ class LLMClient:
                     backoff *= 1.5 # Exponential backoff if needed (though 60s should handle per-minute quota)
                 else:
                     print(f"LLM Inference Error: {e}")
-                    return [] # Non-retryable error
+                    return None # Non-retryable error
         
         print("    [LLM] Max retries exceeded.")
-        return []
+        return None
+
+    def _count_tokens(self, prompt: str, response, usage: dict = None):
+        metadata = getattr(response, "usage_metadata", None)
+        tokens = getattr(metadata, "total_token_count", None)
+        if not tokens:
+            tokens = (len(prompt) + len(response.text or "")) // 4 # ~4 characters per token
+        with self._count_lock:
+            self.token_count += tokens
+            if usage is not None:
+                usage["tokens"] += tokens
+
+    @staticmethod
+    def render_evidence(context: dict) -> str:
+        """
+        The node's evidence block of a prompt. Contexts from NodeContextIndex carry
+        it pre-rendered ('evidence'), so revisits reuse the identical text.
+        """
+        if 'evidence' in context:
+            return context['evidence']
+        return (
+            f"Type: {context.get('type')}\n"
+            f"Metadata: {context.get('message') or context.get('description')}\n"
+            f"Data: {context.get('diff_summary') or str(context.get('topics'))}\n"
+        )
 
     def _construct_prompt(self, context: dict, path: list[str] = None) -> str:
         path_str = " -> ".join(path) if path else "Direct Exploration"
@@ -59,9 +172,7 @@ class LLMClient:
             f"You are a Senior CTO performing Deep Graph Reasoning to build a Developer Skill Profile.\n\n"
             f"REASONING PATH (Context):\n{path_str}\n\n"
             f"TARGET EVIDENCE:\n"
-            f"Type: {context.get('type')}\n"
-            f"Metadata: {context.get('message') or context.get('description')}\n"
-            f"Data: {context.get('diff_summary') or str(context.get('topics'))}\n\n"
+            f"{self.render_evidence(context)}\n"
             
             f"TASK:\n"
             f"Using the full RESONING PATH as context, identify 1-3 TECHNICAL Hard Skills proven by this TARGET EVIDENCE.\n"
@@ -76,3 +187,35 @@ class LLMClient:
             f"Return a JSON list: [{{'skill': 'Name', 'confidence': 0.0-1.0, 'causal_link': '...'}}]"
         )
         return intro
+
+    def _construct_batch_prompt(self, contexts: dict, paths: dict) -> str:
+        evidence = ""
+        for node_id, context in contexts.items():
+            path = paths.get(node_id)
+            path_str = " -> ".join(path) if path else "Direct Exploration"
+            evidence += (
+                f"NODE ID: {node_id}\n"
+                f"REASONING PATH: {path_str}\n"
+                f"{self.render_evidence(context)}\n"
+            )
+        
+        intro = (
+            f"You are a Senior CTO performing Deep Graph Reasoning to build a Developer Skill Profile.\n\n"
+            f"TARGET EVIDENCE ({len(contexts)} independent nodes):\n\n"
+            f"{evidence}"
+            
+            f"TASK:\n"
+            f"For EACH node separately, using its REASONING PATH as context, identify 1-3 TECHNICAL Hard Skills proven by that node's evidence.\n"
+            f"Examples: 'Python', 'Vector Databases', 'Transformers', 'Dempster-Shafer Theory', 'FastAPI'.\n\n"
+            
+            f"CONSTRAINTS (STRICT):\n"
+            f"1. IGNORE non-code skills (Markdown, Documentation, Writing, Readme updates).\n"
+            f"2. IGNORE generic concepts (GitHub, VC, Agile).\n"
+            f"3. Return ONLY Hard Technical Skills (Languages, Frameworks, Libraries, Algorithms).\n"
+            f"4. CAUSALITY: Explain exactly HOW this specific file/commit proves the skill in the 'causal_link' field.\n"
+            f"5. Do not let evidence from one node leak into another node's skills.\n\n"
+            
+            f"Return a JSON object keyed by NODE ID: "
+            f"{{'<node id>': [{{'skill': 'Name', 'confidence': 0.0-1.0, 'causal_link': '...'}}]}}"
+        )
+        return intro
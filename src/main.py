@@ -1,11 +1,17 @@
 import argparse
+import gc
 import json
 import os
+import pickle
+import tempfile
 import networkx as nx
+from src import graph_format
 from src.config import Config
 from src.graph_builder import HINBuilder
-from src.agentic_explorer import MCTSAgent
+from src.agentic_explorer import MCTSAgent, StoppingRule
+from src.compact_graph import CompactGraph
 from src.confidence import ConfidenceCalculator
+from src.shared_hin import SharedHIN
 
 def save_profile(profile, username):
     os.makedirs("output", exist_ok=True)
@@ -14,49 +20,83 @@ def save_profile(profile, username):
         json.dump(profile, f, indent=2)
     print(f"Profile saved to {path}")
 
-import pickle
+def graph_path(username):
+    return f"output/{username}_graph.npz"
 
-def save_graph(graph, username):
-    os.makedirs("output", exist_ok=True)
-    with open(f"output/{username}_graph.pkl", "wb") as f:
-        pickle.dump(graph, f)
-    # nx.write_gpickle(graph, f"output/{username}_graph.gpickle")
-    print(f"Graph saved to output/{username}_graph.gpickle")
+def legacy_graph_path(username):
+    return f"output/{username}_graph.pkl"
 
-def run_pipeline(username: str, iterations: int = 20):
+def save_graph(graph, username, patch_store=None):
     """
-    Main entry point for the skill inference pipeline.
-    Constructs the graph, runs MCTS exploration, and calculates confidence metrics.
+    patch_store: The graph's PatchStore; a store staged by a rebuild is committed
+                 in the same step, so the saved graph and its patches change together.
     """
-    # 1. Verification
+    os.makedirs("output", exist_ok=True)
+    path = graph_path(username)
+    # Write-then-rename: /graph may be memory-mapping the current file
+    fd, tmp = tempfile.mkstemp(dir="output", suffix=".npz.tmp")
+    os.close(fd)
     try:
-        Config.validate()
-    except ValueError as e:
-        print(f"Configuration Error: {e}")
+        graph_format.save_graph(graph, tmp)
+        if patch_store is not None:
+            patch_store.commit()
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    print(f"Graph saved to {path}")
+
+def migrate_legacy_graph(username) -> bool:
+    """
+    Converts a graph pickled before the .npz format (written by this app, so
+    trusted) into the .npz, unless one exists. Returns whether it converted.
+    Only the one-off --migrate-graphs step unpickles; readers ignore .pkl files.
+    """
+    legacy = legacy_graph_path(username)
+    if os.path.exists(graph_path(username)) or not os.path.exists(legacy):
+        return False
+    with open(legacy, "rb") as f:
+        graph = pickle.load(f)
+    print(f"Converting legacy graph {legacy}")
+    save_graph(graph, username)
+    return True
+
+def migrate_legacy_graphs() -> list:
+    """Converts every output/{username}_graph.pkl without an .npz; returns the converted usernames."""
+    if not os.path.isdir("output"):
+        return []
+    suffix = "_graph.pkl"
+    usernames = [name[:-len(suffix)] for name in sorted(os.listdir("output")) if name.endswith(suffix)]
+    return [u for u in usernames if migrate_legacy_graph(u)]
+
+def load_graph(username):
+    path = graph_path(username)
+    if not os.path.exists(path):
+        if os.path.exists(legacy_graph_path(username)):
+            print(f"Ignoring legacy graph {legacy_graph_path(username)}; convert it with --migrate-graphs")
         return None
+    return graph_format.load_graph(path)
 
-    print(f"=== Starting Dynamic Profiling for User: {username} ===")
-    
-    # 2. Graph Construction
-    print("\n[Phase 1] Building Heterogeneous Information Network...")
-    builder = HINBuilder(username)
-    graph = builder.build_raw_topology()
-    
-    # 3. Agentic Exploration
-    print(f"\n[Phase 2] Agentic Exploration (MCTS) - Budget: {iterations} iters...")
-    from src.llm_client import LLMClient
-    llm = LLMClient()
-    agent = MCTSAgent(graph, llm)
-    
-    agent.run_exploration(iterations=iterations)
-    
-    # 4. Confidence Calculation
-    print("\n[Phase 3] Calculates Belief Mass Functions (Dempster-Shafer)...")
-    calc = ConfidenceCalculator(graph)
+def load_profile(username):
+    path = f"output/{username}_profile.json"
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+def build_profile(graph, username: str, calc: ConfidenceCalculator, convergence_history: list,
+                  stale_skills: set = None, previous_metrics: dict = None, on_event=None) -> dict:
+    """
+    Assembles the profile of `username` from the skill nodes of `graph`.
+    stale_skills: If given, only these skills are recomputed; the others keep
+                  their `previous_metrics`.
+    on_event: Optional callback on_event('confidence', skill entry) per reported skill.
+    """
+    developer_node = f"dev:{username}"
+    previous_metrics = previous_metrics or {}
     
     # Identify all Skill nodes found
     all_skills = [n for n, d in graph.nodes(data=True) if d.get('type') == 'skill']
-    developer_node = f"dev:{username}"
     
     # Metadata for validation
     dev_data = graph.nodes[developer_node]
@@ -71,13 +111,22 @@ def run_pipeline(username: str, iterations: int = 20):
             "repo_count": len(repo_nodes),
             "commit_count": len(commit_nodes)
         },
-        "convergence_history": agent.convergence_history,
+        "convergence_history": convergence_history,
         "skills": []
     }
     
+    # One shared traversal from the developer for every skill that needs (re)computing
+    to_compute = all_skills if stale_skills is None else [s for s in all_skills if s in stale_skills]
+    computed = calc.compute_all_skill_confidences(developer_node, to_compute)
+    
     for skill_node in all_skills:
         skill_name = graph.nodes[skill_node].get('name')
-        metrics = calc.compute_skill_confidence(developer_node, skill_node)
+        if skill_node in computed:
+            metrics = computed[skill_node]
+        else:
+            metrics = previous_metrics.get(skill_name)
+            if metrics is None:
+                continue # Was below the belief threshold last run and nothing changed
         
         # Filter low belief skills
         if metrics['belief'] > 0.05:
@@ -85,23 +134,210 @@ def run_pipeline(username: str, iterations: int = 20):
                 "name": skill_name,
                 "metrics": metrics
             })
+            if on_event:
+                on_event("confidence", final_profile["skills"][-1])
             
     # Sort by belief
     final_profile["skills"].sort(key=lambda x: x['metrics']['belief'], reverse=True)
     
+    return final_profile
+
+def run_pipeline(username: str, iterations: int = 20, incremental: bool = False,
+                 batch_size: int = Config.MCTS_BATCH_SIZE, workers: int = Config.MCTS_WORKERS,
+                 streaming: bool = Config.HIN_STREAMING, progress=None, on_event=None):
+    """
+    Main entry point for the skill inference pipeline.
+    Constructs the graph, runs MCTS exploration, and calculates confidence metrics.
+    
+    incremental: Update the previously saved graph/profile instead of rebuilding.
+                 Only new repos/commits are merged and explored, and confidence is
+                 recomputed only for skills whose evidence subgraph changed.
+    batch_size: MCTS leaves evaluated per LLM call (1 = one call per iteration).
+    workers: Concurrent MCTS search threads (1 = deterministic sequential search).
+    streaming: Build the HIN with the streaming pipeline (bounded memory).
+    progress: Optional callback progress(phase, message) invoked as each phase
+              starts; it may raise to abort the run (e.g. a cancelled job).
+    on_event: Optional callback on_event(kind, data) receiving partial results:
+              MCTS iterations and new skills (see MCTSAgent.listener) and each
+              skill's confidence ('confidence'). Like progress, it may raise to
+              abort the run; exploration then stops at the current iteration.
+    """
+    progress = progress or (lambda phase, message=None: None)
+    
+    # 1. Verification
+    try:
+        Config.validate()
+    except ValueError as e:
+        print(f"Configuration Error: {e}")
+        return None
+
+    print(f"=== Starting Dynamic Profiling for User: {username} ===")
+    developer_node = f"dev:{username}"
+    
+    previous_graph, previous_profile = None, None
+    if incremental:
+        previous_graph, previous_profile = load_graph(username), load_profile(username)
+        if previous_graph is None or previous_profile is None:
+            print("No previous profile found. Falling back to a full build.")
+            previous_graph, previous_profile, incremental = None, None, False
+    
+    # 2. Graph Construction
+    print("\n[Phase 1] Building Heterogeneous Information Network...")
+    progress("build", "Building Heterogeneous Information Network")
+    if incremental:
+        old_visibility = ConfidenceCalculator(previous_graph).developer_visibility(developer_node)
+    builder = HINBuilder(username, graph=previous_graph)
+    graph = builder.build_raw_topology(streaming=streaming)
+    new_nodes, patch_store = builder.new_nodes, builder.patch_store
+    del builder, previous_graph
+    
+    # 3. Agentic Exploration
+    frontier = None
+    if incremental:
+        # Only newly merged commits/repos need to be explored
+        frontier = new_nodes
+        frontier_size = sum(1 for n in frontier if graph.nodes[n].get('type') in ['commit', 'repository'])
+        iterations = min(iterations, frontier_size)
+    print(f"\n[Phase 2] Agentic Exploration (MCTS) - Budget: {iterations} iters...")
+    progress("explore", f"MCTS exploration, {iterations} iterations")
+    from src.llm_client import LLMClient
+    llm = LLMClient()
+    topology = None
+    if Config.USE_COMPACT_GRAPH:
+        # Exploration reads a frozen compact view and writes skills to a small overlay,
+        # so the DiGraph is released before exploration and never held again
+        topology = CompactGraph.from_networkx(graph)
+        graph = nx.DiGraph()
+        graph.add_nodes_from((n, topology.nodes[n]) for n in topology.nodes_of_type('skill')) # Known skills
+        gc.collect() # A DiGraph is a reference cycle (cached views); free it now, not at the next GC pass
+    agent = MCTSAgent(graph, llm, frontier=frontier, patch_store=patch_store, topology=topology,
+                      listener=on_event)
+    
+    if iterations > 0:
+        agent.run_exploration(iterations=iterations, batch_size=batch_size, workers=workers,
+                              stopping=StoppingRule.from_config())
+    if llm.cache:
+        stats = llm.cache.stats()
+        print(f"LLM cache: {stats['hits']} hits / {stats['misses']} misses ({stats['entries']} entries)")
+    convergence_history = agent.convergence_history
+    del agent
+    if topology is not None:
+        graph = topology.with_overlay(graph)
+        del topology
+    
+    # 4. Confidence Calculation
+    print("\n[Phase 3] Calculates Belief Mass Functions (Dempster-Shafer)...")
+    progress("confidence", "Computing Dempster-Shafer belief")
+    calc = ConfidenceCalculator(graph)
+    
+    # Skills whose evidence is untouched keep last run's metrics.
+    # Visibility is a shared denominator, so any change to it invalidates every skill.
+    stale_skills = None
+    previous_metrics = {}
+    if incremental and abs(calc.developer_visibility(developer_node) - old_visibility) < 1e-9:
+        stale_skills = calc.affected_skills(new_nodes)
+        previous_metrics = {s['name']: s['metrics'] for s in previous_profile['skills']}
+        n_skills = sum(1 for _, d in graph.nodes(data=True) if d.get('type') == 'skill')
+        print(f"Recomputing {len(stale_skills)}/{n_skills} skills with changed evidence.")
+    
+    final_profile = build_profile(
+        graph, username, calc,
+        convergence_history if convergence_history or not incremental
+        else previous_profile.get('convergence_history', []),
+        stale_skills=stale_skills, previous_metrics=previous_metrics, on_event=on_event
+    )
+    
     # 5. Output
+    progress("saving", f"{len(final_profile['skills'])} skills identified")
     print(f"\n[Result] Identified {len(final_profile['skills'])} skills.")
+    # Graph and profile are written together once scoring succeeded: an --incremental run
+    # trusts the profile for every skill of the saved graph whose evidence did not change
+    save_graph(graph, username, patch_store)
     save_profile(final_profile, username)
-    save_graph(graph, username)
     return final_profile
 
+def run_team_pipeline(team: str, usernames: list, iterations: int = 20, incremental: bool = False,
+                      batch_size: int = Config.MCTS_BATCH_SIZE, workers: int = Config.MCTS_WORKERS,
+                      streaming: bool = Config.HIN_STREAMING):
+    """
+    Profiles several developers over one shared HIN (output/{team}_graph.npz).
+    Repos and commits already in the shared graph are neither fetched nor explored
+    again, so the cost follows the unique commits rather than the sum per developer.
+    Each developer's profile is computed on their view of the shared graph.
+    
+    iterations: MCTS budget per developer, capped by what that developer added.
+    incremental: Extend the previously saved shared graph instead of starting over.
+    """
+    try:
+        Config.validate()
+    except ValueError as e:
+        print(f"Configuration Error: {e}")
+        return None
+
+    print(f"=== Starting Team Profiling for {team}: {len(usernames)} developers ===")
+    hin = SharedHIN(team, graph=load_graph(team) if incremental else None)
+    from src.llm_client import LLMClient
+    llm = LLMClient() # One client (and LLM cache) for the whole team
+    
+    profiles = {}
+    for username in usernames:
+        print(f"\n[Phase 1] Merging {username} into the shared HIN...")
+        new_nodes = hin.add_developer(username, streaming=streaming)
+        view = hin.view(username)
+        
+        # Only what this developer added is explored; shared repos/commits already were
+        frontier = {n for n in new_nodes if view.has_node(n)}
+        budget = min(iterations, sum(1 for n in frontier if view.nodes[n].get('type') in ['commit', 'repository']))
+        print(f"\n[Phase 2] Agentic Exploration (MCTS) - Budget: {budget} iters...")
+        topology = CompactGraph.from_networkx(view) if Config.USE_COMPACT_GRAPH else view
+        agent = MCTSAgent(hin.graph, llm, frontier=frontier, patch_store=hin.patch_store, topology=topology)
+        if budget > 0:
+            agent.run_exploration(iterations=budget, batch_size=batch_size, workers=workers,
+                                  stopping=StoppingRule.from_config())
+        
+        print("\n[Phase 3] Calculates Belief Mass Functions (Dempster-Shafer)...")
+        convergence_history = agent.convergence_history
+        del agent, topology # The exploration view is stale now; don't hold it next to the scoring view
+        view = hin.view(username) # Picks up the skills inferred above
+        calc = ConfidenceCalculator(CompactGraph.from_networkx(view) if Config.USE_COMPACT_GRAPH else view)
+        profiles[username] = build_profile(view, username, calc, convergence_history)
+        print(f"[Result] Identified {len(profiles[username]['skills'])} skills for {username}.")
+        save_profile(profiles[username], username)
+    
+    if llm.cache:
+        stats = llm.cache.stats()
+        print(f"LLM cache: {stats['hits']} hits / {stats['misses']} misses ({stats['entries']} entries)")
+    commits = sum(1 for _, d in hin.graph.nodes(data=True) if d.get('type') == 'commit')
+    print(f"\nShared HIN: {hin.graph.number_of_nodes()} nodes, {commits} unique commits.")
+    save_graph(hin.graph, team, hin.patch_store)
+    return profiles
+
 def main():
     parser = argparse.ArgumentParser(description="Graph-Theoretic Skill Inference System")
-    parser.add_argument("--user", required=True, help="GitHub username to profile")
+    parser.add_argument("--user", help="GitHub username to profile (comma-separated with --team)")
+    parser.add_argument("--team", help="Profile all --user developers over one shared HIN saved under this name")
     parser.add_argument("--iterations", type=int, default=20, help="MCTS iterations")
+    parser.add_argument("--incremental", action="store_true", help="Update the previously saved graph instead of rebuilding")
+    parser.add_argument("--batch-size", type=int, default=Config.MCTS_BATCH_SIZE, help="MCTS leaves evaluated per LLM call")
+    parser.add_argument("--workers", type=int, default=Config.MCTS_WORKERS, help="Concurrent MCTS search threads")
+    parser.add_argument("--stream", action="store_true", default=Config.HIN_STREAMING, help="Stream HIN construction (bounded memory)")
+    parser.add_argument("--migrate-graphs", action="store_true", help="Convert legacy pickled graphs in output/ to .npz")
     args = parser.parse_args()
     
-    run_pipeline(args.user, args.iterations)
+    if args.migrate_graphs:
+        converted = migrate_legacy_graphs()
+        print(f"Converted {len(converted)} legacy graph(s).")
+        if not args.user:
+            return
+    if not args.user:
+        parser.error("--user is required")
+    if args.team:
+        run_team_pipeline(args.team, [u.strip() for u in args.user.split(",") if u.strip()], args.iterations,
+                          incremental=args.incremental, batch_size=args.batch_size, workers=args.workers,
+                          streaming=args.stream)
+        return
+    run_pipeline(args.user, args.iterations, incremental=args.incremental,
+                 batch_size=args.batch_size, workers=args.workers, streaming=args.stream)
 
 if __name__ == "__main__":
     main()
@@ -1,4 +1,5 @@
 import networkx as nx
+from .compact_graph import CompactGraph
 
 class MetaPath:
     """
@@ -27,13 +28,54 @@ COLLABORATION_PATH = MetaPath(
 
 class MetaPathWalker:
     def __init__(self, graph: nx.DiGraph):
+        """
+        graph: networkx DiGraph or a frozen CompactGraph.
+        The typed adjacency index is built on first use; call refresh() after
+        mutating the graph.
+        """
         self.graph = graph
+        self._index = None # node -> {(edge_type, node_type): [(neighbor, weight), ...]}
+
+    def refresh(self):
+        """Drops the typed adjacency index (rebuilt lazily)."""
+        self._index = None
+
+    def _typed_adjacency(self) -> dict:
+        """
+        Buckets every node's successors by (edge type, successor type), in adjacency
+        order, together with the edge weight (1.0 if missing, as in compute_path_sim).
+        """
+        if self._index is not None:
+            return self._index
+        index = {}
+        if isinstance(self.graph, CompactGraph):
+            g = self.graph
+            node_types = [g.node_types[c] for c in g.node_type.tolist()]
+            edge_types = [g.edge_types[c] for c in g.out_type.tolist()]
+            edges = zip(g.out_src.tolist(), g.out_dst.tolist(), edge_types, g.weights_or(1.0).tolist())
+            for u, v, edge_type, weight in edges:
+                index.setdefault(g.ids[u], {}).setdefault((edge_type, node_types[v]), []).append((g.ids[v], weight))
+        else:
+            node_types = {n: d.get('type') for n, d in self.graph.nodes(data=True)}
+            for u, neighbors in self.graph.adj.items():
+                buckets = index[u] = {}
+                for v, d in neighbors.items():
+                    buckets.setdefault((d.get('type'), node_types[v]), []).append((v, d.get('weight', 1.0)))
+        self._index = index
+        return index
+
+    def neighbors(self, node: str, edge_type: str, node_type: str) -> list:
+        """[(neighbor, edge weight)] reachable from `node` over one typed hop."""
+        return self._typed_adjacency().get(node, {}).get((edge_type, node_type), [])
 
     def find_paths(self, start_node: str, meta_path: MetaPath) -> list[list[str]]:
         """
         Finds all path instances in the graph matching the given meta-path schema.
         Returns a list of node_id sequences.
         """
+        if isinstance(self.graph, CompactGraph):
+            # Whole hop layers are expanded at once over the typed columns
+            return self.graph.meta_path_instances(start_node, meta_path.node_types, meta_path.edge_types)
         results = []
         self._dfs(start_node, meta_path, 0, [start_node], results)
         return results
@@ -44,21 +86,32 @@ class MetaPathWalker:
             results.append(list(current_path))
             return
 
-        target_edge_type = meta_path.edge_types[depth]
-        target_node_type = meta_path.node_types[depth + 1]
+        # Only the bucket matching the next hop's edge/node types is visited
+        hop = (meta_path.edge_types[depth], meta_path.node_types[depth + 1])
+        for neighbor, _ in self._typed_adjacency().get(current_node, {}).get(hop, []):
+            current_path.append(neighbor)
+            self._dfs(neighbor, meta_path, depth + 1, current_path, results)
+            current_path.pop()
+
+    def count_paths_by_target(self, start_node: str, meta_path: MetaPath) -> dict:
+        """
+        Counting mode: {end_node: (path instances, sum of compute_path_sim over them)},
+        computed hop by hop without materializing any path.
+        """
+        layer = {start_node: (1, 1.0)}
+        for edge_type, node_type in zip(meta_path.edge_types, meta_path.node_types[1:]):
+            next_layer = {}
+            for node, (count, sim) in layer.items():
+                for neighbor, weight in self.neighbors(node, edge_type, node_type):
+                    c, s = next_layer.get(neighbor, (0, 0.0))
+                    next_layer[neighbor] = (c + count, s + sim * weight)
+            layer = next_layer
+        return layer
 
-        for neighbor in self.graph.successors(current_node):
-            edge_data = self.graph.get_edge_data(current_node, neighbor)
-            node_data = self.graph.nodes[neighbor]
-            
-            # Type Check
-            if edge_data.get('type') == target_edge_type and \
-               node_data.get('type') == target_node_type:
-                
-                # Recurse
-                current_path.append(neighbor)
-                self._dfs(neighbor, meta_path, depth + 1, current_path, results)
-                current_path.pop()
+    def count_paths(self, start_node: str, meta_path: MetaPath) -> tuple:
+        """Counting mode: (number of path instances, sum of their compute_path_sim products)."""
+        by_target = self.count_paths_by_target(start_node, meta_path).values()
+        return sum(c for c, _ in by_target), sum(s for _, s in by_target)
 
     def compute_path_sim(self, path_instance: list) -> float:
         """
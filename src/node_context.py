@@ -0,0 +1,73 @@
+from .llm_client import LLMClient
+
+PATCH_PREFIX = 200 # Characters of each patch shown to the LLM
+
+class NodeContextIndex:
+    """
+    Memoized LLM evidence per HIN node: type, message/description, topics,
+    languages, the truncated diff summary of a commit's 'modifies' edges and the
+    rendered evidence block of the prompt. Built on first use of a node, so MCTS
+    revisits (and every later prompt about the node) cost a dict lookup and send
+    byte-identical evidence, which keeps LLM response and prompt caches hitting.
+    Call invalidate() after changing a node's data or out-edges.
+    """
+    def __init__(self, topology, patch_store=None):
+        """
+        topology: networkx DiGraph or CompactGraph to read node data and edges from.
+        patch_store: Source of diff text for edges carrying a 'patch_id'.
+        """
+        self.topology = topology
+        self.patch_store = patch_store
+        self._contexts = {}
+
+    def __len__(self):
+        return len(self._contexts)
+
+    def __contains__(self, node_id):
+        return node_id in self._contexts
+
+    def get(self, node_id: str) -> dict:
+        """The context dict of `node_id` (shared between callers; do not mutate)."""
+        context = self._contexts.get(node_id)
+        if context is None:
+            context = self._contexts[node_id] = self._build(node_id)
+        return context
+
+    def precompute(self, node_ids) -> int:
+        """Builds the contexts of `node_ids` up front; returns how many were new."""
+        new = [n for n in node_ids if n not in self._contexts]
+        for n in new:
+            self.get(n)
+        return len(new)
+
+    def invalidate(self, node_id: str = None):
+        """Drops the memoized context of `node_id` (of every node if None)."""
+        if node_id is None:
+            self._contexts.clear()
+        else:
+            self._contexts.pop(node_id, None)
+
+    def diff_summary(self, commit_node_id: str) -> str:
+        """The first PATCH_PREFIX characters of every patch the commit applies."""
+        parts = []
+        for _, v, data in self.topology.out_edges(commit_node_id, data=True):
+            if data.get('type') == 'modifies':
+                if self.patch_store is not None and 'patch_id' in data:
+                    patch = self.patch_store.prefix(data['patch_id'], PATCH_PREFIX) # Lazy: only the prefix is inflated
+                else:
+                    patch = data.get('patch_content', '')[:PATCH_PREFIX] # Graphs built before the patch store
+                parts.append(f"\nFile: {v}\nPatch: {patch}...")
+        return "".join(parts)
+
+    def _build(self, node_id: str) -> dict:
+        node_data = self.topology.nodes[node_id]
+        context = {
+            "type": node_data.get('type'),
+            "message": node_data.get('message', ''),
+            "description": node_data.get('description', ''),
+            "topics": node_data.get('topics', []),
+            "languages": node_data.get('languages', {}),
+            "diff_summary": self.diff_summary(node_id) if node_data.get('type') == 'commit' else ""
+        }
+        context["evidence"] = LLMClient.render_evidence(context)
+        return context
@@ -0,0 +1,137 @@
+import json
+import mmap
+import os
+import threading
+import zlib
+
+class PatchStore:
+    """
+    Append-only store of raw commit patches, kept out of the graph.
+    Each patch is a zlib blob in a flat data file (read through mmap); a small
+    JSON index maps (commit node, file node) -> patch id -> (offset, length).
+    'modifies' edges only carry the integer `patch_id`.
+    A rebuilt store is staged next to the live one and only replaces it on
+    commit(), which is done together with saving the graph that references it.
+    """
+    def __init__(self, path: str, reset: bool = False, staged: bool = False, read_only: bool = False):
+        """
+        path: Data file; the index lives next to it at `path + '.idx'`. Graphs record this path.
+        reset: Start empty (full rebuild). The new patches are staged in `path + '.tmp'`,
+               so graphs saved earlier keep their patches until commit().
+        staged: Reopen a store staged by an earlier reset (e.g. a resumed batch);
+                falls back to `path` if it was committed meanwhile.
+        read_only: Open without a write handle (put() is refused).
+        """
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        self.staged = reset or (staged and os.path.exists(path + ".tmp"))
+        self.data_path = path + ".tmp" if self.staged else path
+        self.index_path = self.data_path + ".idx"
+        self.read_only = read_only
+        self.lock = threading.Lock()
+        self.keys = [] # patch_id -> [commit, file]
+        self.offsets = []
+        self.lengths = []
+        if reset or not os.path.exists(self.data_path):
+            if not read_only:
+                open(self.data_path, "wb").close()
+        elif os.path.exists(self.index_path):
+            with open(self.index_path, "r") as f:
+                index = json.load(f)
+            self.keys, self.offsets, self.lengths = index["keys"], index["offsets"], index["lengths"]
+        self.ids = {tuple(key): i for i, key in enumerate(self.keys)}
+        self.size = os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+        self._file = None if read_only else open(self.data_path, "ab")
+        self._map = None # Mapped lazily, remapped after appends
+
+    def __len__(self):
+        return len(self.keys)
+
+    def put(self, commit: str, file: str, patch: str) -> int:
+        """Stores a patch and returns its id (existing ids are reused)."""
+        key = (commit, file)
+        if self.read_only:
+            raise ValueError(f"PatchStore {self.path} is read-only")
+        with self.lock:
+            if key in self.ids:
+                return self.ids[key]
+            blob = zlib.compress(patch.encode("utf-8"))
+            self._file.write(blob)
+            self.offsets.append(self.size)
+            self.lengths.append(len(blob))
+            self.size += len(blob)
+            self.keys.append(list(key))
+            self.ids[key] = len(self.keys) - 1
+            self._map = None
+            return self.ids[key]
+
+    def _blob(self, patch_id: int) -> bytes:
+        with self.lock:
+            if self._map is None or len(self._map) < self.size:
+                if self._file is not None:
+                    self._file.flush()
+                if self.size == 0:
+                    return b""
+                with open(self.data_path, "rb") as f:
+                    self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            offset = self.offsets[patch_id]
+            return self._map[offset: offset + self.lengths[patch_id]]
+
+    def get(self, patch_id: int) -> str:
+        return zlib.decompress(self._blob(patch_id)).decode("utf-8")
+
+    def get_for(self, commit: str, file: str) -> str:
+        """Patch of `file` in `commit` (node ids), or '' if unknown."""
+        patch_id = self.ids.get((commit, file))
+        return "" if patch_id is None else self.get(patch_id)
+
+    def prefix(self, patch_id: int, length: int) -> str:
+        """First `length` characters, decompressing only as much as needed."""
+        head = zlib.decompressobj().decompress(self._blob(patch_id), length * 4) # UTF-8 is at most 4 bytes/char
+        return head.decode("utf-8", errors="ignore")[:length]
+
+    def flush(self):
+        """Persists appended patches and the index."""
+        if self._file is None:
+            return
+        with self.lock:
+            self._file.flush()
+            tmp = self.index_path + ".tmp"
+            with open(tmp, "w") as f:
+                json.dump({"keys": self.keys, "offsets": self.offsets, "lengths": self.lengths}, f)
+            os.replace(tmp, self.index_path)
+
+    def commit(self):
+        """Replaces the live store with the staged one (no-op if nothing is staged)."""
+        self.flush()
+        with self.lock:
+            if not self.staged:
+                return
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            if self._file is not None:
+                self._file.close()
+            if not os.path.exists(self.data_path): # Staged without a single patch
+                open(self.data_path, "wb").close()
+            if os.path.exists(self.index_path):
+                os.replace(self.index_path, self.path + ".idx")
+            elif os.path.exists(self.path + ".idx"):
+                os.remove(self.path + ".idx")
+            os.replace(self.data_path, self.path)
+            self.staged = False
+            self.data_path = self.path
+            self.index_path = self.path + ".idx"
+            self._file = None if self.read_only else open(self.path, "ab")
+
+    def close(self):
+        """Flushes and closes; a staged store stays staged (see commit)."""
+        self.flush()
+        with self.lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if self._map is not None:
+                self._map.close()
+                self._map = None
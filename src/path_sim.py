@@ -0,0 +1,91 @@
+import numpy as np
+import scipy.sparse as sp
+from .meta_paths import MetaPath
+
+class PathSim:
+    """
+    Meta-path similarity across many developers via sparse commuting matrices.
+
+    Nodes of every given HIN (networkx DiGraph or CompactGraph) are merged by id,
+    so developers sharing repositories/files end up connected. For a half meta-path
+    P (e.g. EXPERTISE_PATH: developer -> repository -> commit -> file) the commuting
+    matrix C = A_1 @ A_2 @ ... holds, per (start, end) pair, the summed weight
+    products of all P instances (the bulk form of MetaPathWalker.compute_path_sim),
+    or the instance counts if weighted=False. PathSim over the symmetric path P.P^-1 is
+        s(x, y) = 2 M_xy / (M_xx + M_yy),   M = C C^T.
+    """
+    def __init__(self, graphs: list, weighted: bool = True):
+        self.weighted = weighted
+        self.node_type = {}
+        self.edges = {} # (u, v) -> (edge_type, weight); the last graph wins on duplicates
+        for graph in graphs:
+            for n, d in graph.nodes(data=True):
+                self.node_type[n] = d.get('type')
+            for u, v, d in graph.edges(data=True):
+                self.edges[(u, v)] = (d.get('type'), d.get('weight', 1.0))
+
+        self.nodes_by_type = {}
+        for n, t in self.node_type.items():
+            self.nodes_by_type.setdefault(t, []).append(n)
+        self.position = {
+            t: {n: i for i, n in enumerate(nodes)} for t, nodes in self.nodes_by_type.items()
+        }
+        self._adjacency = {}
+
+    def nodes(self, node_type: str) -> list:
+        """Row/column labels of matrices indexed by `node_type`."""
+        return self.nodes_by_type.get(node_type, [])
+
+    def adjacency(self, edge_type: str, src_type: str, dst_type: str) -> sp.csr_matrix:
+        """Sparse |src_type| x |dst_type| matrix of `edge_type` edges (cached)."""
+        key = (edge_type, src_type, dst_type)
+        if key not in self._adjacency:
+            rows, cols, vals = [], [], []
+            src_pos, dst_pos = self.position.get(src_type, {}), self.position.get(dst_type, {})
+            for (u, v), (t, w) in self.edges.items():
+                if t == edge_type and u in src_pos and v in dst_pos:
+                    rows.append(src_pos[u])
+                    cols.append(dst_pos[v])
+                    vals.append(w if self.weighted else 1.0)
+            shape = (len(self.nodes(src_type)), len(self.nodes(dst_type)))
+            self._adjacency[key] = sp.csr_matrix((vals, (rows, cols)), shape=shape)
+        return self._adjacency[key]
+
+    def commuting_matrix(self, meta_path: MetaPath) -> sp.csr_matrix:
+        """C = product of the typed adjacency matrices along `meta_path`."""
+        hops = zip(meta_path.edge_types, meta_path.node_types, meta_path.node_types[1:])
+        matrix = None
+        for edge_type, src_type, dst_type in hops:
+            a = self.adjacency(edge_type, src_type, dst_type)
+            matrix = a if matrix is None else matrix @ a
+        return matrix.tocsr()
+
+    def similarity(self, meta_path: MetaPath) -> sp.csr_matrix:
+        """
+        PathSim for all pairs of `meta_path.node_types[0]` nodes (sparse; pairs with
+        no shared path are absent). Rows/columns follow nodes(start type).
+        """
+        c = self.commuting_matrix(meta_path)
+        m = (c @ c.T).tocoo()
+        diag = np.asarray(c.multiply(c).sum(axis=1)).ravel()
+        denom = diag[m.row] + diag[m.col]
+        scores = np.divide(2.0 * m.data, denom, out=np.zeros_like(m.data), where=denom > 0)
+        return sp.csr_matrix((scores, (m.row, m.col)), shape=m.shape)
+
+    def top_k(self, node: str, meta_path: MetaPath, k: int = 10) -> list:
+        """[(other node, PathSim score)] of the k most similar peers of `node` (itself excluded)."""
+        start_type = meta_path.node_types[0]
+        i = self.position.get(start_type, {}).get(node)
+        if i is None:
+            return []
+        c = self.commuting_matrix(meta_path)
+        diag = np.asarray(c.multiply(c).sum(axis=1)).ravel()
+        if diag[i] == 0:
+            return []
+        row = (c[i] @ c.T).toarray().ravel() # M_i* without forming the full M
+        scores = 2.0 * row / (diag[i] + diag)
+        scores[i] = 0.0
+        candidates = np.flatnonzero(scores > 0)
+        best = candidates[np.argsort(-scores[candidates], kind='stable')[:k]]
+        peers = self.nodes(start_type)
+        return [(peers[j], float(scores[j])) for j in best]
@@ -0,0 +1,55 @@
+import threading
+import time
+
+class TokenBucket:
+    """
+    Thread-safe token bucket shared by all workers hitting the same API.
+    Tokens refill at a configured ceiling (protects against secondary limits),
+    while the provider's rate-limit headers cap the total quota: once the
+    remaining quota is spent, acquire() blocks until the window resets.
+    """
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate # Refill rate (tokens per second)
+        self.capacity = capacity # Burst size
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+        # Primary quota as last reported by the server (None = unknown)
+        self.quota_remaining = None
+        self.quota_reset_at = 0.0 # Epoch seconds
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def acquire(self, tokens: float = 1.0):
+        """
+        Blocks until `tokens` are available, then consumes them.
+        """
+        while True:
+            with self.lock:
+                self._refill()
+                if self.quota_remaining is not None and self.quota_remaining < tokens:
+                    if time.time() >= self.quota_reset_at:
+                        # Window has rolled over; the next response re-syncs the quota
+                        self.quota_remaining = None
+                        continue
+                    wait = self.quota_reset_at - time.time()
+                elif self.tokens >= tokens:
+                    self.tokens -= tokens
+                    if self.quota_remaining is not None:
+                        self.quota_remaining -= tokens
+                    return
+                else:
+                    wait = (tokens - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def update_from_headers(self, remaining: int, reset_at: float):
+        """
+        Syncs the quota with X-RateLimit-Remaining / X-RateLimit-Reset.
+        """
+        with self.lock:
+            self.quota_remaining = remaining
+            self.quota_reset_at = reset_at
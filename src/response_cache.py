@@ -0,0 +1,83 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from .config import Config
+
+try:
+    import brotli
+except ImportError: # Optional: gzip is always available
+    brotli = None
+
+class CachedResponse:
+    """Pre-serialized JSON body with its ETag and compressed variants."""
+    def __init__(self, body: bytes, stamp: tuple):
+        self.body = body
+        self.stamp = stamp # (mtime_ns, size) of the source file
+        self.etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        self.encoded = {"gzip": gzip.compress(body, compresslevel=6)}
+        if brotli is not None:
+            self.encoded["br"] = brotli.compress(body)
+        self.size = len(body) + sum(len(payload) for payload in self.encoded.values())
+
+    def negotiate(self, accept_encoding: str) -> tuple:
+        """Returns (encoding or None, payload) for an Accept-Encoding header."""
+        accepted = {part.split(";")[0].strip() for part in (accept_encoding or "").split(",")}
+        for encoding in ("br", "gzip"):
+            if encoding in accepted and encoding in self.encoded:
+                return encoding, self.encoded[encoding]
+        return None, self.body
+
+class ResponseCache:
+    """
+    In-process LRU of serialized API responses, each tied to the output file it
+    was built from. An entry is rebuilt when the file's mtime or size changes,
+    so a finished (re)profiling run is picked up on the next request.
+    Bounded by both entry count and total size (CachedResponse.size); a response
+    larger than `max_bytes` on its own is served but not kept.
+    """
+    def __init__(self, max_entries: int = Config.RESPONSE_CACHE_MAX_ENTRIES,
+                 max_bytes: int = Config.RESPONSE_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, path: str, build) -> CachedResponse:
+        """
+        Returns the cached response for `key`, rebuilding it with `build()` (which
+        returns JSON-serializable data) if `path` changed since it was cached.
+        Raises FileNotFoundError if `path` does not exist.
+        """
+        st = os.stat(path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry.stamp == stamp:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        # Built outside the lock; concurrent misses for the same key just race to store
+        entry = CachedResponse(json.dumps(build()).encode("utf-8"), stamp)
+        with self.lock:
+            old = self.entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old.size
+            if entry.size <= self.max_bytes:
+                self.entries[key] = entry
+                self.bytes += entry.size
+            while len(self.entries) > self.max_entries or self.bytes > self.max_bytes:
+                self.bytes -= self.entries.popitem(last=False)[1].size
+        return entry
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
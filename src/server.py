@@ -1,18 +1,31 @@
-from fastapi import FastAPI, HTTPException, Request, Response, BackgroundTasks
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+import asyncio
 import json
 import os
-import pickle
-import networkx as nx
 import requests
 from .config import Config
-from .main import run_pipeline
+from . import graph_format
+from .jobs import TERMINAL, JobQueue
+from .main import graph_path
+from .response_cache import ResponseCache
 
 app = FastAPI()
 
-# Track in-progress profiling tasks to avoid duplicates
-profiling_tasks = set()
+# Profiling runs are queued here and executed by separate worker processes
+# (python -m src.jobs); opened on first use
+job_queue = None
+
+def get_job_queue() -> JobQueue:
+    global job_queue
+    if job_queue is None:
+        job_queue = JobQueue()
+    return job_queue
+
+# Serialized /graph and /profile responses, invalidated when the output file changes
+response_cache = ResponseCache()
 
 # GITHUB OAUTH CONFIG
 CLIENT_ID = os.getenv("GITHUB_CLIENT_ID", "")
@@ -65,47 +78,168 @@ def auth_callback(code: str):
 
 # --- DATA ENDPOINTS ---
 
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison of `etag` against an If-None-Match list ('"a", W/"b"' or '*')."""
+    tags = [tag.strip() for tag in (if_none_match or "").split(",")]
+    return "*" in tags or etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+def cached_json_response(request: Request, key, path: str, build) -> Response:
+    """
+    Serves `build()` as JSON from the response cache, with ETag revalidation
+    (304 when If-None-Match matches) and gzip/brotli negotiation.
+    """
+    entry = response_cache.get(key, path, build)
+    headers = {"ETag": entry.etag, "Vary": "Accept-Encoding", "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    
+    encoding, payload = entry.negotiate(request.headers.get("accept-encoding", ""))
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=payload, media_type="application/json", headers=headers)
+
+def load_json(path: str):
+    with open(path, "r") as f:
+        return json.load(f)
+
+def job_status(job: dict) -> dict:
+    return {
+        "job_id": job["id"],
+        "username": job["username"],
+        "status": job["status"],
+        "phase": job["phase"],
+        "message": job["message"],
+        "error": job["error"],
+        "cancel_requested": bool(job["cancel_requested"]),
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+    }
+
 @app.get("/profile/{username}")
-async def get_profile(username: str, background_tasks: BackgroundTasks):
+def get_profile(request: Request, username: str):
+    # Plain def: FastAPI runs it in the threadpool, so a busy job database never blocks the event loop
     path = os.path.join("output", f"{username}_profile.json")
     
     if os.path.exists(path):
-        with open(path, "r") as f:
-            return json.load(f)
-            
-    # If not found, check if already profiling
-    if username in profiling_tasks:
-        return {"status": "processing", "message": "Inference engine is active. Manifold decoding in progress."}
-    
-    # Start background profiling
-    profiling_tasks.add(username)
-    background_tasks.add_task(trigger_profiling, username)
+        return cached_json_response(request, ("profile", username), path, lambda: load_json(path))
     
-    return {"status": "accepted", "message": "Inference requested. Initializing MCTS exploration."}
-
-def trigger_profiling(username: str):
-    try:
-        run_pipeline(username, iterations=15)
-    except Exception as e:
-        print(f"--- ERROR: Profiling failed for {username} ---")
-        print(f"Exception Type: {type(e).__name__}")
-        print(f"Details: {str(e)}")
-        # If it's a 401, it's almost certainly a missing/invalid GITHUB_TOKEN in Railway
-        if "401" in str(e) or "BadCredentials" in type(e).__name__:
-            print("CRITICAL: GITHUB_TOKEN is either missing or invalid in your Railway Environment Variables.")
-    finally:
-        if username in profiling_tasks:
-            profiling_tasks.remove(username)
+    # Deduplicated across API processes: an active job for the user is reused
+    job, created = get_job_queue().submit(username, iterations=15)
+    if not created:
+        return {"status": "processing", "job_id": job["id"], "phase": job["phase"],
+                "message": "Inference engine is active. Manifold decoding in progress."}
+    return {"status": "accepted", "job_id": job["id"],
+            "message": "Inference requested. Initializing MCTS exploration."}
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: int):
+    job = get_job_queue().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_status(job)
+
+@app.get("/profile/{username}/status")
+def get_profile_status(username: str):
+    """Most recent profiling job of the user."""
+    job = get_job_queue().latest(username)
+    if job is None:
+        raise HTTPException(status_code=404, detail="No profiling job for this user")
+    return job_status(job)
+
+def sse_frame(kind: str, data, event_id: int = None) -> str:
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {kind}\ndata: {json.dumps(data)}\n\n"
+
+async def job_event_stream(job_id: int, last_event_id: int = 0, disconnected=None):
+    """
+    Server-sent events for a job: everything logged after `last_event_id`, then
+    new events as the worker appends them, ending with the final 'status' event.
+    The shared event log is read every JOB_EVENT_POLL seconds on the server side,
+    replacing client polling of /profile.
+    """
+    queue = get_job_queue()
+    idle = 0.0
+    while True:
+        events = await run_in_threadpool(queue.events, job_id, last_event_id)
+        for event in events:
+            last_event_id = event["id"]
+            yield sse_frame(event["kind"], event["data"], event["id"])
+            if event["kind"] == "status" and event["data"]["status"] in TERMINAL:
+                return
+        if events:
+            idle = 0.0
+            continue
+        
+        job = await run_in_threadpool(queue.get, job_id)
+        if job is None or job["status"] in TERMINAL:
+            # Finished between the two reads, or its log was already pruned
+            tail = await run_in_threadpool(queue.events, job_id, last_event_id)
+            for event in tail:
+                yield sse_frame(event["kind"], event["data"], event["id"])
+            if not any(e["kind"] == "status" for e in tail):
+                yield sse_frame("status", {"status": job["status"] if job else "unknown", "error": job and job["error"]})
+            return
+        if disconnected is not None and await disconnected():
+            return
+        
+        idle += Config.JOB_EVENT_POLL
+        if idle >= 15:
+            yield ": keep-alive\n\n" # Keeps proxies from closing an idle stream
+            idle = 0.0
+        await asyncio.sleep(Config.JOB_EVENT_POLL)
+
+def event_stream_response(request: Request, job_id: int) -> StreamingResponse:
+    # Browsers resend the last id they saw when an EventSource reconnects
+    header = request.headers.get("last-event-id", "").strip()
+    last_event_id = int(header) if header.isdigit() else 0 # Malformed ids replay from the start
+    return StreamingResponse(
+        job_event_stream(job_id, last_event_id, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/jobs/{job_id}/events")
+def get_job_events(request: Request, job_id: int):
+    """
+    Streams a profiling job's progress: 'phase', 'iteration' (MCTS reward and
+    convergence), 'skill' (newly discovered skill node), 'confidence' (a skill's
+    final metrics) and the closing 'status'.
+    """
+    if get_job_queue().get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return event_stream_response(request, job_id)
+
+@app.get("/profile/{username}/events")
+def get_profile_events(request: Request, username: str):
+    """Event stream of the user's most recent profiling job."""
+    job = get_job_queue().latest(username)
+    if job is None:
+        raise HTTPException(status_code=404, detail="No profiling job for this user")
+    return event_stream_response(request, job["id"])
+
+@app.delete("/jobs/{job_id}")
+def cancel_job(job_id: int):
+    job = get_job_queue().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_status(job)
 
 @app.get("/graph/{username}")
-def get_graph(username: str):
-    # (Existing graph conversion logic...)
-    path = os.path.join("output", f"{username}_graph.pkl")
-    if not os.path.exists(path):
+def get_graph(request: Request, username: str):
+    path = graph_path(username)
+    if not os.path.exists(path): # Legacy .pkl graphs are only read by `python -m src.main --migrate-graphs`
         raise HTTPException(status_code=404, detail="Graph not found")
-        
-    with open(path, "rb") as f:
-        G = pickle.load(f)
+    return cached_json_response(request, ("graph", username), path, lambda: build_graph_view(path))
+
+def build_graph_view(path: str) -> dict:
+    """Node/link lists for the force-graph visualization."""
+    # Only the columns the visualization needs are read (memory-mapped, no unpickling)
+    cols = graph_format.read_columns(path, [
+        'node_id', 'node_label', 'node_type', 'node_type_names',
+        'edge_src', 'edge_dst', 'edge_type', 'edge_type_names'
+    ])
+    ids = cols['node_id']
     
     type_map = {
         'developer': 'dev',
@@ -115,12 +249,13 @@ def get_graph(username: str):
     }
     
     nodes = []
-    for n, d in G.nodes(data=True):
-        raw_type = d.get('type', 'unknown')
+    node_types = cols['node_type_names']
+    for n, label, code in zip(ids, cols['node_label'], cols['node_type'].tolist()):
+        raw_type = node_types[code] or 'unknown'
         group = type_map.get(raw_type, raw_type)
         
         # Determine best label
-        label = d.get('name') or d.get('login') or n
+        label = label or n
         if group == 'dev':
             label = f"Developer: {label}"
         
@@ -138,11 +273,12 @@ def get_graph(username: str):
         })
         
     links = []
-    for u, v, d in G.edges(data=True):
+    edge_types = cols['edge_type_names']
+    for u, v, code in zip(cols['edge_src'].tolist(), cols['edge_dst'].tolist(), cols['edge_type'].tolist()):
         links.append({
-            "source": u,
-            "target": v,
-            "type": d.get('type', 'rel')
+            "source": ids[u],
+            "target": ids[v],
+            "type": edge_types[code] or 'rel'
         })
         
     return {"nodes": nodes, "links": links}
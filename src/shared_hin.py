@@ -0,0 +1,73 @@
+import os
+import networkx as nx
+from .config import Config
+from .graph_builder import GitHubFetcher, HINBuilder
+from .github_cache import GitHubCache
+from .patch_store import PatchStore
+
+class SharedHIN:
+    """
+    One HIN for a whole team. Repos, commits and files are deduplicated by their
+    canonical ids ('repo:owner/name', 'commit:<sha7>', 'file:<path>'), so shared
+    repos are fetched, weighted and explored once; each developer's profile is
+    computed on a read-only view of the shared graph.
+    Commits record who authored them in an 'authors' node attribute.
+    """
+    def __init__(self, name: str, fetcher: GitHubFetcher = None, graph: nx.DiGraph = None,
+                 patch_store: PatchStore = None):
+        """
+        graph: A previously saved shared HIN to extend.
+        patch_store: Defaults to output/patches/{name}.bin, reset unless extending a graph.
+        """
+        self.name = name
+        if fetcher is None:
+            fetcher = GitHubFetcher(cache=GitHubCache() if Config.USE_GITHUB_CACHE else None)
+        self.fetcher = fetcher
+        if patch_store is None:
+            patch_store = PatchStore(os.path.join(Config.PATCH_STORE_DIR, f"{name}.bin"), reset=graph is None)
+        self.patch_store = patch_store
+        self.graph = graph if graph is not None else nx.DiGraph()
+        self.graph.graph.setdefault('developers', [])
+
+    @property
+    def developers(self) -> list:
+        return self.graph.graph['developers']
+
+    def add_developer(self, username: str, streaming: bool = Config.HIN_STREAMING) -> set:
+        """
+        Merges a developer's repos and commits into the shared graph.
+        Returns the nodes this developer added (what is left to explore).
+        """
+        builder = HINBuilder(username, fetcher=self.fetcher, graph=self.graph,
+                             patch_store=self.patch_store, shared=True)
+        builder.build_raw_topology(streaming=streaming)
+        if username not in self.developers:
+            self.developers.append(username)
+        return builder.new_nodes
+
+    def developer_nodes(self, username: str) -> set:
+        """
+        The developer, the repos they contribute to, the commits they authored
+        and the files/skills reached from those.
+        """
+        dev = f"dev:{username}"
+        if dev not in self.graph:
+            return set()
+        nodes = {dev}
+        for repo in self.graph.successors(dev):
+            nodes.add(repo)
+            for commit in self.graph.successors(repo):
+                if username in self.graph.nodes[commit].get('authors', ()):
+                    nodes.add(commit)
+                    nodes.update(self.graph.successors(commit)) # Files and implied skills
+            # Skills inferred from the repository itself
+            nodes.update(n for n in self.graph.successors(repo) if self.graph.nodes[n].get('type') == 'skill')
+        return nodes
+
+    def view(self, username: str) -> nx.DiGraph:
+        """
+        Read-only subgraph view of one developer (shares data with the shared graph).
+        Node membership is fixed when the view is taken, so take a new one after
+        exploration has added skills.
+        """
+        return self.graph.subgraph(self.developer_nodes(username))
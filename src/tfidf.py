@@ -1,7 +1,11 @@
 import re
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.preprocessing import normalize
 import numpy as np
 
+# Added lines only: '+' prefix, excluding the '+++' file header
+ADDED_LINE = re.compile(r"^\+(?!\+\+)(.*)$", re.MULTILINE)
+
 class TFIDFCalculator:
     """
     Implements TF-IDF weighting for code modifications.
@@ -24,25 +28,28 @@ class TFIDFCalculator:
         """
         if not patch:
             return ""
-        
-        relevant_text = []
-        for line in patch.split('\n'):
-            if line.startswith('+') and not line.startswith('+++'):
-                relevant_text.append(line[1:]) # Remove the '+' marker
-        return " ".join(relevant_text)
+        return " ".join(ADDED_LINE.findall(patch)) # Remove the '+' marker
+
+    def preprocess_patches(self, patches: list[str]) -> list[str]:
+        return [self._preprocess_patch(p) for p in patches]
 
     def fit_corpus(self, commits: list[dict]):
         """
         Fits the TF-IDF model on the corpus of all commit patches.
-        commits: List of dicts with 'files' -> [{'patch': ...}]
+        commits: List of dicts with 'files' -> [{'patch': ...}] ('patch_content' also accepted)
         """
         corpus = []
         for commit in commits:
-            commit_text = ""
-            for f in commit.get('files', []):
-                commit_text += " " + self._preprocess_patch(f.get('patch_content', ''))
-            corpus.append(commit_text)
-            
+            files = commit.get('files', [])
+            corpus.append(" ".join(self.preprocess_patches(
+                [f.get('patch', f.get('patch_content', '')) for f in files]
+            )))
+        self.fit_documents(corpus)
+
+    def fit_documents(self, corpus: list[str]):
+        """
+        Fits the TF-IDF model on already-preprocessed documents (one per commit).
+        """
         if not corpus or len(corpus) == 0:
             print("Warning: Empty corpus for TF-IDF")
             return
@@ -59,30 +66,88 @@ class TFIDFCalculator:
         Calculates the aggregate TF-IDF score for a specific file patch.
         Returns a normalized weight (0.0 - 1.0) indicating semantic richness.
         """
-        if not self.is_fitted or not patch_content:
-            return 0.1 # Baseline weight for empty/non-fitted
-            
-        cleaned_text = self._preprocess_patch(patch_content)
-        if not cleaned_text.strip():
-            return 0.1
-            
-        tfidf_matrix = self.vectorizer.transform([cleaned_text])
+        return float(self.compute_weights([patch_content])[0])
+
+    def compute_weights(self, patches: list[str], preprocessed: bool = False) -> np.ndarray:
+        """
+        Batch version of compute_weight: one sparse transform for all patches.
+        preprocessed: The inputs are already outputs of preprocess_patches.
+        """
+        weights = np.full(len(patches), 0.1) # Baseline weight for empty/non-fitted
+        if not self.is_fitted or not patches:
+            return weights
+        
+        cleaned = patches if preprocessed else self.preprocess_patches(patches)
+        rows = [i for i, text in enumerate(cleaned) if text.strip()]
+        if not rows:
+            return weights
+        
+        tfidf_matrix = self.vectorizer.transform([cleaned[i] for i in rows])
         
         # Mathematical Logic:
         # We sum the TF-IDF scores of all terms in the patch.
         # This represents the "Total Information Content" of the change.
-        total_score = np.sum(tfidf_matrix.data)
+        total_scores = np.asarray(tfidf_matrix.sum(axis=1)).ravel()
         
         # Log-normalization to squash extreme values (large refactors) into 0-1 range
         # We use a gentle squash so small diffs still register.
-        weight = np.log1p(total_score) # log(1+x)
-        
-        # Normalize to typical range [0, 1] essentially
         # For a single unique term, score ~1.0 -> weight ~0.69
         # For huge diffs, score ~100 -> weight ~4.6. We clip at 1.0.
         
         # We want to distinguish ANY match (>0) from NO match (0).
         # So we clip lower bound very low, or handling 0 separately.
+        weights[rows] = np.clip(np.log1p(total_scores), 0.01, 1.0) # log(1+x)
+        return weights
+
+class StreamingTFIDF:
+    """
+    Online TF-IDF for streamed corpora: terms are hashed (no vocabulary fit)
+    and document frequencies are accumulated batch by batch, so the corpus
+    never has to be held in memory. IDF and row normalization follow
+    TfidfVectorizer's defaults (smooth idf, l2); there is no max_features
+    cap, so weights can differ slightly from TFIDFCalculator.
+    """
+    def __init__(self, n_features: int = 2 ** 18):
+        self.vectorizer = HashingVectorizer(
+            token_pattern=r"(?u)\b\w\w+\b",
+            stop_words='english',
+            n_features=n_features,
+            alternate_sign=False, # Raw term counts
+            norm=None
+        )
+        self.doc_freq = np.zeros(n_features)
+        self.n_docs = 0
+
+    def partial_fit(self, documents: list[str]):
+        """
+        Adds preprocessed documents (one per commit) to the DF statistics.
+        """
+        if not documents:
+            return
+        counts = self.vectorizer.transform(documents)
+        self.doc_freq += np.asarray((counts > 0).sum(axis=0)).ravel()
+        self.n_docs += len(documents)
+
+    def count(self, texts: list[str]) -> tuple:
+        """
+        Term counts of preprocessed patches (sparse rows), kept instead of the
+        text until the corpus statistics are final.
+        Returns (counts, nonempty) where nonempty flags rows with any text.
+        """
+        nonempty = np.array([bool(text.strip()) for text in texts], dtype=bool)
+        return self.vectorizer.transform(texts), nonempty
+
+    def compute_weights(self, counts, nonempty: np.ndarray) -> np.ndarray:
+        """
+        Same scoring as TFIDFCalculator.compute_weights, from count() output.
+        Rows without text keep the 0.1 baseline.
+        """
+        weights = np.full(counts.shape[0], 0.1)
+        if self.n_docs == 0 or not self.doc_freq.any():
+            return weights
         
-        final_weight = min(1.0, max(0.01, weight))
-        return final_weight
+        idf = np.log((1 + self.n_docs) / (1 + self.doc_freq)) + 1
+        tfidf_matrix = normalize(counts.multiply(idf).tocsr())
+        total_scores = np.asarray(tfidf_matrix.sum(axis=1)).ravel()
+        weights[nonempty] = np.clip(np.log1p(total_scores[nonempty]), 0.01, 1.0)
+        return weights
@@ -1,2 +1,6 @@
 #!/bin/bash
+# Convert graphs pickled by older versions once; the API never unpickles
+python -m src.main --migrate-graphs
+# Profiling jobs run in their own process, not inside the API workers
+python -m src.jobs --workers "${JOB_WORKERS:-1}" &
 gunicorn -k uvicorn.workers.UvicornWorker -w 2 -b 0.0.0.0:8000 --timeout 120 src.server:app
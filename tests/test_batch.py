@@ -0,0 +1,98 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from http.server import ThreadingHTTPServer
+from github import Github
+from src import graph_format
+from src.batch import BatchRunner, read_usernames
+from src.graph_builder import GitHubFetcher
+from src.llm_client import LLMClient
+from tests.test_explorer import StubModel
+from tests.test_fetcher import FakeGitHubHandler
+
+class TestBatchRunner(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGitHubHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        host, port = cls.server.server_address
+        cls.base_url = f"http://{host}:{port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        FakeGitHubHandler.detail_requests = 0
+
+    def _runner(self, model):
+        client = Github(base_url=self.base_url, retry=None, seconds_between_requests=None)
+        return BatchRunner(
+            iterations=6, io_workers=2, cpu_workers=1,
+            checkpoint_dir=os.path.join(self.tmp.name, "batch"),
+            output_dir=os.path.join(self.tmp.name, "out"),
+            patch_dir=os.path.join(self.tmp.name, "patches"),
+            fetcher=GitHubFetcher(client=client, max_workers=2, max_rps=1000),
+            llm_client=LLMClient(model=model)
+        )
+
+    def test_batch_profiles_and_resumes_from_checkpoints(self):
+        model = StubModel()
+        report = self._runner(model).run(["alice", "bob"])
+
+        self.assertEqual(sorted(report["completed"]), ["alice", "bob"])
+        self.assertEqual(report["failed"], {})
+        self.assertGreater(report["profiles_per_hour"], 0)
+        self.assertEqual(set(report["phase_seconds"]), {"build", "explore", "confidence"})
+        with open(os.path.join(self.tmp.name, "out", "alice_profile.json")) as f:
+            profile = json.load(f)
+        self.assertEqual(profile["developer"], "alice")
+        self.assertEqual(profile["metadata"]["commit_count"], 7)
+        graph = graph_format.load_graph(os.path.join(self.tmp.name, "out", "alice_graph.npz"))
+        self.assertIn("skill:Python", graph) # Inferred skills are in the explored graph
+        self.assertEqual(len(profile["convergence_history"]), 6)
+
+        # Crash simulation: alice lost her confidence checkpoint, bob stopped after build
+        runner = self._runner(StubModel())
+        for username, keep in (("alice", 2), ("bob", 1)):
+            state = runner.load_state(username)
+            state["done"] = state["done"][:keep]
+            with open(runner._state_path(username), "w") as f:
+                json.dump(state, f)
+        os.remove(runner.profile_path("alice"))
+        fetched = FakeGitHubHandler.detail_requests
+        alice_explored = os.stat(runner.graph_path("alice")).st_mtime_ns
+
+        resumed_model = StubModel()
+        runner.llm = LLMClient(model=resumed_model)
+        report = runner.run(["alice", "bob", "alice"])
+        self.assertEqual(sorted(report["completed"]), ["alice", "bob"])
+        # Nothing is fetched again, and only bob is re-explored
+        self.assertEqual(FakeGitHubHandler.detail_requests, fetched)
+        self.assertTrue(resumed_model.prompts)
+        self.assertEqual(os.stat(runner.graph_path("alice")).st_mtime_ns, alice_explored)
+        self.assertTrue(os.path.exists(runner.profile_path("alice")))
+        self.assertEqual(runner.load_state("bob")["done"], ["build", "explore", "confidence"])
+
+        report = runner.run(["alice", "bob"])
+        self.assertEqual(sorted(report["skipped"]), ["alice", "bob"])
+        self.assertEqual(report["completed"], [])
+
+    def test_read_usernames(self):
+        path = os.path.join(self.tmp.name, "devs.csv")
+        with open(path, "w") as f:
+            f.write("username,category\nalice,senior\nbob,junior\n")
+        self.assertEqual(read_usernames(path), ["alice", "bob"])
+        with open(path, "w") as f:
+            f.write("name,username\nAlice,alice\nBob,bob\n") # username as the last column
+        self.assertEqual(read_usernames(path), ["alice", "bob"])
+        self.assertEqual(read_usernames("alice, bob"), ["alice", "bob"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,458 @@
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import unittest
+import networkx as nx
+import numpy as np
+from src.agentic_explorer import MCTSAgent, MCTSNode, StoppingRule
+from src.compact_graph import CompactGraph
+from src.llm_cache import LLMResponseCache
+from src.llm_client import LLMClient
+from src.patch_store import PatchStore
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+class StubModel:
+    """Deterministic stand-in for the Gemini backend; one skill per evidence node."""
+    def __init__(self):
+        self.prompts = []
+
+    def generate_content(self, prompt):
+        self.prompts.append(prompt)
+        node_ids = re.findall(r"NODE ID: (\S+)", prompt)
+        if node_ids:
+            return StubResponse(json.dumps({
+                node_id: [{"skill": f"Skill {node_id}", "confidence": 0.8, "causal_link": "stub"}]
+                for node_id in node_ids
+            }))
+        return StubResponse('```json\n[{"skill": "Python", "confidence": 0.7, "causal_link": "stub"}]\n```')
+
+class SlowStubModel(StubModel):
+    """Stub with a fixed latency that records how many calls overlap."""
+    def __init__(self, latency=0.05):
+        super().__init__()
+        self.latency = latency
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def generate_content(self, prompt):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.latency)
+        with self.lock:
+            self.in_flight -= 1
+        return super().generate_content(prompt)
+
+def build_graph(n_commits=10):
+    g = nx.DiGraph()
+    g.add_node("dev:alice", type="developer")
+    g.add_node("repo:alice/lib", type="repository", stars=5, languages={"Python": 100}, topics=["ml"])
+    g.add_edge("dev:alice", "repo:alice/lib", type="contributes", weight=1.0)
+    for i in range(n_commits):
+        commit = f"commit:{i:07d}"
+        g.add_node(commit, type="commit", message=f"change {i}")
+        g.add_edge("repo:alice/lib", commit, type="contains", weight=1.0)
+        g.add_node(f"file:mod_{i}.py", type="file")
+        g.add_edge(commit, f"file:mod_{i}.py", type="modifies", weight=0.5, patch_content="+import numpy")
+    return g
+
+class TestBatchedInference(unittest.TestCase):
+    def test_batch_results_keyed_by_node(self):
+        model = StubModel()
+        llm = LLMClient(model=model)
+        contexts = {"commit:a": {"type": "commit", "message": "x"}, "commit:b": {"type": "commit", "message": "y"}}
+        result = llm.infer_skills_batch(contexts, reasoning_paths={"commit:a": ["root", "commit:a"]})
+
+        self.assertEqual(set(result), {"commit:a", "commit:b"})
+        self.assertEqual(result["commit:b"][0]["skill"], "Skill commit:b")
+        self.assertEqual(llm.call_count, 1)
+
+    def test_single_inference_strips_markdown(self):
+        llm = LLMClient(model=StubModel())
+        self.assertEqual(llm.infer_skills({"type": "commit"})[0]["skill"], "Python")
+
+class TestLLMResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "llm.sqlite3")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_repeat_inference_is_served_from_cache(self):
+        model = StubModel()
+        llm = LLMClient(model=model, cache=LLMResponseCache(self.path))
+        first = llm.infer_skills({"type": "commit", "message": "add  numpy"}, ["root", "commit:a"])
+        # Whitespace-only differences normalize to the same key
+        second = llm.infer_skills({"type": "commit", "message": "add numpy"}, ["root", "commit:a"])
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(model.prompts), 1)
+        self.assertEqual(llm.cache.stats()["hits"], 1)
+        self.assertEqual(llm.cache.stats()["misses"], 1)
+
+    def test_reasoning_path_can_be_excluded_from_key(self):
+        model = StubModel()
+        llm = LLMClient(model=model, cache=LLMResponseCache(self.path), cache_include_path=False)
+        llm.infer_skills({"type": "commit", "message": "x"}, ["root", "repo:a", "commit:x"])
+        llm.infer_skills({"type": "commit", "message": "x"}, ["root", "commit:x"])
+        self.assertEqual(len(model.prompts), 1)
+
+    def test_batch_only_sends_misses(self):
+        model = StubModel()
+        llm = LLMClient(model=model, cache=LLMResponseCache(self.path))
+        llm.infer_skills_batch({"commit:a": {"type": "commit", "message": "a"}})
+        result = llm.infer_skills_batch({"commit:a": {"type": "commit", "message": "a"},
+                                         "commit:b": {"type": "commit", "message": "b"}})
+
+        self.assertEqual(result["commit:a"][0]["skill"], "Skill commit:a")
+        self.assertEqual(len(model.prompts), 2)
+        self.assertNotIn("NODE ID: commit:a", model.prompts[1])
+
+    def test_lru_eviction_and_ttl(self):
+        cache = LLMResponseCache(self.path, max_entries=2)
+        cache.put("a", [1])
+        cache.put("b", [2])
+        cache.get("a") # b becomes least recently used
+        time.sleep(0.01)
+        cache.put("c", [3])
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), [1])
+        self.assertEqual(cache.stats()["entries"], 2)
+
+        cache.ttl = 0
+        time.sleep(0.01)
+        self.assertIsNone(cache.get("c"))
+        cache.close()
+
+    def test_size_bound_holds_across_processes_sharing_the_file(self):
+        first = LLMResponseCache(self.path, max_entries=2)
+        second = LLMResponseCache(self.path, max_entries=2)
+        first.put("a", [1])
+        time.sleep(0.01)
+        second.put("b", [2])
+        time.sleep(0.01)
+        first.put("c", [3]) # Sees "b" although another connection wrote it
+        self.assertEqual(first.stats()["entries"], 2)
+        self.assertEqual(second.stats()["entries"], 2)
+        self.assertIsNone(second.get("a"))
+
+        second.ttl = 0
+        time.sleep(0.01)
+        self.assertIsNone(second.get("b")) # Expired and deleted
+        first.put("d", [4])
+        self.assertEqual(first.stats()["entries"], 2)
+        first.close()
+        second.close()
+
+class TestPatchStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "patches.bin")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_store_round_trip_and_reopen(self):
+        store = PatchStore(self.path)
+        first = store.put("commit:a", "file:x.py", "+import numpy\n" * 100)
+        self.assertEqual(store.put("commit:a", "file:x.py", "ignored"), first)
+        second = store.put("commit:b", "file:y.py", "+ünïcode")
+        self.assertEqual(store.prefix(first, 13), "+import numpy")
+        store.close()
+
+        reopened = PatchStore(self.path)
+        self.assertEqual(len(reopened), 2)
+        self.assertEqual(reopened.get(second), "+ünïcode")
+        self.assertEqual(reopened.get_for("commit:a", "file:x.py"), "+import numpy\n" * 100)
+        self.assertEqual(reopened.get_for("commit:a", "file:missing.py"), "")
+        reopened.close()
+
+    def test_rebuild_is_staged_until_commit(self):
+        live = PatchStore(self.path)
+        old = live.put("commit:a", "file:x.py", "+old")
+        live.close()
+
+        rebuilt = PatchStore(self.path, reset=True)
+        self.assertEqual(len(rebuilt), 0)
+        rebuilt.put("commit:b", "file:y.py", "+new")
+        rebuilt.close()
+        # A failed or cancelled rebuild leaves the live store (and graphs pointing at it) intact
+        reader = PatchStore(self.path, read_only=True)
+        self.assertEqual(reader.get(old), "+old")
+        with self.assertRaises(ValueError):
+            reader.put("commit:c", "file:z.py", "+x")
+        reader.close()
+
+        # A resumed run reopens the staged store and publishes it with its graph
+        staged = PatchStore(self.path, staged=True, read_only=True)
+        self.assertEqual(staged.get_for("commit:b", "file:y.py"), "+new")
+        staged.commit()
+        staged.close()
+        self.assertFalse(os.path.exists(self.path + ".tmp"))
+        published = PatchStore(self.path, read_only=True)
+        self.assertEqual(published.get_for("commit:b", "file:y.py"), "+new")
+        self.assertEqual(published.get_for("commit:a", "file:x.py"), "")
+        published.close()
+
+    def test_diff_summary_reads_patch_prefix_from_store(self):
+        store = PatchStore(self.path)
+        g = build_graph(1)
+        del g.edges["commit:0000000", "file:mod_0.py"]["patch_content"]
+        g.edges["commit:0000000", "file:mod_0.py"]["patch_id"] = store.put("commit:0000000", "file:mod_0.py", "+" + "x" * 500)
+        g.graph["patch_store"] = self.path
+        store.close()
+
+        # The agent finds the store through the graph
+        agent = MCTSAgent(g, LLMClient(model=StubModel()))
+        summary = agent._get_diff_summary("commit:0000000")
+        self.assertIn("Patch: +" + "x" * 199 + "...", summary)
+        agent.patch_store.close()
+
+    def test_node_contexts_are_memoized_until_invalidated(self):
+        store = PatchStore(self.path)
+        g = build_graph(1)
+        del g.edges["commit:0000000", "file:mod_0.py"]["patch_content"]
+        g.edges["commit:0000000", "file:mod_0.py"]["patch_id"] = store.put("commit:0000000", "file:mod_0.py", "+import numpy")
+        reads = []
+        prefix = store.prefix
+        store.prefix = lambda pid, n: reads.append(pid) or prefix(pid, n)
+        agent = MCTSAgent(g, LLMClient(model=StubModel()), patch_store=store)
+
+        node = MCTSNode("commit:0000000")
+        context = agent._build_context(node)
+        self.assertIs(agent._build_context(node), context)
+        self.assertEqual(len(reads), 1)
+        # The pre-rendered evidence is what the prompt would render from the fields
+        fields = {k: v for k, v in context.items() if k != "evidence"}
+        self.assertEqual(agent.llm._construct_prompt(context), agent.llm._construct_prompt(fields))
+
+        agent.contexts.invalidate("commit:0000000")
+        self.assertEqual(agent._build_context(node), context)
+        self.assertEqual(len(reads), 2)
+        store.close()
+
+class TestLazyExpansion(unittest.TestCase):
+    def test_root_holds_repositories_and_expands_by_prior(self):
+        g = build_graph(6)
+        g.add_node("repo:alice/popular", type="repository", stars=500, languages={"Go": 100})
+        g.add_node("commit:fork000", type="commit", message="commit outside the developer's repos")
+        agent = MCTSAgent(g, LLMClient(model=StubModel()))
+
+        # Commits under a root repository are reached through it, not from the root
+        self.assertEqual(sorted(n for _, _, n in agent.root.untried_actions),
+                         ["commit:fork000", "repo:alice/lib", "repo:alice/popular"])
+        first = agent.select(agent.root)
+        self.assertEqual(first.name, "repo:alice/popular") # log1p(500) stars outweigh the Python bonus
+        self.assertAlmostEqual(first.prior, 2.0 + np.log1p(500))
+
+        agent.run_exploration(iterations=12)
+        lib = next(c for c in agent.root.children if c.name == "repo:alice/lib")
+        self.assertTrue(lib.children)
+        self.assertTrue(all(c.name.startswith("commit:") and c.path_context[:2] == ["root", "repo:alice/lib"]
+                            for c in lib.children))
+        # Progressive widening bounds every node's fan-out by its visits
+        for node in [agent.root, lib]:
+            self.assertLessEqual(len(node.children), max(1, np.ceil(2.0 * node.visits ** 0.5)))
+
+    def test_each_iteration_evaluates_a_new_node_while_actions_remain(self):
+        model = StubModel()
+        agent = MCTSAgent(build_graph(20), LLMClient(model=model))
+        agent.run_exploration(iterations=15)
+        nodes = [t["node"] for t in agent.trace]
+        self.assertEqual(len(nodes), 15)
+        self.assertEqual(len(set(nodes)), 15)
+
+        # Once every node has been evaluated the search ends instead of repeating itself
+        agent = MCTSAgent(build_graph(3), LLMClient(model=StubModel()))
+        agent.run_exploration(iterations=10, batch_size=2)
+        self.assertEqual(len(agent.convergence_history), 4)
+
+    def test_frontier_commits_of_known_repos_become_root_actions(self):
+        agent = MCTSAgent(build_graph(3), LLMClient(model=StubModel()), frontier={"commit:0000001"})
+        self.assertEqual([n for _, _, n in agent.root.untried_actions], ["commit:0000001"])
+
+class TestBatchedMCTS(unittest.TestCase):
+    def test_batch_mode_cuts_round_trips_at_same_budget(self):
+        model = StubModel()
+        agent = MCTSAgent(build_graph(), LLMClient(model=model))
+        agent.run_exploration(iterations=10, batch_size=5)
+
+        self.assertEqual(len(model.prompts), 2)
+        self.assertEqual(len(agent.convergence_history), 10)
+        self.assertEqual(agent.root.visits, 10)
+        # Every batch slot went to a distinct leaf and all virtual losses were released
+        for prompt in model.prompts:
+            node_ids = re.findall(r"NODE ID: ((?:commit|repo):\S+)", prompt)
+            self.assertEqual(len(set(node_ids)), 5)
+        repo = agent.root.children[0]
+        self.assertEqual(repo.name, "repo:alice/lib")
+        self.assertTrue(all(c.virtual_loss == 0 for c in repo.children))
+        self.assertEqual(agent.root.virtual_loss, 0)
+        implies = [(u, v) for u, v, d in agent.graph.edges(data=True) if d.get("type") == "implies"]
+        self.assertEqual(len(implies), len(repo.children) + 1)
+
+    def test_single_mode_matches_iteration_count(self):
+        model = StubModel()
+        agent = MCTSAgent(build_graph(3), LLMClient(model=model))
+        agent.run_exploration(iterations=3)
+        self.assertEqual(len(model.prompts), 3)
+        self.assertEqual([h["iteration"] for h in agent.convergence_history], [1, 2, 3])
+
+    def test_listener_sees_iterations_and_new_skills(self):
+        events = []
+        agent = MCTSAgent(build_graph(), LLMClient(model=StubModel()), listener=lambda kind, data: events.append((kind, data)))
+        agent.run_exploration(iterations=4, batch_size=2)
+
+        iterations = [d for k, d in events if k == "iteration"]
+        self.assertEqual([{k: d[k] for k in h} for d, h in zip(iterations, agent.convergence_history)],
+                         agent.convergence_history)
+        self.assertEqual(len(iterations), 4)
+        self.assertTrue(all(d["node"] in agent.graph for d in iterations))
+        skills = [d["skill"] for k, d in events if k == "skill"]
+        self.assertEqual(len(skills), len(set(skills))) # Only first discoveries are reported
+        self.assertEqual({f"skill:{s.replace(' ', '_')}" for s in skills},
+                         {n for n, d in agent.graph.nodes(data=True) if d.get("type") == "skill"})
+
+    def test_change_log_drives_convergence_metrics(self):
+        agent = MCTSAgent(build_graph(6), LLMClient(model=StubModel()))
+        agent.run_exploration(iterations=6)
+        history, log = agent.convergence_history, agent.change_log
+
+        # Every implies edge in the graph is accounted for by the log, with its final weight
+        final = {(c["source"], c["skill"]): c["new_weight"] for c in log}
+        implies = {(u, v): d["weight"] for u, v, d in agent.graph.edges(data=True) if d["type"] == "implies"}
+        self.assertEqual(final, implies)
+        for h in history:
+            deltas = [abs(c["new_weight"] - c["old_weight"]) for c in log if c["iteration"] == h["iteration"]]
+            self.assertEqual(h["max_confidence_change"], max(deltas, default=0.0))
+
+        self.assertEqual([t["iteration"] for t in agent.trace], [1, 2, 3, 4, 5, 6])
+        self.assertEqual([t["llm_calls"] for t in agent.trace], [1, 2, 3, 4, 5, 6])
+        self.assertEqual(sum(len(t["changes"]) for t in agent.trace), len(log))
+        self.assertTrue(all(a["elapsed"] <= b["elapsed"] for a, b in zip(agent.trace, agent.trace[1:])))
+
+    def test_compact_topology_gives_same_search(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        store = PatchStore(os.path.join(tmp.name, "patches.bin"))
+        self.addCleanup(store.close)
+        graphs = []
+        for _ in range(2):
+            g = build_graph()
+            # As built by HINBuilder: the frozen view only carries patch ids
+            for u, v, d in g.edges(data=True):
+                if d["type"] == "modifies":
+                    d["patch_id"] = store.put(u, v, d.pop("patch_content"))
+            graphs.append(g)
+
+        plain_model, compact_model = StubModel(), StubModel()
+        plain = MCTSAgent(graphs[0], LLMClient(model=plain_model), patch_store=store)
+        plain.run_exploration(iterations=6, batch_size=3)
+
+        graph = graphs[1]
+        compact = MCTSAgent(graph, LLMClient(model=compact_model), patch_store=store,
+                            topology=CompactGraph.from_networkx(graph))
+        compact.run_exploration(iterations=6, batch_size=3)
+
+        self.assertEqual(compact_model.prompts, plain_model.prompts)
+        self.assertIn("Patch: +import numpy...", compact_model.prompts[0])
+        # Skills land in the mutable graph, not the frozen view
+        self.assertEqual(set(graph.edges), set(plain.graph.edges))
+        self.assertNotIn("implies", compact.topology.edge_types)
+
+    def test_virtual_loss_diverts_selection(self):
+        # Equal priors and a widening limit of one child: only the in-flight first leaf forces a second
+        agent = MCTSAgent(build_graph(2), LLMClient(model=StubModel()), frontier={"commit:0000000", "commit:0000001"})
+        agent.widening_c = 0.5
+        leaves = agent.select_batch(2)
+        self.assertEqual(len(leaves), 2)
+        self.assertNotEqual(leaves[0], leaves[1])
+
+class TestAnytimeMCTS(unittest.TestCase):
+    def test_stops_once_profile_converges(self):
+        # Single-node prompts always yield "Python": no new skills after the first iteration
+        agent = MCTSAgent(build_graph(30), LLMClient(model=StubModel()))
+        agent.run_exploration(iterations=30, stopping=StoppingRule(window=3, reward_tol=0.05))
+
+        self.assertEqual(agent.stop_reason, "converged")
+        self.assertEqual(len(agent.convergence_history), 7)
+        self.assertEqual([h["new_skills"] for h in agent.convergence_history], [1, 0, 0, 0, 0, 0, 0])
+
+    def test_diverse_results_do_not_converge(self):
+        # Batched prompts yield one new skill per node
+        agent = MCTSAgent(build_graph(10), LLMClient(model=StubModel()))
+        agent.run_exploration(iterations=10, batch_size=2, stopping=StoppingRule(window=2))
+        self.assertIsNone(agent.stop_reason)
+        self.assertEqual(len(agent.convergence_history), 10)
+
+    def test_llm_call_and_token_budgets(self):
+        llm = LLMClient(model=StubModel())
+        agent = MCTSAgent(build_graph(10), llm)
+        agent.run_exploration(iterations=10, batch_size=2, stopping=StoppingRule(max_llm_calls=2, window=0))
+        self.assertEqual(agent.stop_reason, "LLM call budget")
+        self.assertEqual(llm.call_count, 2)
+        self.assertEqual(len(agent.convergence_history), 4)
+
+        # Budgets are relative to the start of each run
+        agent.run_exploration(iterations=10, stopping=StoppingRule(max_tokens=1, window=0))
+        self.assertEqual(agent.stop_reason, "token budget")
+        self.assertEqual(llm.call_count, 3)
+        self.assertGreater(llm.token_count, 0)
+        self.assertEqual(agent.usage["tokens"], llm.token_count)
+
+    def test_budgets_are_per_agent_on_a_shared_client(self):
+        llm = LLMClient(model=SlowStubModel(latency=0.01))
+        agents = [MCTSAgent(build_graph(10), llm) for _ in range(2)]
+        threads = [threading.Thread(target=a.run_exploration, kwargs={
+            "iterations": 10, "stopping": StoppingRule(max_llm_calls=3, window=0)}) for a in agents]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual([a.usage["calls"] for a in agents], [3, 3])
+        self.assertEqual([len(a.convergence_history) for a in agents], [3, 3])
+        self.assertEqual(llm.call_count, 6)
+
+    def test_time_budget_bounds_parallel_search(self):
+        model = SlowStubModel(latency=0.05)
+        agent = MCTSAgent(build_graph(40), LLMClient(model=model))
+        start = time.monotonic()
+        agent.run_exploration(iterations=40, workers=2, stopping=StoppingRule(max_seconds=0.12, window=0))
+
+        self.assertEqual(agent.stop_reason, "time budget")
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertLess(len(agent.convergence_history), 12)
+        self.assertEqual(agent.root.virtual_loss, 0)
+
+class TestParallelMCTS(unittest.TestCase):
+    def test_workers_overlap_llm_calls(self):
+        model = SlowStubModel()
+        agent = MCTSAgent(build_graph(12), LLMClient(model=model))
+        agent.run_exploration(iterations=12, workers=4)
+
+        self.assertEqual(len(model.prompts), 12)
+        self.assertGreater(model.max_in_flight, 1)
+        self.assertLessEqual(model.max_in_flight, 4)
+        self.assertEqual(agent.root.visits, 12)
+        self.assertEqual(agent.root.virtual_loss, 0)
+        self.assertEqual([h["iteration"] for h in agent.convergence_history], list(range(1, 13)))
+
+    def test_workers_with_batches_respect_budget(self):
+        model = SlowStubModel()
+        agent = MCTSAgent(build_graph(12), LLMClient(model=model))
+        agent.run_exploration(iterations=12, batch_size=3, workers=2)
+
+        self.assertEqual(len(model.prompts), 4)
+        self.assertEqual(agent.root.visits, 12)
+        self.assertTrue(all(c.virtual_loss == 0 for c in agent.root.children))
+
+if __name__ == '__main__':
+    unittest.main()
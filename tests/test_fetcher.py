@@ -0,0 +1,315 @@
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from github import Github
+from src.github_cache import GitHubCache
+from src.graph_builder import GitHubFetcher, HINBuilder
+from src.patch_store import PatchStore
+from src.rate_limiter import TokenBucket
+from src.shared_hin import SharedHIN
+
+REPOS = {
+    "alice/ml-lib": 4,
+    "alice/web-app": 3,
+    "alice/forked": 2,
+    "bob/tools": 2,
+}
+FORKS = {"alice/forked"}
+# Listings ignore the author filter, so bob shares alice/ml-lib's commits
+USER_REPOS = {
+    "alice": ["alice/ml-lib", "alice/web-app", "alice/forked"],
+    "bob": ["alice/ml-lib", "bob/tools"],
+}
+
+class FakeGitHubHandler(BaseHTTPRequestHandler):
+    """Serves the subset of the GitHub REST API used by GitHubFetcher."""
+    in_flight = 0
+    max_in_flight = 0
+    detail_requests = 0
+    metadata_requests = 0
+    not_modified = 0
+    lock = threading.Lock()
+    detail_delay = 0.05
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, payload):
+        body = json.dumps(payload).encode()
+        etag = '"%s"' % hashlib.md5(body).hexdigest()
+        if self.headers.get("If-None-Match") == etag:
+            type(self).not_modified += 1
+            self.send_response(304)
+            body = b""
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("X-RateLimit-Limit", "5000")
+        self.send_header("X-RateLimit-Remaining", "4999")
+        self.send_header("X-RateLimit-Reset", str(int(time.time()) + 3600))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _base(self):
+        return f"http://{self.server.server_address[0]}:{self.server.server_address[1]}"
+
+    def _repo(self, full_name):
+        return {
+            "name": full_name.split("/")[1],
+            "full_name": full_name,
+            "url": f"{self._base()}/repos/{full_name}",
+            "fork": full_name in FORKS,
+            "language": "Python",
+            "stargazers_count": 3,
+            "description": f"{full_name} description",
+        }
+
+    def _commit(self, full_name, i, with_files=False):
+        sha = f"{list(REPOS).index(full_name):03d}{i:04d}".ljust(40, "0")
+        data = {
+            "sha": sha,
+            "url": f"{self._base()}/repos/{full_name}/commits/{sha}",
+            "commit": {"message": f"{full_name} change {i}", "author": {"date": "2024-01-01T00:00:00Z"}},
+        }
+        if with_files:
+            data["files"] = [{"filename": f"src/mod_{i}.py", "status": "modified",
+                              "additions": 2, "deletions": 0, "patch": f"+import numpy\n+x = {i}"}]
+        return data
+
+    def _page(self, items):
+        query = dict(p.split("=") for p in self.path.partition("?")[2].split("&") if p)
+        per_page, page = int(query.get("per_page", 30)), int(query.get("page", 1))
+        return items[(page - 1) * per_page: page * per_page]
+
+    def do_GET(self):
+        path = self.path.split("?")[0]
+        m = re.fullmatch(r"/users/(\w+)", path)
+        if m:
+            user = m.group(1)
+            return self._send({"login": user, "name": user.title(), "bio": None, "public_repos": len(USER_REPOS[user]),
+                               "created_at": "2020-01-01T00:00:00Z", "url": f"{self._base()}/users/{user}"})
+        m = re.fullmatch(r"/users/(\w+)/repos", path)
+        if m:
+            return self._send(self._page([self._repo(name) for name in USER_REPOS[m.group(1)]]))
+        m = re.fullmatch(r"/repos/(\w+/[\w-]+)/(languages|topics)", path)
+        if m:
+            with type(self).lock:
+                type(self).metadata_requests += 1
+            return self._send({"Python": 100} if m.group(2) == "languages" else {"names": ["ml"]})
+        m = re.fullmatch(r"/repos/(\w+/[\w-]+)/commits", path)
+        if m:
+            return self._send(self._page([self._commit(m.group(1), i) for i in range(REPOS[m.group(1)])]))
+        m = re.fullmatch(r"/repos/(\w+/[\w-]+)/commits/(\w+)", path)
+        if m:
+            cls = type(self)
+            with cls.lock:
+                cls.detail_requests += 1
+                cls.in_flight += 1
+                cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+            time.sleep(self.detail_delay)
+            with cls.lock:
+                cls.in_flight -= 1
+            i = int(m.group(2)[3:7])
+            return self._send(self._commit(m.group(1), i, with_files=True))
+        self.send_error(404)
+
+class TestGitHubFetcher(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeGitHubHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        host, port = cls.server.server_address
+        cls.base_url = f"http://{host}:{port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        FakeGitHubHandler.max_in_flight = 0
+        FakeGitHubHandler.detail_requests = 0
+        FakeGitHubHandler.metadata_requests = 0
+        FakeGitHubHandler.not_modified = 0
+
+    def _fetcher(self, max_workers=4, cache=None):
+        client = Github(base_url=self.base_url, retry=None, seconds_between_requests=None)
+        return GitHubFetcher(client=client, max_workers=max_workers, max_rps=1000, cache=cache)
+
+    def _builder(self, graph=None, store="alice"):
+        patch_store = PatchStore(os.path.join(self.tmp.name, f"{store}.bin"), reset=graph is None)
+        self.addCleanup(patch_store.close)
+        return HINBuilder("alice", fetcher=self._fetcher(), graph=graph, patch_store=patch_store)
+
+    def test_commits_fetched_concurrently_across_repos(self):
+        fetcher = self._fetcher(max_workers=4)
+        repos = [r["name"] for r in fetcher.get_top_repos("alice")]
+        commits = fetcher.get_commits_for_repos(repos, "alice", limit=10)
+
+        self.assertEqual(set(commits), {"alice/ml-lib", "alice/web-app"})
+        # Order from the API is preserved per repo
+        self.assertEqual([c["message"] for c in commits["alice/ml-lib"]],
+                         [f"alice/ml-lib change {i}" for i in range(4)])
+        self.assertEqual(commits["alice/web-app"][2]["files"][0]["filename"], "src/mod_2.py")
+        self.assertGreater(FakeGitHubHandler.max_in_flight, 1)
+        self.assertLessEqual(FakeGitHubHandler.max_in_flight, 4)
+
+    def test_single_worker_is_serial(self):
+        fetcher = self._fetcher(max_workers=1)
+        repos = [r["name"] for r in fetcher.get_top_repos("alice")]
+        fetcher.get_commits_for_repos(repos, "alice")
+        self.assertEqual(FakeGitHubHandler.max_in_flight, 1)
+
+    def test_rate_limit_headers_drive_bucket(self):
+        fetcher = self._fetcher()
+        fetcher.get_user_data("alice")
+        self.assertEqual(fetcher.rate_limiter.quota_remaining, 4999)
+        self.assertGreater(fetcher.rate_limiter.quota_reset_at, time.time())
+
+    def test_pagination_respects_limit(self):
+        commits = self._fetcher().get_commits("alice/ml-lib", "alice", limit=3)
+        self.assertEqual([c["message"] for c in commits], [f"alice/ml-lib change {i}" for i in range(3)])
+
+    def test_cache_serves_commits_and_revalidates_listings(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = GitHubCache(os.path.join(tmp, "github.sqlite3"))
+            first = self._fetcher(cache=cache)
+            repos = [r["name"] for r in first.get_top_repos("alice")]
+            first_run = first.get_commits_for_repos(repos, "alice")
+            self.assertEqual(FakeGitHubHandler.detail_requests, 7)
+            self.assertEqual(FakeGitHubHandler.not_modified, 0)
+            # Commit details are cached once, by SHA, not also as a raw URL response
+            keys = [k for (k,) in cache.conn.execute("SELECT key FROM responses")]
+            self.assertFalse([k for k in keys if "/commits/" in k])
+
+            # Re-profile: listings come back 304, commit details never leave the cache
+            second = self._fetcher(cache=cache)
+            repos = [r["name"] for r in second.get_top_repos("alice")]
+            second_run = second.get_commits_for_repos(repos, "alice")
+            self.assertEqual(FakeGitHubHandler.detail_requests, 7)
+            self.assertGreater(FakeGitHubHandler.not_modified, 0)
+            self.assertEqual(first_run, second_run)
+            cache.close()
+
+    def test_hin_builder_uses_injected_fetcher(self):
+        builder = self._builder()
+        graph = builder.build_raw_topology()
+        commits = [n for n, d in graph.nodes(data=True) if d.get("type") == "commit"]
+        self.assertEqual(len(commits), 7)
+        modifies = [d for _, _, d in graph.edges(data=True) if d["type"] == "modifies"]
+        self.assertTrue(all("patch_content" not in d for d in modifies))
+        self.assertEqual(sorted(d["patch_id"] for d in modifies), list(range(7)))
+        self.assertEqual(graph.graph["patch_store"], builder.patch_store.path)
+        self.assertNotIn("repo:alice/forked", graph)
+
+    def test_incremental_build_merges_only_new_commits(self):
+        first = self._builder()
+        graph = first.build_raw_topology()
+        first.patch_store.commit() # As when the graph is saved
+        graph.add_edge("commit:0000000", "skill:Python", type="implies", weight=0.8)
+        weights = {(u, v): d["weight"] for u, v, d in graph.edges(data=True)}
+
+        REPOS["alice/web-app"] += 1
+        try:
+            builder = self._builder(graph=graph)
+            updated = builder.build_raw_topology()
+        finally:
+            REPOS["alice/web-app"] -= 1
+
+        self.assertIs(updated, graph)
+        # src/mod_3.py is shared with an ml-lib commit, so only the commit is new
+        self.assertEqual(builder.new_nodes, {"commit:0010003"})
+        # Previously inferred evidence and weights survive the update
+        for edge, weight in weights.items():
+            self.assertEqual(updated.edges[edge]["weight"], weight)
+        self.assertIn("weight", updated.edges["commit:0010003", "file:src/mod_3.py"])
+        # Patches live in the store; earlier ones are still addressable after the append
+        self.assertEqual(builder.patch_store.get_for("commit:0010003", "file:src/mod_3.py"), "+import numpy\n+x = 3")
+        self.assertEqual(builder.patch_store.get_for("commit:0000000", "file:src/mod_0.py"), "+import numpy\n+x = 0")
+
+    def test_streaming_build_matches_batch_topology(self):
+        batch = self._builder(store="batch").build_raw_topology()
+        builder = self._builder(store="stream")
+        stream = builder.iter_build(queue_size=2)
+        # Nodes are produced before the stream is drained
+        self.assertEqual(next(stream), "dev:alice")
+        yielded = ["dev:alice"] + list(stream)
+
+        graph = builder.graph
+        self.assertEqual(set(yielded), set(graph.nodes))
+        self.assertEqual(set(graph.edges), set(batch.edges))
+        for u, v, d in graph.edges(data=True):
+            if d["type"] == "modifies":
+                self.assertGreaterEqual(d["weight"], 0.01)
+                self.assertAlmostEqual(d["weight"], batch.edges[u, v]["weight"])
+
+    def test_streaming_fetch_bounds_in_flight_details(self):
+        fetcher = self._fetcher(max_workers=4)
+        stream = fetcher.iter_commits_for_repos(["alice/ml-lib", "alice/web-app"], "alice", max_pending=2)
+        commits = [commit for _, commit in stream]
+        self.assertEqual(len(commits), 7)
+        self.assertLessEqual(FakeGitHubHandler.max_in_flight, 2)
+
+    def test_shared_hin_fetches_shared_repos_and_commits_once(self):
+        patch_store = PatchStore(os.path.join(self.tmp.name, "team.bin"), reset=True)
+        self.addCleanup(patch_store.close)
+        hin = SharedHIN("team", fetcher=self._fetcher(), patch_store=patch_store)
+        alice_new = hin.add_developer("alice")
+        self.assertEqual(FakeGitHubHandler.detail_requests, 7)
+        self.assertEqual(FakeGitHubHandler.metadata_requests, 4)
+        weights = {(u, v): d["weight"] for u, v, d in hin.graph.edges(data=True)}
+
+        bob_new = hin.add_developer("bob", streaming=True)
+        # Only bob/tools is new: 2 commit details and 2 metadata calls
+        self.assertEqual(FakeGitHubHandler.detail_requests, 9)
+        self.assertEqual(FakeGitHubHandler.metadata_requests, 6)
+        self.assertEqual({n for n in bob_new if n.startswith("commit:")}, {"commit:0030000", "commit:0030001"})
+        self.assertNotIn("repo:alice/ml-lib", bob_new)
+        self.assertIn("repo:alice/ml-lib", alice_new)
+        self.assertEqual(hin.developers, ["alice", "bob"])
+        # Shared commits are stored and weighted once
+        self.assertEqual(len(patch_store), 9)
+        for edge, weight in weights.items():
+            self.assertEqual(hin.graph.edges[edge]["weight"], weight)
+        self.assertEqual(hin.graph.nodes["repo:alice/ml-lib"]["languages"], {"Python": 100})
+        self.assertEqual(hin.graph.nodes["commit:0000000"]["authors"], ["alice", "bob"])
+        self.assertEqual(hin.graph.nodes["commit:0010000"]["authors"], ["alice"])
+
+        alice, bob = hin.view("alice"), hin.view("bob")
+        self.assertIn("commit:0010000", alice)
+        self.assertNotIn("commit:0010000", bob)
+        self.assertNotIn("repo:alice/web-app", bob)
+        self.assertIn("commit:0000000", bob)
+        self.assertIn("file:src/mod_0.py", bob)
+        self.assertEqual(set(bob.successors("dev:bob")), {"repo:alice/ml-lib", "repo:bob/tools"})
+
+class TestTokenBucket(unittest.TestCase):
+    def test_acquire_blocks_once_burst_is_spent(self):
+        bucket = TokenBucket(rate=20.0, capacity=2)
+        start = time.monotonic()
+        for _ in range(4):
+            bucket.acquire()
+        # Two tokens are free, the next two take ~1/20s each
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+    def test_exhausted_quota_waits_for_reset(self):
+        bucket = TokenBucket(rate=100.0, capacity=5)
+        bucket.update_from_headers(remaining=0, reset_at=time.time() + 0.2)
+        start = time.monotonic()
+        bucket.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.15)
+        self.assertIsNone(bucket.quota_remaining)
+
+if __name__ == '__main__':
+    unittest.main()
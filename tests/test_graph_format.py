@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+import zipfile
+import networkx as nx
+import numpy as np
+from src import graph_format
+from src.server import build_graph_view
+
+def build_graph():
+    g = nx.DiGraph()
+    g.graph["patch_store"] = "output/patches/alice.bin"
+    g.add_node("dev:alice", type="developer", login="alice", name="Alice", public_repos=3)
+    g.add_node("repo:alice/lib", type="repository", languages={"Python": 100}, topics=["ml"], stars=5)
+    g.add_node("commit:abc1234", type="commit", message="Añade numpy ✓", date="2024-01-01T00:00:00")
+    g.add_node("file:src/lib.py", type="file")
+    g.add_node("skill:NumPy", type="skill", name="NumPy")
+    g.add_node("orphan") # No attributes at all
+    g.add_edge("dev:alice", "repo:alice/lib", type="contributes", weight=1.0)
+    g.add_edge("repo:alice/lib", "commit:abc1234", type="contains", weight=1.0)
+    g.add_edge("commit:abc1234", "file:src/lib.py", type="modifies", weight=0.42, additions=3, patch_id=7)
+    g.add_edge("commit:abc1234", "skill:NumPy", type="implies", weight=0.8, reasoning="imports numpy")
+    g.add_edge("orphan", "dev:alice")
+    return g
+
+class TestGraphFormat(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "alice_graph.npz")
+
+    def test_round_trip_preserves_graph(self):
+        g = build_graph()
+        graph_format.save_graph(g, self.path)
+        loaded = graph_format.load_graph(self.path)
+
+        self.assertEqual(list(loaded.nodes(data=True)), list(g.nodes(data=True)))
+        self.assertEqual(list(loaded.edges(data=True)), list(g.edges(data=True)))
+        self.assertEqual(loaded.graph, g.graph)
+
+    def test_partial_read_is_memory_mapped(self):
+        graph_format.save_graph(build_graph(), self.path)
+        cols = graph_format.read_columns(self.path, ["node_id", "edge_weight"])
+
+        self.assertEqual(set(cols), {"node_id", "edge_weight"})
+        self.assertIsInstance(cols["edge_weight"], np.memmap)
+        self.assertEqual(cols["node_id"][2], "commit:abc1234")
+        self.assertTrue(np.isnan(cols["edge_weight"][-1]))
+        with self.assertRaises(KeyError):
+            graph_format.read_columns(self.path, ["node_pickle"])
+
+    def test_unknown_version_is_rejected(self):
+        graph_format.save_graph(build_graph(), self.path)
+        with zipfile.ZipFile(self.path) as archive:
+            members = {name: archive.read(name) for name in archive.namelist()}
+        with zipfile.ZipFile(self.path, "w") as archive:
+            for name, data in members.items():
+                if name == "version.npy":
+                    continue
+                archive.writestr(name, data)
+            with archive.open("version.npy", "w") as f:
+                np.lib.format.write_array(f, np.array([99]))
+        with self.assertRaises(ValueError):
+            graph_format.read_columns(self.path, ["node_id"])
+
+    def test_graph_view_reads_columns(self):
+        graph_format.save_graph(build_graph(), self.path)
+        result = build_graph_view(self.path)
+        nodes = {n["id"]: n for n in result["nodes"]}
+        self.assertEqual(nodes["dev:alice"], {"id": "dev:alice", "group": "dev", "label": "Developer: Alice", "val": 40})
+        self.assertEqual(nodes["skill:NumPy"]["label"], "NumPy")
+        self.assertEqual(nodes["orphan"]["group"], "unknown")
+        self.assertIn({"source": "commit:abc1234", "target": "skill:NumPy", "type": "implies"}, result["links"])
+        self.assertIn({"source": "orphan", "target": "dev:alice", "type": "rel"}, result["links"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from src.agentic_explorer import MCTSAgent
+from src.jobs import JobCancelled, JobQueue, JobWorkerPool
+from src.llm_client import LLMClient
+from tests.test_explorer import SlowStubModel, build_graph
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "jobs.sqlite3")
+        self.queue = JobQueue(self.path)
+
+    def test_active_job_is_deduplicated_across_connections(self):
+        job, created = self.queue.submit("alice")
+        self.assertTrue(created)
+        # A second API process opens its own connection to the same file
+        other = JobQueue(self.path)
+        again, created = other.submit("alice")
+        self.assertFalse(created)
+        self.assertEqual(again["id"], job["id"])
+
+        self.assertEqual(other.claim("w1")["id"], job["id"])
+        self.assertIsNone(self.queue.claim("w2")) # Claimed exactly once
+        self.queue.finish(job["id"], "done")
+        rerun, created = self.queue.submit("alice")
+        self.assertTrue(created)
+        self.assertEqual(self.queue.latest("alice")["id"], rerun["id"])
+
+    def test_claim_order_and_progress(self):
+        first, _ = self.queue.submit("alice")
+        second, _ = self.queue.submit("bob")
+        self.assertEqual(self.queue.claim("w1")["id"], first["id"])
+        self.queue.progress(first["id"], "explore", "MCTS")
+        job = self.queue.get(first["id"])
+        self.assertEqual((job["status"], job["phase"], job["message"], job["worker"]),
+                         ("running", "explore", "MCTS", "w1"))
+        self.assertEqual(self.queue.claim("w2")["id"], second["id"])
+
+    def test_cancel_queued_and_running(self):
+        queued, _ = self.queue.submit("alice")
+        running, _ = self.queue.submit("bob")
+        self.queue.conn.execute("UPDATE jobs SET status = 'running' WHERE id = ?", (running["id"],))
+
+        self.assertEqual(self.queue.cancel(queued["id"])["status"], "cancelled")
+        self.assertEqual(self.queue.events(queued["id"])[-1]["data"]["status"], "cancelled")
+        self.assertIsNone(self.queue.claim("w1"))
+        self.assertEqual(self.queue.cancel(running["id"])["status"], "running")
+        with self.assertRaises(JobCancelled):
+            self.queue.progress(running["id"], "confidence")
+        self.assertIsNone(self.queue.cancel(999))
+
+    def test_stale_running_job_is_requeued(self):
+        job, _ = self.queue.submit("alice")
+        self.queue.claim("crashed-worker")
+        self.assertEqual(self.queue.requeue_stale(timeout=60), 0)
+        self.queue.conn.execute("UPDATE jobs SET heartbeat = ?", (time.time() - 120,))
+        self.assertEqual(self.queue.requeue_stale(timeout=60), 1)
+        self.assertEqual(self.queue.claim("w2")["id"], job["id"])
+
+class TestJobWorkerPool(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.queue = JobQueue(os.path.join(self.tmp.name, "jobs.sqlite3"))
+
+    def _wait(self, job_id, statuses=("done", "failed", "cancelled")):
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            job = self.queue.get(job_id)
+            if job["status"] in statuses:
+                return job
+            time.sleep(0.01)
+        self.fail(f"Job {job_id} stuck in {job['status']}")
+
+    def test_pool_runs_jobs_concurrently_and_records_outcomes(self):
+        started = threading.Barrier(2, timeout=5)
+        release = threading.Event()
+
+        def run(username, iterations, progress, emit):
+            progress("build")
+            if username == "broken":
+                raise ValueError("boom")
+            started.wait()
+            progress("explore", f"{iterations} iterations")
+            emit("iteration", {"iteration": 1, "reward": 0.5})
+            release.wait(5)
+            progress("confidence")
+            return {"developer": username}
+
+        pool = JobWorkerPool(self.queue, run=run, concurrency=2, poll_interval=0.01)
+        jobs = [self.queue.submit(u, iterations=3)[0] for u in ("alice", "bob", "broken")]
+        pool.start()
+        self.addCleanup(pool.stop)
+
+        # Both workers are busy at the same time
+        deadline = time.time() + 5
+        while {self.queue.get(j["id"])["phase"] for j in jobs[:2]} != {"explore"} and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.queue.get(jobs[0]["id"])["message"], "3 iterations")
+        self.queue.cancel(jobs[1]["id"])
+        release.set()
+
+        self.assertEqual(self._wait(jobs[0]["id"])["status"], "done")
+        self.assertEqual(self._wait(jobs[1]["id"])["status"], "cancelled")
+        broken = self._wait(jobs[2]["id"])
+        self.assertEqual(broken["status"], "failed")
+        self.assertEqual(broken["error"], "ValueError: boom")
+        events = self.queue.events(jobs[0]["id"])
+        self.assertEqual([e["kind"] for e in events], ["phase", "phase", "iteration", "phase", "status"])
+        self.assertEqual(events[2]["data"], {"iteration": 1, "reward": 0.5})
+        self.assertEqual(events[-1]["data"], {"status": "done", "error": None})
+        self.assertEqual(self.queue.events(jobs[0]["id"], after=events[3]["id"]), events[4:])
+
+    def test_cancel_stops_exploration_at_next_iteration(self):
+        for workers in (1, 4):
+            with self.subTest(workers=workers):
+                agent, job = self._cancel_during_exploration(f"user{workers}", workers)
+                self.assertEqual(self._wait(job["id"])["status"], "cancelled")
+                # The other workers stop before their next claim instead of using up the budget
+                self.assertLess(len(agent.convergence_history), 12)
+                self.assertLess(agent.usage["calls"], 12)
+                self.assertEqual(agent.stop_reason, "aborted (JobCancelled)" if workers > 1 else None)
+
+    def _cancel_during_exploration(self, username, workers):
+        agents = []
+
+        def run(username, iterations, progress, emit):
+            progress("explore")
+            agent = MCTSAgent(build_graph(40), LLMClient(model=SlowStubModel(latency=0.02)), listener=emit)
+            agents.append(agent)
+            agent.run_exploration(iterations=iterations, workers=workers)
+            return {"developer": username}
+
+        pool = JobWorkerPool(self.queue, run=run, concurrency=1, poll_interval=0.01)
+        job, _ = self.queue.submit(username, iterations=40)
+        pool.start()
+        deadline = time.time() + 5
+        while not any(e["kind"] == "iteration" for e in self.queue.events(job["id"])) and time.time() < deadline:
+            time.sleep(0.005)
+        self.queue.cancel(job["id"])
+        self._wait(job["id"])
+        pool.stop()
+        return agents[0], job
+
+if __name__ == '__main__':
+    unittest.main()
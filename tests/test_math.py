@@ -1,7 +1,12 @@
 import unittest
 import numpy as np
-from src.confidence import MassFunction
+import networkx as nx
+from src.compact_graph import CompactGraph
+from src.confidence import MassFunction, OpinionBatch, ConfidenceCalculator
+from src.meta_paths import COLLABORATION_PATH, EXPERTISE_PATH, MetaPathWalker
+from src.path_sim import PathSim
 from src.tfidf import TFIDFCalculator
+from tests.test_graph_format import build_graph
 
 class TestMath(unittest.TestCase):
     def test_dst_normalization(self):
@@ -42,6 +47,33 @@ class TestMath(unittest.TestCase):
         # We expect a valid mass function at least.
         self.assertAlmostEqual(sum(combined.m.values()), 1.0)
 
+    def test_batch_fuse_matches_sequential_yager(self):
+        """Tree-reduced fusion equals the left fold of scalar combine, conflict included."""
+        rng = np.random.default_rng(7)
+        for n in [1, 2, 7, 64]:
+            raw = rng.dirichlet([1.0, 1.0, 1.0], size=n)
+            batch = OpinionBatch(raw)
+            expected = MassFunction(dict(zip(['s', 'ns', 'theta'], raw[0])))
+            for row in raw[1:]:
+                expected = MassFunction.combine(expected, MassFunction(dict(zip(['s', 'ns', 'theta'], row))))
+            fused = batch.fuse()
+            self.assertAlmostEqual(fused.s[0], expected['s'])
+            self.assertAlmostEqual(fused.ns[0], expected['ns'])
+            self.assertAlmostEqual(fused.theta[0], expected['theta'])
+
+    def test_batch_discount_paths_matches_scalar(self):
+        """Vectorized discounting along ragged paths equals the per-edge scalar chain."""
+        weights = np.array([[0.9, 0.5, 0.7], [0.3, 0.8, 0.0]])
+        lengths = np.array([3, 2])
+        initial = MassFunction({'s': 0.6, 'ns': 0.0, 'theta': 0.4})
+        result = OpinionBatch.discount_paths(initial.to_batch(), weights, lengths)
+        for i in range(2):
+            m = initial
+            for w in weights[i, :lengths[i]]:
+                m = MassFunction.discount(m, MassFunction({'s': w, 'ns': 0.0, 'theta': 1.0 - w}))
+            self.assertAlmostEqual(result.s[i], m['s'])
+            self.assertAlmostEqual(result.theta[i], m['theta'])
+
     def test_tfidf_computation(self):
         """Test TF-IDF scoring on code patches."""
         tfidf = TFIDFCalculator()
@@ -67,5 +99,251 @@ class TestMath(unittest.TestCase):
         # w_unknown should be close to baseline (0.01)
         self.assertAlmostEqual(w_unknown, 0.01)
 
+    def test_tfidf_batch_matches_single(self):
+        """One batched transform gives the same weights as per-patch scoring."""
+        tfidf = TFIDFCalculator()
+        patches = ['+ import numpy', '', '+ zzzzz', '- removed only', '+++ b/x.py\n+ import torch\n+ print(1)']
+        self.assertEqual(list(tfidf.compute_weights(patches)), [0.1] * len(patches)) # Not fitted yet
+
+        # Fetched commits carry 'patch'; the legacy 'patch_content' key is also accepted
+        tfidf.fit_corpus([
+            {'files': [{'patch': '+ import numpy as np\n+ x = np.array([])'}]},
+            {'files': [{'patch_content': '+ print("hello")'}]},
+            {'files': [{'patch': '+ import torch'}]}
+        ])
+        self.assertTrue(tfidf.is_fitted)
+        batch = tfidf.compute_weights(patches)
+        for patch, weight in zip(patches, batch):
+            self.assertAlmostEqual(weight, tfidf.compute_weight(patch))
+        self.assertAlmostEqual(batch[1], 0.1)
+        self.assertAlmostEqual(batch[3], 0.1)
+
+    def test_affected_skills_follow_changed_evidence(self):
+        """Only skills reachable from changed nodes are recomputed incrementally."""
+        g = nx.DiGraph()
+        g.add_node('dev:a', type='developer')
+        for n in ['repo:r', 'commit:c1', 'commit:c2']:
+            g.add_node(n, type='repository' if n.startswith('repo') else 'commit')
+        g.add_node('skill:Python', type='skill')
+        g.add_node('skill:Rust', type='skill')
+        g.add_edges_from([('dev:a', 'repo:r'), ('repo:r', 'commit:c1'), ('repo:r', 'commit:c2'),
+                          ('commit:c1', 'skill:Python'), ('commit:c2', 'skill:Rust')])
+        calc = ConfidenceCalculator(g)
+        self.assertEqual(calc.affected_skills({'commit:c2'}), {'skill:Rust'})
+        self.assertEqual(calc.affected_skills({'repo:r'}), {'skill:Python', 'skill:Rust'})
+        self.assertEqual(calc.affected_skills(set()), set())
+
+    def _random_hin(self, seed, n_repos=3, n_commits=8, n_skills=4):
+        rng = np.random.default_rng(seed)
+        g = nx.DiGraph()
+        g.add_node('dev:a', type='developer')
+        repos = [f'repo:r{i}' for i in range(n_repos)]
+        commits = [f'commit:c{i}' for i in range(n_commits)]
+        skills = [f'skill:s{i}' for i in range(n_skills)]
+        for r in repos:
+            g.add_node(r, type='repository')
+            g.add_edge('dev:a', r, type='contributes', weight=1.0)
+        for c in commits:
+            g.add_node(c, type='commit')
+            # Some commits are shared by several repos
+            for r in rng.choice(repos, size=rng.integers(1, 3), replace=False):
+                g.add_edge(r, c, type='contains', weight=float(rng.uniform(0.3, 1.0)))
+            g.add_edge(c, f'file:{c}.py', type='modifies', weight=float(rng.uniform(0.01, 1.0)))
+        for sk in skills:
+            g.add_node(sk, type='skill', name=sk)
+            for src in rng.choice(commits + repos, size=4, replace=False):
+                g.add_edge(src, sk, type='implies', weight=float(rng.uniform(0.1, 0.99)))
+        return g, skills
+
+    def test_dp_engine_matches_enumerator(self):
+        """DP aggregation agrees numerically with explicit path enumeration."""
+        for seed in range(5):
+            g, skills = self._random_hin(seed)
+            exact = ConfidenceCalculator(g, engine='enumerate')
+            dp = ConfidenceCalculator(g, engine='dp')
+            for sk in skills:
+                a = exact.compute_skill_confidence('dev:a', sk)
+                b = dp.compute_skill_confidence('dev:a', sk)
+                self.assertEqual(a['path_count'], b['path_count'])
+                for key in ['belief', 'plausibility', 'uncertainty']:
+                    self.assertAlmostEqual(a[key], b[key], places=10)
+                # Top-k evidence paths are the heaviest enumerated paths
+                c = a['evidence_paths'][0]['belief'] / np.prod(
+                    [g[u][v]['weight'] for u, v in zip(a['evidence_paths'][0]['path'], a['evidence_paths'][0]['path'][1:])]
+                )
+                expected = sorted(
+                    (c * np.prod([g[u][v]['weight'] for u, v in zip(p, p[1:])])
+                     for p in nx.all_simple_paths(g, 'dev:a', sk, cutoff=5)),
+                    reverse=True
+                )[:10]
+                np.testing.assert_allclose([p['belief'] for p in b['evidence_paths']], expected)
+                self.assertLessEqual(len(b['evidence_paths']), 10)
+
+    def test_bulk_confidence_matches_per_skill(self):
+        """Single-pass bulk computation agrees with per-skill calls for both engines."""
+        g, skills = self._random_hin(3, n_skills=6)
+        g.add_node('skill:orphan', type='skill')
+        for engine in ['dp', 'enumerate']:
+            calc = ConfidenceCalculator(g, engine=engine)
+            bulk = calc.compute_all_skill_confidences('dev:a')
+            self.assertEqual(set(bulk), set(skills) | {'skill:orphan'})
+            for sk, metrics in bulk.items():
+                single = calc.compute_skill_confidence('dev:a', sk)
+                self.assertAlmostEqual(metrics['belief'], single['belief'], places=10)
+                self.assertEqual(metrics.get('path_count'), single.get('path_count'))
+                self.assertEqual([p['path'] for p in metrics.get('evidence_paths', [])],
+                                 [p['path'] for p in single.get('evidence_paths', [])])
+
+    def test_dp_engine_without_paths_and_with_cycles(self):
+        g, skills = self._random_hin(0)
+        g.add_node('skill:orphan', type='skill')
+        dp = ConfidenceCalculator(g, engine='dp')
+        self.assertEqual(dp.compute_skill_confidence('dev:a', 'skill:orphan')['belief'], 0.0)
+
+        # A cycle inside the evidence subgraph falls back to enumeration
+        g.add_edge('commit:c0', 'repo:r0', type='contains', weight=0.5)
+        exact = ConfidenceCalculator(g, engine='enumerate').compute_skill_confidence('dev:a', skills[0])
+        fallback = ConfidenceCalculator(g, engine='dp').compute_skill_confidence('dev:a', skills[0])
+        self.assertAlmostEqual(exact['belief'], fallback['belief'])
+
+    def test_compact_graph_mirrors_networkx(self):
+        g, skills = self._random_hin(3)
+        cg = CompactGraph.from_networkx(g)
+        self.assertEqual(cg.number_of_edges(), g.number_of_edges())
+        for n in g:
+            self.assertEqual(list(cg.successors(n)), list(g.successors(n)))
+            self.assertEqual(sorted(cg.predecessors(n)), sorted(g.predecessors(n)))
+            self.assertEqual(cg.nodes[n], g.nodes[n])
+        for u, v, d in g.edges(data=True):
+            self.assertEqual(cg[u][v], d)
+        self.assertFalse(cg.has_edge('skill:s0', 'dev:a'))
+        self.assertEqual(cg.typed_successors('repo:r0', 'contains', 'commit'),
+                         [v for v in g.successors('repo:r0') if g.nodes[v].get('type') == 'commit'])
+        self.assertEqual(cg.shortest_path_lengths('skill:s1', 5, reverse=True),
+                         nx.single_source_shortest_path_length(g.reverse(), 'skill:s1', cutoff=5))
+        self.assertEqual(list(cg.simple_paths('dev:a', skills[0], 5)),
+                         list(nx.all_simple_paths(g, 'dev:a', skills[0], cutoff=5)))
+
+        walker, compact_walker = MetaPathWalker(g), MetaPathWalker(cg)
+        self.assertEqual(compact_walker.find_paths('dev:a', COLLABORATION_PATH),
+                         walker.find_paths('dev:a', COLLABORATION_PATH))
+
+    def test_compact_graph_overlay_matches_networkx_writes(self):
+        g = build_graph()
+        cg = CompactGraph.from_networkx(g)
+        self.assertEqual(list(cg.nodes(data=True)), list(g.nodes(data=True)))
+        self.assertEqual(list(cg.edges(data=True)), list(g.edges(data=True)))
+        self.assertNotIn("message", cg.node_extra.get(cg.index["commit:abc1234"], {}))
+
+        # Skills written to an overlay during exploration, then merged into the frozen view
+        overlay = nx.DiGraph()
+        overlay.add_node("skill:NumPy", type="skill", name="NumPy")
+        overlay.add_node("skill:ML", type="skill", name="ML")
+        overlay.add_edge("commit:abc1234", "skill:NumPy", type="implies", weight=0.9, reasoning="again")
+        overlay.add_edge("commit:abc1234", "skill:ML", type="implies", weight=0.5, reasoning="")
+        overlay.add_edge("repo:alice/lib", "skill:ML", type="implies", weight=0.3)
+        merged = cg.with_overlay(overlay)
+        g.add_nodes_from((n, d) for n, d in overlay.nodes(data=True) if n not in g)
+        g.add_edges_from(overlay.edges(data=True))
+
+        self.assertEqual(list(merged.nodes(data=True)), list(g.nodes(data=True)))
+        self.assertEqual(list(merged.edges(data=True)), list(g.edges(data=True)))
+        for n in g:
+            self.assertEqual(sorted(merged.predecessors(n)), sorted(g.predecessors(n)))
+        self.assertEqual(merged["commit:abc1234"]["skill:NumPy"]["weight"], 0.9)
+        self.assertEqual(cg["commit:abc1234"]["skill:NumPy"]["weight"], 0.8) # The base view is unchanged
+        self.assertEqual(merged.typed_successors("commit:abc1234", "implies", "skill"), ["skill:NumPy", "skill:ML"])
+
+    def test_walker_counting_mode_matches_enumeration(self):
+        g, _ = self._random_hin(5)
+        g.add_node('file:commit:c1.py', type='file')
+        g.add_node('file:commit:c2.py', type='file')
+        for graph in [g, CompactGraph.from_networkx(g)]:
+            walker = MetaPathWalker(graph)
+            paths = walker.find_paths('dev:a', EXPERTISE_PATH)
+            # Only the two typed file nodes terminate an expertise path
+            self.assertEqual({p[-1] for p in paths}, {'file:commit:c1.py', 'file:commit:c2.py'})
+            count, sim = walker.count_paths('dev:a', EXPERTISE_PATH)
+            self.assertEqual(count, len(paths))
+            self.assertAlmostEqual(sim, sum(walker.compute_path_sim(p) for p in paths))
+            by_target = walker.count_paths_by_target('dev:a', EXPERTISE_PATH)
+            self.assertEqual(set(by_target), {p[-1] for p in paths})
+
+        # Same paths as filtering every neighbor; the index is rebuilt after refresh()
+        walker = MetaPathWalker(g)
+        self.assertEqual(walker.find_paths('dev:a', COLLABORATION_PATH),
+                         [['dev:a', r, c] for r in g.successors('dev:a') for c in g.successors(r)
+                          if g.nodes[c].get('type') == 'commit'])
+        g.add_node('commit:new', type='commit')
+        g.add_edge('repo:r0', 'commit:new', type='contains', weight=0.5)
+        before = walker.count_paths('dev:a', COLLABORATION_PATH)[0]
+        walker.refresh()
+        self.assertEqual(walker.count_paths('dev:a', COLLABORATION_PATH)[0], before + 1)
+
+    def _developer_hin(self, dev, files, rng):
+        g = nx.DiGraph()
+        g.add_node(f'dev:{dev}', type='developer')
+        g.add_node(f'repo:{dev}/lib', type='repository')
+        g.add_edge(f'dev:{dev}', f'repo:{dev}/lib', type='contributes', weight=1.0)
+        for i, chunk in enumerate([files[:2], files[2:]]):
+            commit = f'commit:{dev}{i}'
+            g.add_node(commit, type='commit')
+            g.add_edge(f'repo:{dev}/lib', commit, type='contains', weight=1.0)
+            for f in chunk:
+                g.add_node(f'file:{f}', type='file')
+                g.add_edge(commit, f'file:{f}', type='modifies', weight=float(rng.uniform(0.1, 1.0)))
+        return g
+
+    def test_pathsim_matches_walker_counts(self):
+        rng = np.random.default_rng(11)
+        graphs = [
+            self._developer_hin('a', ['x.py', 'y.py', 'z.py'], rng),
+            self._developer_hin('b', ['x.py', 'y.py', 'w.py'], rng),
+            self._developer_hin('c', ['q.py', 'r.py'], rng),
+            self._developer_hin('d', ['z.py'], rng),
+        ]
+        sim = PathSim([graphs[0], CompactGraph.from_networkx(graphs[1])] + graphs[2:])
+        devs = sim.nodes('developer')
+        matrix = sim.similarity(EXPERTISE_PATH).toarray()
+
+        # Brute force: M_xy = sum over shared files of the per-file path-sim sums
+        merged = nx.compose_all(graphs)
+        walker = MetaPathWalker(merged)
+        reach = {d: {f: s for f, (_, s) in walker.count_paths_by_target(d, EXPERTISE_PATH).items()} for d in devs}
+        m = lambda x, y: sum(w * reach[y].get(f, 0.0) for f, w in reach[x].items())
+        for i, x in enumerate(devs):
+            for j, y in enumerate(devs):
+                self.assertAlmostEqual(matrix[i, j], 2 * m(x, y) / (m(x, x) + m(y, y)))
+        self.assertTrue(np.allclose(np.diag(matrix), 1.0))
+
+        top = sim.top_k('dev:a', EXPERTISE_PATH, k=5)
+        self.assertEqual([d for d, _ in top], sorted(['dev:b', 'dev:d'], key=lambda d: -matrix[0, devs.index(d)]))
+        self.assertAlmostEqual(dict(top)['dev:b'], matrix[0, devs.index('dev:b')])
+        self.assertEqual(sim.top_k('dev:c', EXPERTISE_PATH), [])
+        self.assertEqual(sim.top_k('dev:unknown', EXPERTISE_PATH), [])
+
+        counts = PathSim(graphs, weighted=False).commuting_matrix(EXPERTISE_PATH)
+        self.assertEqual(counts.sum(), sum(walker.count_paths(d, EXPERTISE_PATH)[0] for d in devs))
+
+    def test_confidence_on_compact_graph(self):
+        g, skills = self._random_hin(4)
+        for engine in ['dp', 'enumerate']:
+            expected = ConfidenceCalculator(g, engine=engine).compute_all_skill_confidences('dev:a')
+            actual = ConfidenceCalculator(CompactGraph.from_networkx(g), engine=engine).compute_all_skill_confidences('dev:a')
+            self.assertEqual(actual.keys(), expected.keys())
+            for sk in skills:
+                self.assertAlmostEqual(actual[sk]['belief'], expected[sk]['belief'])
+                self.assertEqual(actual[sk]['path_count'], expected[sk]['path_count'])
+                self.assertEqual([p['path'] for p in actual[sk]['evidence_paths']],
+                                 [p['path'] for p in expected[sk]['evidence_paths']])
+
+        # Cycle detection (and the enumeration fallback) work on the compact form too
+        g.add_edge('commit:c0', next(g.predecessors('commit:c0')), type='contains', weight=0.5)
+        cg = CompactGraph.from_networkx(g)
+        self.assertFalse(cg.is_acyclic(g.nodes))
+        exact = ConfidenceCalculator(g, engine='enumerate').compute_skill_confidence('dev:a', skills[0])
+        self.assertAlmostEqual(ConfidenceCalculator(cg).compute_skill_confidence('dev:a', skills[0])['belief'],
+                               exact['belief'])
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,167 @@
+import asyncio
+import gzip
+import json
+import os
+import pickle
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+from fastapi import HTTPException
+from starlette.requests import Request
+from src import graph_format, main, server
+from src.jobs import JobQueue
+from src.response_cache import CachedResponse, ResponseCache
+from tests.test_graph_format import build_graph
+
+def make_request(**headers):
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(k.replace("_", "-").encode(), v.encode()) for k, v in headers.items()],
+    })
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        cwd = os.getcwd()
+        os.chdir(self.tmp.name)
+        self.addCleanup(self.tmp.cleanup)
+        self.addCleanup(os.chdir, cwd)
+        os.makedirs("output")
+        graph_format.save_graph(build_graph(), "output/alice_graph.npz")
+        server.response_cache.clear()
+        server.job_queue = JobQueue("output/jobs.sqlite3")
+        self.addCleanup(setattr, server, "job_queue", None)
+
+    def test_graph_served_from_cache_with_etag(self):
+        cache = server.response_cache
+        first = server.get_graph(make_request(), "alice")
+        body = json.loads(first.body)
+        self.assertIn("dev:alice", {n["id"] for n in body["nodes"]})
+
+        etag = first.headers["etag"]
+        second = server.get_graph(make_request(if_none_match=etag), "alice")
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.body, b"")
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        # Proxies may weaken the tag or send several
+        for header in ['"stale", W/%s' % etag, "*"]:
+            self.assertEqual(server.get_graph(make_request(if_none_match=header), "alice").status_code, 304)
+        self.assertEqual(server.get_graph(make_request(if_none_match='"stale", W/"other"'), "alice").status_code, 200)
+
+        compressed = server.get_graph(make_request(accept_encoding="gzip, deflate"), "alice")
+        self.assertEqual(compressed.headers["content-encoding"], "gzip")
+        self.assertEqual(gzip.decompress(compressed.body), first.body)
+
+    def test_rewritten_file_invalidates_entry(self):
+        etag = server.get_graph(make_request(), "alice").headers["etag"]
+        g = build_graph()
+        g.add_node("skill:Rust", type="skill", name="Rust")
+        time.sleep(0.01) # Distinct mtime
+        graph_format.save_graph(g, "output/alice_graph.npz")
+
+        fresh = server.get_graph(make_request(if_none_match=etag), "alice")
+        self.assertEqual(fresh.status_code, 200)
+        self.assertIn("skill:Rust", {n["id"] for n in json.loads(fresh.body)["nodes"]})
+
+    def test_legacy_pickled_graph_is_only_read_by_migration(self):
+        g = build_graph()
+        g.add_node("skill:Go", type="skill", name="Go")
+        with open("output/bob_graph.pkl", "wb") as f:
+            pickle.dump(g, f)
+        with mock.patch("pickle.load") as load:
+            with self.assertRaises(HTTPException) as missing:
+                server.get_graph(make_request(), "bob")
+            self.assertIsNone(main.load_graph("bob"))
+        self.assertEqual(missing.exception.status_code, 404)
+        load.assert_not_called()
+
+        self.assertEqual(main.migrate_legacy_graphs(), ["bob"])
+        self.assertEqual(main.migrate_legacy_graphs(), []) # Converted once
+        body = json.loads(server.get_graph(make_request(), "bob").body)
+        self.assertIn("skill:Go", {n["id"] for n in body["nodes"]})
+        self.assertFalse([f for f in os.listdir("output") if f.endswith(".tmp")])
+
+    def test_profile_cached_once_written(self):
+        accepted = server.get_profile(make_request(), "alice")
+        self.assertEqual(accepted["status"], "accepted")
+        pending = server.get_profile(make_request(), "alice")
+        self.assertEqual(pending["status"], "processing")
+        self.assertEqual(pending["job_id"], accepted["job_id"])
+        self.assertEqual(server.get_job(accepted["job_id"])["status"], "queued")
+        self.assertEqual(server.get_profile_status("alice")["job_id"], accepted["job_id"])
+
+        with open("output/alice_profile.json", "w") as f:
+            json.dump({"developer": "alice", "skills": []}, f)
+        profile = server.get_profile(make_request(), "alice")
+        self.assertEqual(json.loads(profile.body)["developer"], "alice")
+        self.assertIn("etag", profile.headers)
+
+    def test_cancel_job_endpoint(self):
+        job_id = server.get_profile(make_request(), "bob")["job_id"]
+        self.assertEqual(server.cancel_job(job_id)["status"], "cancelled")
+        with self.assertRaises(HTTPException):
+            server.get_job(job_id + 1)
+
+    def test_job_events_streamed_until_final_status(self):
+        queue = server.job_queue
+        job, _ = queue.submit("alice")
+        queue.claim("w1")
+        queue.progress(job["id"], "explore", "MCTS")
+        queue.emit(job["id"], "iteration", {"iteration": 1, "reward": 0.7})
+
+        def finish_later():
+            time.sleep(0.1)
+            queue.emit(job["id"], "skill", {"skill": "Python", "source": "commit:0000000", "weight": 0.8})
+            queue.finish(job["id"], "done")
+
+        async def collect(last_event_id=0):
+            return [frame async for frame in server.job_event_stream(job["id"], last_event_id)]
+
+        with mock.patch.object(server.Config, "JOB_EVENT_POLL", 0.01):
+            worker = threading.Thread(target=finish_later)
+            worker.start()
+            frames = asyncio.run(collect())
+            worker.join()
+            kinds = [f.split("\n")[1] for f in frames]
+            self.assertEqual(kinds, ["event: phase", "event: iteration", "event: skill", "event: status"])
+            self.assertIn('data: {"iteration": 1, "reward": 0.7}', frames[1])
+            self.assertTrue(frames[0].startswith("id: "))
+
+            # Reconnecting with Last-Event-ID only replays what was missed
+            last_id = int(frames[1].split("\n")[0][4:])
+            self.assertEqual(asyncio.run(collect(last_id)), frames[2:])
+
+        response = server.get_profile_events(make_request(), "alice")
+        self.assertEqual(response.media_type, "text/event-stream")
+        for header in ("abc", "-5", ""):
+            response = server.get_profile_events(make_request(last_event_id=header), "alice")
+            self.assertEqual(response.media_type, "text/event-stream")
+        with self.assertRaises(HTTPException):
+            server.get_job_events(make_request(), job["id"] + 1)
+
+    def test_lru_bound(self):
+        cache = ResponseCache(max_entries=2)
+        for key in ["a", "b", "a", "c"]:
+            cache.get(key, "output/alice_graph.npz", lambda: {"key": key})
+        self.assertEqual(list(cache.entries), ["a", "c"])
+        self.assertEqual(cache.hits, 1)
+
+    def test_byte_bound(self):
+        size = CachedResponse(json.dumps({"key": "a"}).encode("utf-8"), None).size
+        cache = ResponseCache(max_entries=10, max_bytes=2 * size)
+        for key in ["a", "b", "c"]:
+            cache.get(key, "output/alice_graph.npz", lambda: {"key": key})
+        self.assertEqual(list(cache.entries), ["b", "c"])
+        self.assertEqual(cache.bytes, 2 * size)
+
+        huge = cache.get("d", "output/alice_graph.npz", lambda: {"key": "x" * 3 * size})
+        self.assertIn(b"xxx", huge.body) # Served, but not cached
+        self.assertEqual(list(cache.entries), ["b", "c"])
+
+if __name__ == '__main__':
+    unittest.main()